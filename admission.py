@@ -0,0 +1,197 @@
+"""
+Admission Control
+Fast rejection instead of unbounded queueing for CPU-bound endpoints
+
+Each limited endpoint has:
+- an in-flight budget: at most `max_in_flight` requests run at once in this
+  worker; the next one gets 503 with Retry-After instead of waiting for a
+  thread
+- per-client token buckets: `rate` requests per second with bursts up to
+  `burst`; a client over its rate gets 429 with Retry-After
+
+Every endpoint except the exempt ones (the health check) is admitted
+through one total budget, sized below the worker's thread count, so the
+exempt endpoints always find a free thread even when it is exhausted.
+Endpoints without their own limit() are only held to the total.
+
+Clients are identified by request.remote_addr; behind a proxy, wrap the app
+in werkzeug's ProxyFix so that is the address the proxy saw rather than a
+client-supplied X-Forwarded-For value.
+
+Usage:
+    admission = AdmissionController(total_in_flight=96, exempt=('health_check',))
+    admission.limit('analyze_text', max_in_flight=16, rate=5, burst=20)
+    admission.init_app(app)
+"""
+
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+
+# Client buckets kept per endpoint; the least recently seen are dropped
+MAX_CLIENTS = 10000
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, holding at most `burst`
+    """
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst):
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, rate, burst):
+        """
+        Take one token; returns 0 on success, else seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class _Policy:
+    """
+    Budget, client buckets and counters for one endpoint
+    """
+
+    def __init__(self, max_in_flight, rate, burst):
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.in_flight = 0
+        self.clients = OrderedDict()
+        self.counters = {'admitted': 0, 'rate_limited': 0, 'overloaded': 0}
+
+
+class AdmissionController:
+    """
+    Per-endpoint in-flight budgets and per-client rate limits for a Flask app
+    """
+
+    def __init__(self, total_in_flight, exempt=(), max_clients=MAX_CLIENTS):
+        self.total_in_flight = total_in_flight
+        self.exempt = frozenset(exempt)
+        self.max_clients = max_clients
+        self._in_flight = 0
+        self._policies = {}
+        self._lock = threading.Lock()
+
+    def limit(self, endpoint, max_in_flight, rate=None, burst=None):
+        """
+        Limit a Flask endpoint (view function name)
+        rate=None disables the per-client limit
+        """
+        self._policies[endpoint] = _Policy(max_in_flight, rate, burst or max(1, math.ceil(rate or 1)))
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    @staticmethod
+    def client_id():
+        """
+        The calling client's address (see ProxyFix above); never the
+        client-controlled first X-Forwarded-For hop
+        """
+        return request.remote_addr or 'unknown'
+
+    def admit(self, endpoint, client):
+        """
+        Returns (None, 0) when admitted (the caller must release()), otherwise
+        (status code, retry-after seconds)
+        """
+        with self._lock:
+            policy = self._policies.get(endpoint)
+            if policy is None:
+                # Unlimited endpoint: held to the total budget only
+                policy = self._policies[endpoint] = _Policy(self.total_in_flight, None, 1)
+            if policy.rate:
+                bucket = policy.clients.get(client)
+                if bucket is None:
+                    bucket = policy.clients[client] = TokenBucket(policy.burst)
+                    if len(policy.clients) > self.max_clients:
+                        policy.clients.popitem(last=False)
+                else:
+                    policy.clients.move_to_end(client)
+                wait = bucket.take(policy.rate, policy.burst)
+                if wait:
+                    policy.counters['rate_limited'] += 1
+                    return 429, wait
+
+            if policy.in_flight >= policy.max_in_flight or self._in_flight >= self.total_in_flight:
+                if policy.rate:
+                    bucket.tokens += 1  # not served, so not charged
+                policy.counters['overloaded'] += 1
+                return 503, 1
+
+            policy.in_flight += 1
+            self._in_flight += 1
+            policy.counters['admitted'] += 1
+            return None, 0
+
+    def release(self, endpoint):
+        with self._lock:
+            self._policies[endpoint].in_flight -= 1
+            self._in_flight -= 1
+
+    def hold(self):
+        """
+        Keep the current request's slot past the request itself, for a
+        streamed response that occupies its thread until the client leaves.
+        Returns a callable that releases the slot (a no-op when the request
+        was not admitted through a policy)
+        """
+        endpoint = g.pop('admitted_endpoint', None)
+        if endpoint is None:
+            return lambda: None
+        return functools.partial(self.release, endpoint)
+
+    def _before_request(self):
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in self.exempt or request.method == 'OPTIONS':
+            return None
+
+        status, retry_after = self.admit(endpoint, self.client_id())
+        if status is None:
+            g.admitted_endpoint = endpoint
+            return None
+
+        retry_after = max(1, math.ceil(retry_after))
+        error = 'Too many requests' if status == 429 else 'Server busy'
+        response = jsonify({'error': error, 'retry_after': retry_after})
+        response.status_code = status
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def _teardown_request(self, exc):
+        endpoint = g.pop('admitted_endpoint', None)
+        if endpoint is not None:
+            self.release(endpoint)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'total_in_flight': self.total_in_flight,
+                'endpoints': {
+                    endpoint: {
+                        **policy.counters,
+                        'in_flight': policy.in_flight,
+                        'max_in_flight': policy.max_in_flight,
+                        'rate': policy.rate,
+                        'burst': policy.burst
+                    }
+                    for endpoint, policy in self._policies.items()
+                }
+            }
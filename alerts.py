@@ -0,0 +1,149 @@
+"""
+Streaming Sentiment Spike Detection
+Flags topics whose share of negative posts suddenly jumps
+
+Each (topic, source) pair, plus (topic, 'all'), keeps:
+- a rolling window of the last N posts with a running negative count
+- an EWMA baseline of the negative rate and its variance
+
+Both are updated in O(1) per analyzed post. A key is anomalous while its
+window rate sits `z_threshold` standard errors above the baseline.
+
+Usage:
+    detector = SpikeDetector()
+    detector.observe(post)          # after analyze_sentiment
+    detector.anomalies()
+"""
+
+import math
+import threading
+from collections import deque
+from datetime import datetime
+
+DEFAULT_WINDOW = 50
+DEFAULT_ALPHA = 0.02
+DEFAULT_Z_THRESHOLD = 3.0
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_MIN_LIFT = 0.15
+
+# Floor on the baseline variance so a perfectly calm history does not turn
+# a single negative post into an infinite z-score
+MIN_VARIANCE = 0.01
+
+
+class _TopicState:
+    """
+    Rolling window plus EWMA baseline for one key
+    """
+
+    __slots__ = ('window', 'negatives', 'seen', 'ewma', 'ewvar', 'since', 'z')
+
+    def __init__(self, window):
+        self.window = deque(maxlen=window)
+        self.negatives = 0
+        self.seen = 0
+        self.ewma = None
+        self.ewvar = 0.0
+        self.since = None
+        self.z = 0.0
+
+
+class SpikeDetector:
+    """
+    Per-topic/per-source negative sentiment spike detector
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA, z_threshold=DEFAULT_Z_THRESHOLD,
+                 min_samples=DEFAULT_MIN_SAMPLES, min_lift=DEFAULT_MIN_LIFT):
+        self.window = window
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.min_lift = min_lift
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def observe(self, post):
+        """
+        Update the topic's state with one analyzed post
+        """
+        topic = post.get('topic', 'general')
+        source = str(post.get('source', 'unknown')).lower()
+        negative = 1 if post.get('sentiment') == 'negative' else 0
+        with self._lock:
+            self._update((topic, 'all'), negative)
+            self._update((topic, source), negative)
+
+    def observe_many(self, posts):
+        for post in posts:
+            self.observe(post)
+
+    def _update(self, key, negative):
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _TopicState(self.window)
+
+        # Rolling window: O(1) running count
+        if len(state.window) == state.window.maxlen:
+            state.negatives -= state.window[0]
+        state.window.append(negative)
+        state.negatives += negative
+        state.seen += 1
+
+        # Score the window against the baseline *before* folding this post in
+        rate = state.negatives / len(state.window)
+        if state.ewma is not None and len(state.window) >= self.min_samples:
+            stderr = math.sqrt(max(state.ewvar, MIN_VARIANCE) / len(state.window))
+            state.z = (rate - state.ewma) / stderr
+            spiking = state.z >= self.z_threshold and rate - state.ewma >= self.min_lift
+        else:
+            state.z = 0.0
+            spiking = False
+
+        if spiking and state.since is None:
+            state.since = datetime.now().isoformat()
+        elif not spiking:
+            state.since = None
+
+        # EWMA baseline of the per-post negative indicator
+        if state.ewma is None:
+            state.ewma = float(negative)
+        else:
+            diff = negative - state.ewma
+            state.ewma += self.alpha * diff
+            state.ewvar = (1 - self.alpha) * (state.ewvar + self.alpha * diff * diff)
+
+    def anomalies(self):
+        """
+        Current spikes, strongest first
+        """
+        with self._lock:
+            alerts = [
+                {
+                    'topic': topic,
+                    'source': source,
+                    'negative_rate': round(state.negatives / len(state.window), 3),
+                    'baseline_rate': round(state.ewma, 3),
+                    'z_score': round(state.z, 2),
+                    'window_size': len(state.window),
+                    'since': state.since
+                }
+                for (topic, source), state in self._states.items()
+                if state.since is not None
+            ]
+        alerts.sort(key=lambda a: a['z_score'], reverse=True)
+        return alerts
+
+    def snapshot(self):
+        """
+        Current rate and baseline for every tracked key
+        """
+        with self._lock:
+            return {
+                f'{topic}/{source}': {
+                    'negative_rate': round(state.negatives / len(state.window), 3),
+                    'baseline_rate': round(state.ewma, 3),
+                    'seen': state.seen
+                }
+                for (topic, source), state in self._states.items()
+            }
@@ -9,19 +9,143 @@ Features:
 - Social media data simulation
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from werkzeug.middleware.proxy_fix import ProxyFix
+import gzip
 import re
 import os
+import threading
+import uuid
 from datetime import datetime, timedelta
 import random
 
+from storage import SQLiteStore
+from jobs import JobManager, JobQueueFull, JobInputError
+from streaming import Broadcaster, TooManySubscribers
+from alerts import SpikeDetector
+from serialization import FastJSONProvider, StaticPayload, compress_response, dumps_bytes
+from batch_scorer import score_posts, shared_scorer
+from columnar import ReadOnlyCorpus
+from documents import as_document, extract_topics
+from coalescing import SingleFlight
+from admission import AdmissionController
+from sketches import DEFAULT_TOP_K, SketchIndex
+from search import CorpusSource, SearchIndex, StoreSource
+from shared_state import default_state, fingerprint
+import numpy as np
+from partitions import (
+    COUNTIES, DEFAULT_COUNTY, available_partitions, county_resources, is_parquet, open_partition,
+    partition_exists, partition_path, scatter_gather, scatter_gather_sketches,
+    statistics_response, trend_response, update_partition_sketches
+)
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+# Proxies in front of the app (Render's router: 1); each appends one
+# X-Forwarded-For hop, and request.remote_addr becomes the address the
+# outermost of them saw. PROXY_HOPS=0 when serving directly.
+PROXY_HOPS = int(os.environ.get('PROXY_HOPS', 1))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+app.after_request(compress_response)
 CORS(app)
 
-# Initialize VADER sentiment analyzer
-vader_analyzer = SentimentIntensityAnalyzer()
+# Read-mostly state (lexicon tables, resource payloads) lives in named
+# shared-memory segments that the first worker builds and the others attach
+# to (see shared_state.py); SHARED_STATE=off keeps a private copy per worker
+shared_state = default_state()
+
+# Initialize VADER sentiment analyzer, plus a vectorized scorer with the same
+# rules for many texts at once (see batch_scorer.py); both read the shared tables
+vader_analyzer, batch_scorer = shared_scorer(shared_state)
+
+# Post corpus: real_data.json is converted once into a memory-mapped
+# line-delimited file plus offset index (see corpus.py)
+DATA_FILE = os.environ.get('DATA_FILE', 'real_data.json')
+_corpora = {}
+_corpus_lock = threading.Lock()
+
+# Per-county partitions are aggregated in this many worker processes (see
+# partitions.py); unset or 0 means one per partition, up to the CPU count
+PARTITION_WORKERS = int(os.environ.get('PARTITION_WORKERS', 0)) or None
+
+# Optional storage backend: 'json' (mapped corpus, default) or 'sqlite'
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'sentiment.db')
+_store = None
+_store_lock = threading.Lock()
+
+# Background scoring jobs (see jobs.py), run in their own processes; finished
+# jobs and their results are deleted after JOBS_TTL seconds
+JOBS_DIR = os.environ.get('JOBS_DIR', 'jobs')
+# {"file": ...} job inputs are read from here only
+JOBS_INPUT_DIR = os.environ.get('JOBS_INPUT_DIR', 'job_inputs')
+JOBS_MAX_WORKERS = int(os.environ.get('JOBS_MAX_WORKERS', 2))
+JOBS_MAX_PENDING = int(os.environ.get('JOBS_MAX_PENDING', 16))
+JOBS_TTL = int(os.environ.get('JOBS_TTL', 24 * 3600))
+_jobs = None
+_jobs_lock = threading.Lock()
+
+# Gunicorn threads per worker (--threads in render.yaml); stream and
+# admission budgets are sized from it
+WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 128))
+
+# Live updates over Server-Sent Events (see streaming.py). Each open stream
+# holds a thread for as long as the client is connected, so streams are
+# capped at a quarter of the threads (32 per worker, 64 for the two workers in
+# render.yaml) and count against the admission budget. Hundreds of viewers
+# are served by stream_server.py, one event loop that tails /api/feed.
+FEED_BATCH = 1000
+broadcaster = Broadcaster(
+    buffer_size=int(os.environ.get('STREAM_BUFFER_SIZE', 256)),
+    max_subscribers=int(os.environ.get('STREAM_MAX_SUBSCRIBERS', WORKER_THREADS // 4))
+)
+
+# Negative-sentiment spike detection per topic and source (see alerts.py)
+spike_detector = SpikeDetector()
+ALERTS_WARMUP_POSTS = int(os.environ.get('ALERTS_WARMUP_POSTS', 10000))
+_feed_started = False
+_feed_lock = threading.Lock()
+
+# Distinct authors and top terms per topic and day (see sketches.py); at most
+# SKETCH_MAX_BUCKETS days are kept per partition
+SKETCH_MAX_BUCKETS = int(os.environ.get('SKETCH_MAX_BUCKETS', 60))
+_store_sketches = None
+_store_sketches_lock = threading.Lock()
+
+# Full-text search over post text (see search.py). Each county's index is
+# built in the background when its corpus loads, shared across workers, and
+# extended with ingested posts; SEARCH_INDEX=off skips the eager build.
+SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX', 'on') != 'off'
+SEARCH_DELTA_MAX = int(os.environ.get('SEARCH_DELTA_MAX', 20000))
+SEARCH_MAX_COUNT = 100
+_search_indexes = {}
+_search_lock = threading.Lock()
+
+# Concurrent identical statistics, page and analysis requests share one
+# execution (see coalescing.py); counters are served at /api/metrics
+coalescer = SingleFlight()
+
+# Admission control (see admission.py): every endpoint but /api/health
+# shares a total in-flight budget below the gunicorn thread count, so the
+# health check always has a free thread; the endpoints that run VADER also
+# have their own budgets and per-client rates, and open streams their cap.
+# Budgets are per worker.
+admission = AdmissionController(
+    total_in_flight=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', WORKER_THREADS * 3 // 4)),
+    exempt=('health_check',)
+)
+for _endpoint in ('analyze_text', 'get_recommendations', 'ingest'):
+    admission.limit(
+        _endpoint,
+        max_in_flight=int(os.environ.get('ADMISSION_ENDPOINT_IN_FLIGHT', 16)),
+        rate=float(os.environ.get('ADMISSION_CLIENT_RATE', 10)),
+        burst=int(os.environ.get('ADMISSION_CLIENT_BURST', 20))
+    )
+admission.limit('stream', max_in_flight=broadcaster.max_subscribers)
+if os.environ.get('ADMISSION', 'on') != 'off':
+    admission.init_app(app)
 
 # Expanded Resource Database with 12+ Categories
 RESOURCES = {
@@ -363,15 +487,31 @@ RESOURCES = {
     ]
 }
 
+def preprocess(text):
+    """
+    Normalize and tokenize a text once for every analysis stage (see
+    documents.py); Documents are passed through
+    """
+    return as_document(text, batch_scorer)
+
 def analyze_sentiment(text):
     """
     Analyze sentiment using VADER (better for social media text!)
     VADER understands emojis, slang, capitalization, and punctuation intensity
+    Accepts a text or a preprocessed Document
     Returns: sentiment score (-1 to 1) and classification
     """
-    # Get VADER scores
-    scores = vader_analyzer.polarity_scores(text)
-    
+    doc = preprocess(text)
+    return coalescer.do(('analyze_sentiment', doc.text), _vader_sentiment, doc)
+
+def _vader_sentiment(doc):
+    # Get VADER scores, from the document's prepared tokens
+    return classify_scores(batch_scorer.polarity_scores(doc))
+
+def classify_scores(scores):
+    """
+    analyze_sentiment() result for a VADER polarity_scores() dict
+    """
     # VADER returns: neg, neu, pos, compound
     # compound is the overall score (-1 to +1)
     compound = scores['compound']
@@ -393,55 +533,21 @@ def analyze_sentiment(text):
         'neutral': round(scores['neu'], 2)
     }
 
-def extract_topics(text):
-    """
-    Extract topics from text using keyword matching
-    Returns: list of topics found
-    """
-    text_lower = text.lower()
-    topics = []
-    
-    # Comprehensive topic keywords for 12 categories
-    topic_keywords = {
-        'permits': ['permit', 'license', 'approval', 'registration', 'certificate', 'zoning', 'inspection', 'code'],
-        'funding': ['grant', 'loan', 'funding', 'money', 'finance', 'capital', 'investment', 'relief'],
-        'training': ['training', 'workshop', 'course', 'education', 'learn', 'teach', 'bootcamp', 'class'],
-        'taxes': ['tax', 'taxes', 'irs', 'filing', 'deduction', 'credit', 'return', 'obligation'],
-        'legal': ['legal', 'lawyer', 'attorney', 'law', 'contract', 'lawsuit', 'court', 'guardianship', 'estate', 'succession', 'llc', 'corporation', 'incorporation', 'entity', 'structure'],
-        'insurance': ['insurance', 'liability', 'coverage', 'workers comp', 'protection', 'health insurance', 'medical', 'benefits', 'broker', 'agent'],
-        'marketing': ['marketing', 'advertising', 'promotion', 'branding', 'social media', 'website', 'web', 'online presence', 'seo', 'digital'],
-        'technology': ['technology', 'it', 'computer', 'software', 'system', 'tech', 'cybersecurity', 'security', 'ecommerce', 'online store'],
-        'real_estate': ['property', 'real estate', 'location', 'space', 'lease', 'rent', 'office', 'zoning', 'land use', 'landlord'],
-        'hr': ['hiring', 'employee', 'staff', 'recruit', 'employment', 'hr', 'payroll', 'benefits', 'compensation', 'compliance', 'labor'],
-        'export': ['export', 'international', 'trade', 'global', 'foreign', 'import', 'customs', 'shipping', 'tariff'],
-        'networking': ['networking', 'events', 'meetup', 'connect', 'community', 'entrepreneurs', 'chamber', 'industry group'],
-        'certification': ['minority', 'mbe', 'wbe', 'sbe', 'certification', 'certified', 'women-owned', 'diversity', 'contractor'],
-        'support': ['help', 'support', 'assistance', 'advisor', 'mentor', 'guidance', 'hotline', 'question']
-    }
-    
-    # Check for matches in order of specificity (most specific first)
-    for topic, keywords in topic_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            topics.append(topic)
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    topics = [x for x in topics if not (x in seen or seen.add(x))]
-    
-    return topics if topics else ['support']  # Default to support
-
-def recommend_resources(query, topics):
+def recommend_resources(query, topics, resources=None):
     """
     Recommend resources based on query and detected topics
+    Uses the given resource catalog (default: RESOURCES)
+    Accepts a query text or a preprocessed Document
     Returns: list of relevant resources
     """
+    resources = RESOURCES if resources is None else resources
     recommendations = []
-    query_lower = query.lower()
+    query_lower = preprocess(query).lower
     
     # Get resources for detected topics
     for topic in topics:
-        if topic in RESOURCES:
-            topic_resources = RESOURCES[topic]
+        if topic in resources:
+            topic_resources = resources[topic]
             
             # Score each resource based on keyword matches
             for resource in topic_resources:
@@ -497,6 +603,364 @@ def generate_mock_posts(count=20):
     
     return posts
 
+def analyze_sentiment_batch(texts):
+    """
+    analyze_sentiment() for a list of texts, scored in one vectorized pass
+    """
+    return batch_scorer.analyze_batch(texts)
+
+def analyze_posts(posts):
+    """
+    Score a batch of posts: VADER sentiment plus extracted topics
+    The batch scorer tokenizes texts itself and topics only need them
+    lowercased, so no Documents are built on this path
+    """
+    return score_posts(posts, batch_scorer)
+
+def get_corpus(county=DEFAULT_COUNTY):
+    """
+    Return this worker's mapped view of a county's post corpus
+    Opened lazily so each gunicorn worker maps the files after forking
+    """
+    with _corpus_lock:
+        corpus = _corpora.get(county)
+        if corpus is None:
+            corpus = _corpora[county] = open_partition(partition_path(county, DATA_FILE))
+            if SEARCH_INDEX_ENABLED and STORAGE_BACKEND != 'sqlite':
+                _warm_search(county)
+    corpus.refresh()
+    return corpus
+
+def get_search(county=DEFAULT_COUNTY):
+    """
+    Return this worker's search index for a county (one index for SQLite)
+    """
+    key = 'sqlite' if STORAGE_BACKEND == 'sqlite' else county
+    with _search_lock:
+        index = _search_indexes.get(key)
+        if index is None:
+            source = StoreSource(get_store()) if key == 'sqlite' else CorpusSource(get_corpus(county))
+            index = _search_indexes[key] = SearchIndex(
+                f'search.{key}', source, shared_state, _sentiment_labels, SEARCH_DELTA_MAX
+            )
+    return index
+
+def _warm_search(county=DEFAULT_COUNTY):
+    """
+    Build (or attach to) a search index in the background
+    """
+    threading.Thread(target=lambda: get_search(county).catch_up(), daemon=True).start()
+
+def _sentiment_labels(texts):
+    return [analysis['sentiment'] for analysis in analyze_sentiment_batch(texts)]
+
+def _county_arg(allow_all=False):
+    """
+    Read ?county= (default: the original Miami-Dade corpus)
+    Returns None for an unknown county
+    """
+    county = request.args.get('county', DEFAULT_COUNTY)
+    if county in COUNTIES or (allow_all and county == 'all'):
+        return county
+    return None
+
+def _county_paths(county):
+    """
+    {county: partition path} for one county, or every county with data for 'all'
+    """
+    if county == 'all':
+        return available_partitions(DATA_FILE)
+    return {county: partition_path(county, DATA_FILE)}
+
+def _aggregate_county():
+    """
+    The ?county= an aggregate query is for, checked against the backend
+    Raises LookupError for an unknown county, or under SQLite for any county
+    but the default one (the store is seeded from the default corpus only)
+    """
+    county = _county_arg(allow_all=True)
+    if county is None:
+        raise LookupError('Unknown county')
+    if STORAGE_BACKEND == 'sqlite' and county != DEFAULT_COUNTY:
+        raise LookupError(f'Only {DEFAULT_COUNTY} is stored in SQLite; use STORAGE_BACKEND=json for county partitions')
+    return county
+
+def _county_aggregate(county):
+    """
+    Scatter-gather the aggregate for a county (or all of them)
+    Raises FileNotFoundError when no data
+    """
+    paths = _county_paths(county)
+    if not paths:
+        raise FileNotFoundError('no county partitions found')
+    aggregate, partition_totals = scatter_gather(paths, _post_filters(), PARTITION_WORKERS)
+    return county, aggregate, partition_totals
+
+def _sketch_query():
+    """
+    Read the topic/sentiment/since/until sketch filters from the query string
+    """
+    return {
+        key: request.args.get(key)
+        for key in ('topic', 'sentiment', 'since', 'until')
+        if request.args.get(key)
+    }
+
+def _store_sketch_summary(query):
+    """
+    Sketch summary over the SQLite store, folding in rows added since the last call
+    """
+    global _store_sketches
+    store = get_store()
+    with _store_sketches_lock:
+        if _store_sketches is None:
+            _store_sketches = (SketchIndex(SKETCH_MAX_BUCKETS), 0)
+        index, cursor = _store_sketches
+        while True:
+            posts, cursor = store.posts_after(cursor, 10000)
+            if not posts:
+                break
+            index.observe_many(posts)
+        _store_sketches = (index, cursor)
+    return index.summary(**query)
+
+def _sketches(k):
+    """
+    Distinct authors and top terms for the current request's county and filters
+    """
+    query = _sketch_query()
+    if STORAGE_BACKEND == 'sqlite':
+        return {**_store_sketch_summary(query).response(k), **query}
+    
+    county = _county_arg(allow_all=True)
+    if county is None:
+        raise LookupError('Unknown county')
+    paths = _county_paths(county)
+    if not paths:
+        raise FileNotFoundError('no county partitions found')
+    summary, partition_posts = scatter_gather_sketches(paths, query, PARTITION_WORKERS, SKETCH_MAX_BUCKETS)
+    result = {'county': county, **query, **summary.response(k)}
+    if county == 'all':
+        result['county_breakdown'] = partition_posts
+    return result
+
+def get_store():
+    """
+    Return the SQLite store, seeding it from the JSON corpus on first use
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = SQLiteStore(SQLITE_PATH)
+            if store.count() == 0 and os.path.exists(DATA_FILE):
+                store.insert_posts(_with_label(get_corpus()))
+            _store = store
+            if SEARCH_INDEX_ENABLED:
+                _warm_search()
+    return _store
+
+def get_jobs():
+    """
+    Return this worker's job manager, starting its pool on first use
+    """
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            # Jobs score in pool processes, with the same shared scorer
+            _jobs = JobManager(
+                score_posts,
+                state_dir=JOBS_DIR,
+                input_dir=JOBS_INPUT_DIR,
+                max_workers=JOBS_MAX_WORKERS,
+                max_pending=JOBS_MAX_PENDING,
+                ttl=JOBS_TTL
+            )
+    return _jobs
+
+def ingest_posts(posts):
+    """
+    Analyze incoming posts and append them to the active storage backend
+    Subscribers of /api/stream pick them up from storage, whichever worker
+    handled the ingest
+    """
+    analyzed = analyze_posts(posts)
+    for post in analyzed:
+        post.setdefault('id', f'ingest_{uuid.uuid4().hex[:12]}')
+        post.setdefault('timestamp', datetime.now().isoformat())
+        post.setdefault('topic', post['topics'][0])
+    
+    if STORAGE_BACKEND == 'sqlite':
+        get_store().insert_posts(analyzed)
+    else:
+        get_corpus().append(analyzed)
+        update_partition_sketches(partition_path(DEFAULT_COUNTY, DATA_FILE), SKETCH_MAX_BUCKETS)
+    
+    index = _search_indexes.get('sqlite' if STORAGE_BACKEND == 'sqlite' else DEFAULT_COUNTY)
+    if index is not None:
+        index.catch_up()
+    return analyzed
+
+def _feed_head():
+    """
+    Cursor just past the newest stored post: a rowid for SQLite, otherwise
+    a position in the default county's corpus
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return get_store().max_rowid()
+    return len(get_corpus())
+
+def _posts_after(cursor, limit=FEED_BATCH):
+    """
+    (posts, next cursor) for at most limit posts stored after cursor
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return get_store().posts_after(cursor, limit)
+    corpus = get_corpus()
+    end = min(len(corpus), cursor + limit)
+    if end <= cursor:
+        # Nothing new (or the corpus was replaced by a shorter one)
+        return [], len(corpus)
+    return corpus.slice(cursor, end), end
+
+def _new_posts_feed():
+    """
+    Build the stream feed: a callable returning posts stored since its last call
+    """
+    cursor = [_feed_head()]
+    
+    def fetch():
+        posts = []
+        while True:
+            batch, cursor[0] = _posts_after(cursor[0])
+            posts.extend(batch)
+            if len(batch) < FEED_BATCH:
+                return posts
+    return fetch
+
+def start_feed():
+    """
+    Start this worker's tail of newly stored posts (once)
+    Every new post updates the spike detector, then goes out on /api/stream
+    """
+    global _feed_started
+    with _feed_lock:
+        if _feed_started:
+            return
+        
+        fetch = _new_posts_feed()
+        
+        # Warm the baselines with the most recent history
+        if STORAGE_BACKEND == 'sqlite':
+            store = get_store()
+            spike_detector.observe_many(
+                store.posts_after(max(0, store.max_rowid() - ALERTS_WARMUP_POSTS), ALERTS_WARMUP_POSTS)[0]
+            )
+        else:
+            corpus = get_corpus()
+            spike_detector.observe_many(corpus.slice(len(corpus) - ALERTS_WARMUP_POSTS, len(corpus)))
+        
+        def fetch_and_observe():
+            posts = fetch()
+            spike_detector.observe_many(posts)
+            return posts
+        
+        broadcaster.start_feed(fetch_and_observe)
+        _feed_started = True
+
+def _with_label(posts):
+    """
+    Yield posts with a sentiment label, analyzing only those that lack one
+    """
+    for post in posts:
+        if 'sentiment' not in post:
+            post['sentiment'] = analyze_sentiment(post['text'])['sentiment']
+        yield post
+
+def _with_sentiment(posts):
+    """
+    Return posts with sentiment filled in, batch-analyzing those that lack it
+    """
+    posts = list(posts)
+    missing = [post for post in posts if 'sentiment_score' not in post]
+    if missing:
+        for post, analysis in zip(missing, analyze_sentiment_batch([p['text'] for p in missing])):
+            post['sentiment_score'] = analysis['score']
+            post['sentiment'] = analysis['sentiment']
+    return posts
+
+def _post_filters():
+    """
+    Read the topic/sentiment/source filters from the query string
+    """
+    return {
+        key: request.args.get(key)
+        for key in ('topic', 'sentiment', 'source')
+        if request.args.get(key)
+    }
+
+def _filter_page(posts, filters, offset, count):
+    """
+    Scan posts for filter matches and return one page of them
+    """
+    page = []
+    skipped = 0
+    for post in posts:
+        if any(post.get(key) != value for key, value in filters.items()):
+            continue
+        if skipped < offset:
+            skipped += 1
+            continue
+        page.append(post)
+        if len(page) >= count:
+            break
+    return page
+
+def _posts_page(county, filters, offset, count):
+    """
+    One page of posts with sentiment filled in
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        # Filtering and paging happen in SQLite using its indexes
+        posts = get_store().fetch_posts(offset, count, **filters)
+    elif filters:
+        posts = _filter_page(get_corpus(county), filters, offset, count)
+    else:
+        # Read only the requested page from the mapped corpus
+        posts = get_corpus(county).slice(offset, offset + count)
+    
+    # Analyze sentiment for each post using VADER
+    return _with_sentiment(posts)
+
+def _search(county, query, filters, offset, count):
+    """
+    One page of ranked search results with sentiment filled in
+    """
+    posts, matches, exact = get_search(county).search(query, filters, offset, count)
+    return {
+        'posts': _with_sentiment(posts),
+        'total': len(posts),
+        'matches': matches,
+        # False when the ranking stopped early: matches is then a lower bound
+        'matches_exact': exact,
+        'offset': offset
+    }
+
+def _statistics():
+    """
+    Statistics for the current request's county and filters
+    """
+    county = _aggregate_county()
+    if STORAGE_BACKEND == 'sqlite':
+        # Aggregates are pushed down into SQL
+        return get_store().statistics(**_post_filters())
+    
+    # Partial aggregates per county partition, merged here
+    county, aggregate, partition_totals = _county_aggregate(county)
+    stats = statistics_response(aggregate)
+    if county == 'all':
+        stats['county_breakdown'] = partition_totals
+    return stats
+
 # API Endpoints
 
 @app.route('/api/analyze', methods=['POST'])
@@ -510,8 +974,9 @@ def analyze_text():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
     
-    sentiment_result = analyze_sentiment(text)
-    topics = extract_topics(text)
+    doc = preprocess(text)
+    sentiment_result = analyze_sentiment(doc)
+    topics = extract_topics(doc)
     
     return jsonify({
         'text': text,
@@ -526,14 +991,18 @@ def get_recommendations():
     """
     data = request.json
     query = data.get('query', '')
+    county = data.get('county', DEFAULT_COUNTY)
     
     if not query:
         return jsonify({'error': 'No query provided'}), 400
+    if county not in COUNTIES:
+        return jsonify({'error': 'Unknown county'}), 400
     
-    # Analyze the query
-    sentiment_result = analyze_sentiment(query)
-    topics = extract_topics(query)
-    recommendations = recommend_resources(query, topics)
+    # Analyze the query, preprocessing it once for all three stages
+    doc = preprocess(query)
+    sentiment_result = analyze_sentiment(doc)
+    topics = extract_topics(doc)
+    recommendations = recommend_resources(doc, topics, county_catalog(county))
     
     return jsonify({
         'query': query,
@@ -549,19 +1018,15 @@ def get_posts():
     """
     try:
         count = request.args.get('count', 20, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        filters = _post_filters()
+        county = _county_arg()
         
-        # Load real data from JSON file
-        with open('real_data.json', 'r') as f:
-            import json
-            all_posts = json.load(f)
-            posts = all_posts[:count]
+        if county is None:
+            return jsonify({'error': 'Unknown county', 'posts': [], 'total': 0}), 400
         
-        # Analyze sentiment for each post using VADER
-        for post in posts:
-            if 'sentiment_score' not in post:
-                analysis = analyze_sentiment(post['text'])
-                post['sentiment_score'] = analysis['score']
-                post['sentiment'] = analysis['sentiment']
+        key = ('posts', STORAGE_BACKEND, county, offset, count, tuple(sorted(filters.items())))
+        posts = coalescer.do(key, _posts_page, county, filters, offset, count)
         
         return jsonify({
             'posts': posts,
@@ -581,44 +1046,74 @@ def get_posts():
             'total': 0
         }), 500
 
+@app.route('/api/posts/<post_id>/annotations', methods=['GET'])
+def get_annotations(post_id):
+    """
+    Annotations stored for a post (SQLite backend only)
+    """
+    if STORAGE_BACKEND != 'sqlite':
+        return jsonify({'error': 'Annotations need STORAGE_BACKEND=sqlite'}), 409
+    store = get_store()
+    if not store.has_post(post_id):
+        return jsonify({'error': 'Post not found'}), 404
+    return jsonify({'post_id': post_id, 'annotations': store.annotations(post_id)})
+
+@app.route('/api/posts/<post_id>/annotations', methods=['PUT'])
+def annotate_post(post_id):
+    """
+    Set annotations on a post, replacing existing keys
+    Body: {"reviewed": true, "note": "..."}
+    """
+    if STORAGE_BACKEND != 'sqlite':
+        return jsonify({'error': 'Annotations need STORAGE_BACKEND=sqlite'}), 409
+    data = request.json
+    if not isinstance(data, dict) or not data:
+        return jsonify({'error': 'No annotations provided'}), 400
+    store = get_store()
+    if not store.has_post(post_id):
+        return jsonify({'error': 'Post not found'}), 404
+    store.annotate((post_id, key, value) for key, value in data.items())
+    return jsonify({'post_id': post_id, 'annotations': store.annotations(post_id)})
+
+@app.route('/api/search', methods=['GET'])
+def search_posts():
+    """
+    Full-text search over post text, ranked by relevance
+    ?q= words, "phrases" and prefix* terms (all must match), plus the
+    topic/sentiment/source filters, offset and count (at most 100)
+    """
+    query = request.args.get('q', '').strip()
+    count = min(max(request.args.get('count', 20, type=int), 0), SEARCH_MAX_COUNT)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    filters = _post_filters()
+    county = _county_arg()
+    
+    if not query:
+        return jsonify({'error': 'No query provided', 'posts': [], 'total': 0}), 400
+    if county is None:
+        return jsonify({'error': 'Unknown county', 'posts': [], 'total': 0}), 400
+    
+    try:
+        key = ('search', STORAGE_BACKEND, county, query, offset, count, tuple(sorted(filters.items())))
+        return jsonify({'query': query, **coalescer.do(key, _search, county, query, filters, offset, count)})
+    except ValueError as e:
+        return jsonify({'error': str(e), 'posts': [], 'total': 0}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'real_data.json not found', 'posts': [], 'total': 0}), 404
+
 @app.route('/api/statistics', methods=['GET'])
 def get_statistics():
     """
     Get overall sentiment statistics from real_data.json
     """
     try:
-        # Load real data
-        with open('real_data.json', 'r') as f:
-            import json
-            posts = json.load(f)
-        
-        # Analyze sentiment for posts that don't have it
-        for post in posts:
-            if 'sentiment' not in post:
-                analysis = analyze_sentiment(post['text'])
-                post['sentiment'] = analysis['sentiment']
-        
-        # Calculate statistics
-        sentiments = [p.get('sentiment', 'neutral') for p in posts]
-        topics = [p.get('topic', 'general') for p in posts]
-        
-        stats = {
-            'total_posts': len(posts),
-            'sentiment_breakdown': {
-                'positive': sentiments.count('positive'),
-                'negative': sentiments.count('negative'),
-                'neutral': sentiments.count('neutral')
-            },
-            'topic_breakdown': {},
-            'overall_sentiment_percentage': round((sentiments.count('positive') / len(posts)) * 100, 1) if posts else 0
-        }
-        
-        # Count topics
-        for topic in set(topics):
-            stats['topic_breakdown'][topic] = topics.count(topic)
-        
-        return jsonify(stats)
+        filters = _post_filters()
+        key = ('statistics', STORAGE_BACKEND, request.args.get('county', DEFAULT_COUNTY),
+               tuple(sorted(filters.items())))
+        return jsonify(coalescer.do(key, _statistics))
         
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 400
     except FileNotFoundError:
         return jsonify({
             'error': 'real_data.json not found',
@@ -636,6 +1131,163 @@ def get_statistics():
             'overall_sentiment_percentage': 0
         }), 500
 
+@app.route('/api/ingest', methods=['POST'])
+def ingest():
+    """
+    Analyze and store new posts
+    Body: {"posts": [{"text": "...", "source": "twitter", ...}]}
+    """
+    data = request.json or {}
+    posts = data.get('posts')
+    
+    if not isinstance(posts, list) or not posts:
+        return jsonify({'error': 'No posts provided'}), 400
+    if not all(isinstance(p, dict) and p.get('text') for p in posts):
+        return jsonify({'error': 'Every post needs text'}), 400
+    
+    # Refuse before scoring anything when the corpus cannot take the posts
+    read_only = {'error': 'Posts cannot be appended to a Parquet corpus; use STORAGE_BACKEND=sqlite'}
+    if STORAGE_BACKEND != 'sqlite' and is_parquet(partition_path(DEFAULT_COUNTY, DATA_FILE)):
+        return jsonify(read_only), 409
+    
+    try:
+        analyzed = ingest_posts(posts)
+    except ReadOnlyCorpus:
+        # The corpus was swapped for a Parquet file after it was opened
+        return jsonify(read_only), 409
+    return jsonify({'posts': analyzed, 'total': len(analyzed)}), 201
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """
+    Server-Sent Events: `post` for each new analyzed post, `stats` for the
+    statistic deltas of each batch, `lagged` when a slow client dropped events
+    Each stream holds a server thread, so only a few dozen fit per worker;
+    stream_server.py serves the same events to hundreds of clients
+    """
+    try:
+        start_feed()
+        subscriber = broadcaster.subscribe()
+    except TooManySubscribers as e:
+        return jsonify({'error': str(e)}), 503
+    except FileNotFoundError:
+        return jsonify({'error': 'real_data.json not found'}), 404
+    
+    response = Response(
+        broadcaster.stream(subscriber),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The stream keeps its thread (and admission slot) until the client
+    # disconnects, not just until this view returns
+    response.call_on_close(admission.hold())
+    response.call_on_close(lambda: broadcaster.unsubscribe(subscriber))
+    return response
+
+@app.route('/api/feed', methods=['GET'])
+def get_feed():
+    """
+    Posts stored after ?after= (a cursor from an earlier call), oldest first,
+    at most ?count= of them; without ?after=, just the current cursor.
+    stream_server.py tails storage through this
+    """
+    after = request.args.get('after', type=int)
+    count = min(max(request.args.get('count', FEED_BATCH, type=int), 1), FEED_BATCH)
+    try:
+        if after is None:
+            posts, cursor = [], _feed_head()
+        else:
+            posts, cursor = _posts_after(max(after, 0), count)
+    except FileNotFoundError:
+        return jsonify({'error': 'real_data.json not found', 'posts': []}), 404
+    return jsonify({'posts': posts, 'cursor': cursor, 'total': len(posts)})
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """
+    Topics (overall and per source) whose negative sentiment is spiking
+    """
+    try:
+        start_feed()
+        # The feed thread only polls while someone is streaming
+        broadcaster.catch_up()
+    except FileNotFoundError:
+        return jsonify({'error': 'real_data.json not found', 'alerts': []}), 404
+    
+    alerts = spike_detector.anomalies()
+    topic = request.args.get('topic')
+    if topic:
+        alerts = [a for a in alerts if a['topic'] == topic]
+    
+    return jsonify({
+        'alerts': alerts,
+        'total': len(alerts),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/sketches', methods=['GET'])
+def get_sketches():
+    """
+    Distinct authors and trending terms from streaming sketches
+    Query: county (or all), topic, sentiment, since/until (YYYY-MM-DD), k (1-20)
+    e.g. /api/sketches?topic=permits&sentiment=negative: how many distinct
+    owners are complaining about permits, and about what
+    """
+    k = min(max(request.args.get('k', 10, type=int), 1), DEFAULT_TOP_K)
+    try:
+        key = ('sketches', STORAGE_BACKEND, request.args.get('county', DEFAULT_COUNTY),
+               tuple(sorted(_sketch_query().items())), k)
+        return jsonify(coalescer.do(key, _sketches, k))
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'real_data.json not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Submit a corpus for background scoring
+    Body: {"texts": [...]}, {"posts": [...]} or {"file": "posts.jsonl"}
+    (a file in JOBS_INPUT_DIR)
+    """
+    data = request.json
+    
+    try:
+        job = get_jobs().submit(data)
+    except JobInputError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify(job), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Report job progress, plus a page of results (?offset=&count=)
+    """
+    jobs = get_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    offset = request.args.get('offset', 0, type=int)
+    count = request.args.get('count', 100, type=int)
+    job['results'] = jobs.results(job_id, offset, count)
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job
+    """
+    job = get_jobs().cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 202
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
@@ -647,17 +1299,154 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    This worker's request coalescing, admission, search and shared state counters
+    """
+    resources_state = _resource_payloads()[0]
+    return jsonify({
+        'worker': os.getpid(),
+        'coalescing': coalescer.stats(),
+        'in_flight': coalescer.in_flight(),
+        'admission': admission.stats(),
+        'search': {key: index.stats() for key, index in list(_search_indexes.items())},
+        'shared_state': {
+            state.name: {'version': state.version, 'shared': state.shared, 'bytes': state.nbytes()}
+            for state in (batch_scorer.tables, resources_state)
+        }
+    })
+
+@app.route('/api/trends', methods=['GET'])
+def get_trends():
+    """
+    Daily sentiment counts for a county (?county=) or all counties (?county=all)
+    """
+    try:
+        county = _aggregate_county()
+        if STORAGE_BACKEND == 'sqlite':
+            # Same backend as /api/statistics: GROUP BY day in SQL
+            filters = _post_filters()
+            store = get_store()
+            return jsonify({
+                'county': county,
+                'trend': store.trend(**filters),
+                'total_posts': store.count(**filters)
+            })
+        county, aggregate, partition_totals = _county_aggregate(county)
+        return jsonify({
+            'county': county,
+            'trend': trend_response(aggregate),
+            'total_posts': aggregate['total_posts']
+        })
+    except LookupError as e:
+        return jsonify({'error': str(e), 'trend': []}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'real_data.json not found', 'trend': []}), 404
+    except Exception as e:
+        return jsonify({'error': str(e), 'trend': []}), 500
+
+@app.route('/api/counties', methods=['GET'])
+def get_counties():
+    """
+    Supported counties and whether each has post data
+    """
+    counties = [
+        {
+            'id': county,
+            **info,
+            'has_data': partition_exists(partition_path(county, DATA_FILE))
+        }
+        for county, info in COUNTIES.items()
+    ]
+    return jsonify({'counties': counties, 'default': DEFAULT_COUNTY})
+
+# Resource payloads are serialized and compressed once, into shared memory
+def _resource_bodies():
+    bodies = {}
+    for county in COUNTIES:
+        resources = county_resources(county, RESOURCES)
+        bodies[county] = dumps_bytes({
+            'county': county,
+            'resources': resources,
+            'total': sum(len(items) for items in resources.values())
+        })
+    return bodies
+
+def _load_resource_state():
+    bodies = _resource_bodies()
+    
+    def build():
+        arrays = {}
+        for county, body in bodies.items():
+            arrays[f'{county}.body'] = np.frombuffer(body, dtype=np.uint8)
+            arrays[f'{county}.gzip'] = np.frombuffer(gzip.compress(body, 9), dtype=np.uint8)
+        return arrays, {}
+    
+    return shared_state.load('resources', fingerprint(*bodies.values()), build)
+
+def _payloads(state):
+    return {
+        county: StaticPayload(memoryview(state[f'{county}.body']),
+                              gzipped=memoryview(state[f'{county}.gzip']))
+        for county in COUNTIES
+    }
+
+_state = _load_resource_state()
+_resources = (_state, _payloads(_state))
+del _state
+
+def _resource_payloads():
+    """
+    (state, {county: StaticPayload}), following version swaps published by
+    other processes
+    """
+    global _resources
+    state = shared_state.refresh(_resources[0])
+    if state is not _resources[0]:
+        _resources = (state, _payloads(state))
+    return _resources
+
+def county_catalog(county):
+    """
+    A county's resource catalog, decoded from its shared payload on each
+    call (about 0.1ms) rather than kept as a private copy in every worker
+    """
+    return app.json.loads(bytes(_resource_payloads()[1][county].body))['resources']
+
+@app.route('/api/resources', methods=['GET'])
+def get_resources():
+    """
+    Full resource catalog for a county (?county=, default Miami-Dade)
+    """
+    county = _county_arg()
+    if county is None:
+        return jsonify({'error': 'Unknown county'}), 400
+    return _resource_payloads()[1][county].response()
+
 # Demo route
-@app.route('/')
-def index():
-    return """
+INDEX_PAGE = StaticPayload("""
     <h1>🏢 Small Business Sentiment Intelligence API</h1>
     <h2>Available Endpoints:</h2>
     <ul>
         <li><strong>POST /api/analyze</strong> - Analyze sentiment of text</li>
         <li><strong>POST /api/recommend</strong> - Get resource recommendations</li>
         <li><strong>GET /api/posts</strong> - Get mock social media posts</li>
+        <li><strong>GET/PUT /api/posts/&lt;id&gt;/annotations</strong> - Post annotations (SQLite backend)</li>
+        <li><strong>GET /api/search</strong> - Full-text search of posts (?q=, "phrases", prefix*)</li>
         <li><strong>GET /api/statistics</strong> - Get sentiment statistics</li>
+        <li><strong>GET /api/resources</strong> - Full resource catalog</li>
+        <li><strong>GET /api/counties</strong> - Supported counties</li>
+        <li><strong>GET /api/trends</strong> - Daily sentiment trend (?county=all for every county)</li>
+        <li><strong>POST /api/ingest</strong> - Analyze and store new posts</li>
+        <li><strong>GET /api/stream</strong> - Live post and statistics updates (SSE)</li>
+        <li><strong>GET /api/feed</strong> - Posts stored after a cursor (?after=), for stream_server.py</li>
+        <li><strong>GET /api/alerts</strong> - Current negative sentiment spikes by topic</li>
+        <li><strong>GET /api/sketches</strong> - Distinct authors and top terms by topic, sentiment and date</li>
+        <li><strong>POST /api/jobs</strong> - Submit a large corpus for background scoring</li>
+        <li><strong>GET /api/jobs/&lt;id&gt;</strong> - Job progress and results</li>
+        <li><strong>DELETE /api/jobs/&lt;id&gt;</strong> - Cancel a queued or running job</li>
+        <li><strong>GET /api/metrics</strong> - Coalescing, admission, search and shared state counters for this worker</li>
         <li><strong>GET /api/health</strong> - Health check</li>
     </ul>
     
@@ -668,7 +1457,11 @@ curl -X POST http://localhost:5000/api/recommend \\
   -H "Content-Type: application/json" \\
   -d '{"query": "I need help getting a business permit"}'
     </pre>
-    """
+    """, mimetype='text/html')
+
+@app.route('/')
+def index():
+    return INDEX_PAGE.response()
 
 if __name__ == '__main__':
     # Get port from environment variable (Render provides this)
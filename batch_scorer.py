@@ -0,0 +1,666 @@
+"""
+Batch VADER Scorer
+Scores many texts at once with the same rules as
+SentimentIntensityAnalyzer.polarity_scores
+
+How it works:
+- Every text is tokenized exactly like VADER (emoji descriptions, whitespace
+  split, punctuation stripping) and each lowercase token is mapped to an
+  integer id from a vocabulary built once from the lexicon and rule words
+- Per-id tables hold lexicon valence, booster scalar and negation flags, so
+  valence lookup, negation, boosters, ALL CAPS emphasis and "least" are
+  NumPy operations over the flattened tokens of the whole batch
+- The rare rules that depend on phrases (special idioms such as "bad ass",
+  and the contrastive "but") are applied per text by VADER's own helpers,
+  only for the texts that need them
+- Per-text sums and the pos/neg/neu split are aggregated with bincount
+
+The vocabulary, rule tables and emoji descriptions are flat arrays
+(lexicon_tables), so one copy can live in shared memory for every worker
+(see shared_state.py); LexiconView and EmojiView expose them to VADER's own
+code as its lexicon and emoji dictionaries. Tokens are looked up in the
+shared words array with one binary search per batch of new tokens, so a
+process keeps no copy of the lexicon, only a bounded cache of recent tokens.
+
+polarity_scores() scores one text, or a Document (see documents.py) whose
+prepared tokens are then reused, with VADER's own per-token code, calling
+into it only for lexicon words. Those rules get a plain dict of the text's
+lexicon words, so the hot path never searches the shared arrays.
+
+Usage:
+    scorer = BatchScorer(vader_analyzer)
+    scorer.polarity_scores_batch(texts)   # dict of NumPy arrays
+    scorer.analyze_batch(texts)           # list of analyze_sentiment() dicts
+    scorer.polarity_scores(document)      # same dict as analyzer.polarity_scores
+
+    analyzer, scorer = shared_scorer(default_state())  # tables in shared memory
+    score_posts(posts)     # posts with sentiment and topics, in a pool process
+"""
+
+import os
+import string
+from collections.abc import Mapping
+from itertools import islice
+
+import numpy as np
+import vaderSentiment.vaderSentiment as vader
+from vaderSentiment.vaderSentiment import (
+    BOOSTER_DICT, C_INCR, N_SCALAR, NEGATE, SPECIAL_CASES, SentimentIntensityAnalyzer
+)
+
+from documents import Document, extract_topics
+from shared_state import fingerprint
+
+# Words the rules compare against directly; each gets its own vocabulary id
+RULE_WORDS = ['no', 'least', 'at', 'very', 'but', 'kind', 'of', 'or', 'nor',
+              'never', 'so', 'this', 'without', 'doubt']
+
+# Multi-word phrases used by VADER's idiom check
+IDIOM_PHRASES = list(SPECIAL_CASES) + [key for key in BOOSTER_DICT if ' ' in key]
+
+# Same thresholds as analyze_sentiment
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+# Raw tokens seen so far are cached with their id, per process; cleared when it
+# grows past this. Common words keep coming back after a clear, and a few
+# thousand entries stay around 1MB (500k entries were ~140MB per worker)
+TOKEN_CACHE_SIZE = 4096
+# Non-ASCII characters seen so far with their emoji description (or None),
+# per process; cleared when it grows past this
+EMOJI_CACHE_SIZE = 4096
+
+PAD_ID = 0       # neighbour of the first/last token of a text
+UNKNOWN_ID = 1   # token outside the vocabulary
+UNKNOWN_NT_ID = 2  # unknown token containing "n't" (VADER treats it as a negation)
+
+# Bump when the layout of lexicon_tables changes
+TABLES_FORMAT = 1
+
+# This process's scorer for score_posts(), created on first use
+_process_scorer = None
+
+
+def lexicon_tables(analyzer):
+    """
+    Vocabulary and per-id rule tables of an analyzer as flat arrays
+    - words / word_ids: UTF-8 vocabulary, sorted for binary search, and ids
+    - valence, in_lexicon, booster, is_booster, negate: indexed by id
+    - emoji_keys / emoji_offsets / emoji_text: sorted emojis and their
+      descriptions as one UTF-8 blob
+    """
+    lexicon = analyzer.lexicon
+    words = list(dict.fromkeys(
+        list(lexicon) + list(BOOSTER_DICT) + NEGATE + RULE_WORDS
+        + [word for phrase in IDIOM_PHRASES for word in phrase.split()]
+    ))
+    size = len(words) + 3
+
+    valence = np.zeros(size)
+    in_lexicon = np.zeros(size, dtype=bool)
+    booster = np.zeros(size)
+    negate = np.zeros(size, dtype=bool)
+    negate[UNKNOWN_NT_ID] = True
+
+    negate_words = set(NEGATE)
+    for i, word in enumerate(words, start=3):
+        if word in lexicon:
+            valence[i] = lexicon[word]
+            in_lexicon[i] = True
+        booster[i] = BOOSTER_DICT.get(word, 0.0)
+        negate[i] = word in negate_words or "n't" in word
+
+    encoded = np.array([word.encode('utf-8') for word in words])
+    order = np.argsort(encoded, kind='stable')
+
+    emojis = sorted(analyzer.emojis.items(), key=lambda item: item[0].encode('utf-8'))
+    descriptions = [description.encode('utf-8') for _, description in emojis]
+    emoji_offsets = np.zeros(len(emojis) + 1, dtype=np.int64)
+    emoji_offsets[1:] = np.cumsum([len(d) for d in descriptions])
+
+    return {
+        'words': encoded[order],
+        'word_ids': (order + 3).astype(np.int32),
+        'valence': valence,
+        'in_lexicon': in_lexicon,
+        'booster': booster,
+        'is_booster': booster != 0,
+        'negate': negate,
+        'emoji_keys': np.array([key.encode('utf-8') for key, _ in emojis]),
+        'emoji_offsets': emoji_offsets,
+        'emoji_text': np.frombuffer(b''.join(descriptions), dtype=np.uint8),
+    }
+
+
+def _round(values, digits):
+    """
+    Python round() of every value, as a float array
+    """
+    return np.array([round(value, digits) for value in values.tolist()], dtype=float)
+
+
+def _find(keys, key):
+    """
+    Position of key in a sorted fixed-width bytes array, or -1
+    """
+    if not key or len(key) > keys.dtype.itemsize:
+        return -1
+    i = int(keys.searchsorted(key))
+    if i < len(keys) and keys[i] == key:
+        return i
+    return -1
+
+
+class LexiconView(Mapping):
+    """
+    VADER lexicon (word -> valence) backed by lexicon_tables arrays
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.words = tables['words']
+        self.word_ids = tables['word_ids']
+        self.valence = tables['valence']
+        self.in_lexicon = tables['in_lexicon']
+
+    def _lookup(self, word):
+        """
+        (id, valence or None) of word; a binary search, so scoring code
+        should not call it per token (see BatchScorer)
+        """
+        i = _find(self.words, word.encode('utf-8'))
+        word_id = int(self.word_ids[i]) if i >= 0 else None
+        valence = float(self.valence[word_id]) if word_id is not None and self.in_lexicon[word_id] else None
+        return word_id, valence
+
+    def word_id(self, word, default=None):
+        word_id = self._lookup(word)[0]
+        return default if word_id is None else word_id
+
+    def __contains__(self, word):
+        return self._lookup(word)[1] is not None
+
+    def __getitem__(self, word):
+        valence = self._lookup(word)[1]
+        if valence is None:
+            raise KeyError(word)
+        return valence
+
+    def __iter__(self):
+        for word, word_id in zip(self.words, self.word_ids):
+            if self.in_lexicon[word_id]:
+                yield word.decode('utf-8')
+
+    def __len__(self):
+        return int(self.in_lexicon[self.word_ids].sum())
+
+
+class EmojiView(Mapping):
+    """
+    VADER emoji dictionary (emoji -> description) backed by lexicon_tables
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.keys_array = tables['emoji_keys']
+        self.offsets = tables['emoji_offsets']
+        self.text = tables['emoji_text']
+
+    def _index(self, key):
+        # VADER checks every character; ASCII is never an emoji
+        if key.isascii():
+            return -1
+        return _find(self.keys_array, key.encode('utf-8'))
+
+    def __contains__(self, key):
+        return self._index(key) >= 0
+
+    def __getitem__(self, key):
+        i = self._index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.text[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for key in self.keys_array:
+            yield key.decode('utf-8')
+
+    def __len__(self):
+        return len(self.keys_array)
+
+
+class SharedAnalyzer(SentimentIntensityAnalyzer):
+    """
+    SentimentIntensityAnalyzer that reads its lexicon and emojis from tables
+    instead of parsing its own copy of the lexicon files
+    polarity_scores() goes through a BatchScorer over the same tables, so
+    VADER's rules run on plain dicts rather than a lookup per rule in the views
+    """
+
+    def __init__(self, tables, scorer=None):
+        self.lexicon = LexiconView(tables)
+        self.emojis = EmojiView(tables)
+        self.scorer = scorer
+
+    def polarity_scores(self, text):
+        if self.scorer is None:
+            self.scorer = BatchScorer(self, self.lexicon.tables)
+        return self.scorer.polarity_scores(text)
+
+
+def shared_analyzer(tables):
+    """
+    SharedAnalyzer over tables
+    """
+    return SharedAnalyzer(tables)
+
+
+def lexicon_version():
+    """
+    Changes whenever the installed VADER lexicon files or the table layout do
+    """
+    directory = os.path.dirname(vader.__file__)
+    files = []
+    for name in ('vader_lexicon.txt', 'emoji_utf8_lexicon.txt'):
+        stat = os.stat(os.path.join(directory, name))
+        files.append(f'{name}:{stat.st_size}:{stat.st_mtime_ns}')
+    return fingerprint(TABLES_FORMAT, *files)
+
+
+def shared_scorer(state):
+    """
+    (analyzer, BatchScorer) over the 'lexicon' state of a SharedState,
+    built by whichever process gets there first
+    """
+    tables = state.load(
+        'lexicon', lexicon_version(),
+        lambda: (lexicon_tables(SentimentIntensityAnalyzer()), {})
+    )
+    analyzer = shared_analyzer(tables)
+    # One scorer (and token cache) for both
+    analyzer.scorer = BatchScorer(analyzer, tables)
+    return analyzer, analyzer.scorer
+
+
+def process_scorer():
+    """
+    BatchScorer of this process over the default shared state, for pool
+    processes (partitions, jobs) that score without the app
+    """
+    global _process_scorer
+    if _process_scorer is None:
+        from shared_state import default_state
+        _process_scorer = shared_scorer(default_state())[1]
+    return _process_scorer
+
+
+def score_posts(posts, scorer=None):
+    """
+    Posts with VADER sentiment and extracted topics added, scored in one
+    batch (by this process's scorer unless one is given)
+    """
+    analyses = (scorer or process_scorer()).analyze_batch([post['text'] for post in posts])
+    return [
+        {
+            **post,
+            'sentiment': analysis['sentiment'],
+            'sentiment_score': analysis['score'],
+            'topics': extract_topics(post['text'])
+        }
+        for post, analysis in zip(posts, analyses)
+    ]
+
+
+class BatchScorer:
+    """
+    Vectorized, VADER-compatible polarity scoring for lists of texts
+    """
+
+    def __init__(self, analyzer, tables=None):
+        self.analyzer = analyzer
+        self.emojis = analyzer.emojis
+        self._punctuation = string.punctuation
+        self._token_cache = {}
+        self._emoji_cache = {}
+
+        # Tables from shared memory, or built from the analyzer's dictionaries
+        self.tables = tables if tables is not None else lexicon_tables(analyzer)
+        self.vocab = LexiconView(self.tables)
+        self.valence = self.tables['valence']
+        self.in_lexicon = self.tables['in_lexicon']
+        self.booster = self.tables['booster']
+        self.is_booster = self.tables['is_booster']
+        self.negate = self.tables['negate']
+        self.words = self.tables['words']
+        self.word_ids = self.tables['word_ids']
+        self.rule_id = {word: self.vocab.word_id(word) for word in RULE_WORDS}
+        self.idiom_ids = [
+            [self.vocab.word_id(word) for word in phrase.split()] for phrase in IDIOM_PHRASES
+        ]
+
+    # --- tokenization ----------------------------------------------------
+
+    def _replace_emojis(self, text):
+        """
+        VADER's emoji-to-description pass (only needed for non-ASCII text)
+        """
+        # EmojiView is a binary search, so each character is looked up once
+        cache = self._emoji_cache
+        emojis = {}
+        for char in set(text):
+            if char.isascii():
+                continue
+            description = cache.get(char, False)
+            if description is False:
+                description = self.emojis.get(char)
+                if len(cache) >= EMOJI_CACHE_SIZE:
+                    cache.clear()
+                cache[char] = description
+            if description is not None:
+                emojis[char] = description
+        text_no_emoji = ''
+        prev_space = True
+        for char in text:
+            if char in emojis:
+                if not prev_space:
+                    text_no_emoji += ' '
+                text_no_emoji += emojis[char]
+                prev_space = False
+            else:
+                text_no_emoji += char
+                prev_space = char == ' '
+        return text_no_emoji
+
+    def tokenize(self, text):
+        """
+        Return (prepared text, tokens) exactly as VADER sees them
+        """
+        text, entries = self.prepare(text)
+        return text, [entry[3] for entry in entries]
+
+    def prepare(self, text):
+        """
+        Return (prepared text, token entries) exactly as VADER sees them
+        """
+        if not text.isascii():
+            text = self._replace_emojis(text)
+        text = text.strip()
+        return text, self._entries([text.split()])[0]
+
+    def _prepared(self, item):
+        if isinstance(item, Document):
+            return item.prepared
+        return self.prepare(item)
+
+    def _entries(self, token_lists):
+        """
+        Token entries for lists of raw tokens (one list per text); tokens
+        new to the cache are looked up together
+        """
+        cache = self._token_cache
+        missing = list(dict.fromkeys(
+            token for tokens in token_lists for token in tokens if token not in cache
+        ))
+        found = dict(zip(missing, self._token_entries(missing))) if missing else {}
+        cache_get = cache.get
+        entries = [[cache_get(token) or found[token] for token in tokens] for tokens in token_lists]
+        if found:
+            if len(cache) + len(found) > TOKEN_CACHE_SIZE:
+                cache.clear()
+            cache.update(islice(found.items(), TOKEN_CACHE_SIZE))
+        return entries
+
+    def _token_entries(self, tokens):
+        """
+        (lowercase word, vocabulary id, is ALL CAPS, word, lexicon valence
+        or None) for raw tokens, looked up together with one binary search
+        over the shared words array
+        """
+        words = []
+        for token in tokens:
+            stripped = token.strip(self._punctuation)
+            words.append(token if len(stripped) <= 2 else stripped)
+        lowers = [word.lower() for word in words]
+        word_ids = self._word_ids(lowers)
+        known = self.in_lexicon[word_ids].tolist()
+        valences = self.valence[word_ids].tolist()
+        return [
+            (lower, word_id, word.isupper(), word, valence if in_lexicon else None)
+            for lower, word_id, word, valence, in_lexicon in zip(lowers, word_ids.tolist(), words, valences, known)
+        ]
+
+    def _word_ids(self, lowers):
+        """
+        Vocabulary ids of lowercase words (unknown words: UNKNOWN_ID, or
+        UNKNOWN_NT_ID when they contain "n't")
+        """
+        encoded = [word.encode('utf-8') for word in lowers]
+        # Cast to the vocabulary's width so the search does not copy it;
+        # longer words are cut short and must not match
+        keys = np.array(encoded, dtype=self.words.dtype)
+        found = np.minimum(self.words.searchsorted(keys), len(self.words) - 1)
+        fits = np.array([len(key) <= self.words.dtype.itemsize for key in encoded])
+        unknown = np.where([("n't" in word) for word in lowers], UNKNOWN_NT_ID, UNKNOWN_ID)
+        return np.where(fits & (self.words[found] == keys), self.word_ids[found], unknown)
+
+    # --- scoring ---------------------------------------------------------
+
+    def polarity_scores(self, item):
+        """
+        analyzer.polarity_scores() for one text or Document
+        Words outside the lexicon score 0 in VADER, so only lexicon words go
+        through its sentiment_valence()
+        """
+        text, entries = self._prepared(item)
+        tokens = item.tokens if isinstance(item, Document) else [entry[3] for entry in entries]
+
+        sentitext = vader.SentiText.__new__(vader.SentiText)
+        sentitext.text = text
+        sentitext.words_and_emoticons = tokens
+        sentitext.is_cap_diff = vader.allcap_differential(tokens)
+
+        # VADER's rules only look up words of this text, so they get a plain
+        # dict of its lexicon words instead of the shared LexiconView
+        analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        analyzer.lexicon = {entry[0]: entry[4] for entry in entries if entry[4] is not None}
+
+        last = len(entries) - 1
+        sentiments = []
+        for i, (lower, _, _, word, valence) in enumerate(entries):
+            if (lower in BOOSTER_DICT or valence is None
+                    or (lower == 'kind' and i < last and entries[i + 1][0] == 'of')):
+                sentiments.append(0)
+            else:
+                sentiments = analyzer.sentiment_valence(0, sentitext, word, i, sentiments)
+
+        sentiments = analyzer._but_check(tokens, sentiments)
+        return analyzer.score_valence(sentiments, text)
+
+    def polarity_scores_batch(self, texts):
+        """
+        Return {'neg', 'neu', 'pos', 'compound'} as arrays aligned with texts
+        """
+        n_docs = len(texts)
+        ids = []
+        upper = []
+        lengths = np.zeros(n_docs, dtype=np.int64)
+        exclaims = np.zeros(n_docs)
+        questions = np.zeros(n_docs)
+        doc_tokens = []
+
+        prepared = []
+        for text in texts:
+            if not text.isascii():
+                text = self._replace_emojis(text)
+            prepared.append(text.strip())
+        # Tokens new to the cache are looked up in one search for the batch
+        for d, (text, entries) in enumerate(zip(prepared, self._entries([text.split() for text in prepared]))):
+            doc_tokens.append([entry[0] for entry in entries])
+            ids.extend([entry[1] for entry in entries])
+            upper.extend([entry[2] for entry in entries])
+            lengths[d] = len(entries)
+            exclaims[d] = text.count('!')
+            questions[d] = text.count('?')
+
+        ids = np.array(ids, dtype=np.int64)
+        upper = np.array(upper, dtype=bool)
+        total = len(ids)
+        doc = np.repeat(np.arange(n_docs), lengths)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if n_docs else np.zeros(0, dtype=np.int64)
+        pos = np.arange(total) - starts[doc] if total else np.zeros(0, dtype=np.int64)
+        doc_len = lengths[doc]
+
+        # Some, but not all, tokens of the text are ALL CAPS
+        n_upper = np.bincount(doc, weights=upper, minlength=n_docs)
+        cap_diff = ((n_upper > 0) & (n_upper < lengths))[doc]
+
+        def shifted(values, k, fill):
+            # values of the token k positions earlier (k < 0: later) in the same text
+            out = np.full(total, fill, dtype=values.dtype)
+            if k > 0:
+                out[k:] = values[:-k] if k < total else out[k:]
+                out[pos < k] = fill
+            else:
+                out[:k] = values[-k:] if -k < total else out[:k]
+                out[pos >= doc_len + k] = fill
+            return out
+
+        p1, p2, p3 = (shifted(ids, k, PAD_ID) for k in (1, 2, 3))
+        n1 = shifted(ids, -1, PAD_ID)
+        u1, u2, u3 = (shifted(upper, k, False) for k in (1, 2, 3))
+        rule = self.rule_id
+        so_this = [rule['so'], rule['this']]
+
+        # Only lexicon words that are not themselves boosters or "kind of" score
+        active = self.in_lexicon[ids] & ~self.is_booster[ids] & ~((ids == rule['kind']) & (n1 == rule['of']))
+
+        base = self.valence[ids]
+        v = base.copy()
+
+        # "no" directly before a lexicon word negates it instead of scoring
+        v[(ids == rule['no']) & self.in_lexicon[n1]] = 0.0
+        neg_no = ((p1 == rule['no']) | (p2 == rule['no'])
+                  | ((p3 == rule['no']) & np.isin(p1, [rule['or'], rule['nor']])))
+        v = np.where(neg_no, base * N_SCALAR, v)
+
+        # ALL CAPS emphasis
+        v = np.where(upper & cap_diff, np.where(v > 0, v + C_INCR, v - C_INCR), v)
+
+        # Boosters and negations in the three preceding words
+        for k, prev, prev_upper, damp in ((1, p1, u1, 1.0), (2, p2, u2, 0.95), (3, p3, u3, 0.9)):
+            gate = (pos >= k) & ~self.in_lexicon[prev]
+
+            scalar = self.booster[prev]
+            scalar = np.where(v < 0, -scalar, scalar)
+            scalar = np.where(self.is_booster[prev] & prev_upper & cap_diff,
+                              np.where(v > 0, scalar + C_INCR, scalar - C_INCR), scalar)
+            v = np.where(gate, v + scalar * damp, v)
+
+            if k == 1:
+                v = np.where(gate & self.negate[p1], v * N_SCALAR, v)
+            elif k == 2:
+                never_so = (p2 == rule['never']) & np.isin(p1, so_this)
+                without_doubt = (p2 == rule['without']) & (p1 == rule['doubt'])
+                v = np.where(gate & never_so, v * 1.25,
+                             np.where(gate & ~never_so & ~without_doubt & self.negate[p2], v * N_SCALAR, v))
+            else:
+                never_so = ((p3 == rule['never']) & np.isin(p2, so_this)) | np.isin(p1, so_this)
+                without_doubt = (p3 == rule['without']) & ((p2 == rule['doubt']) | (p1 == rule['doubt']))
+                v = np.where(gate & never_so, v * 1.25,
+                             np.where(gate & ~never_so & ~without_doubt & self.negate[p3], v * N_SCALAR, v))
+                self._apply_idioms(v, ids, pos, doc, doc_tokens, gate & active)
+
+        # "least" as a negation (but not "at least" / "very least")
+        least = ~self.in_lexicon[p1] & (p1 == rule['least'])
+        v = np.where(least & (pos > 1) & ~np.isin(p2, [rule['at'], rule['very']]), v * N_SCALAR, v)
+        v = np.where(least & (pos == 1), v * N_SCALAR, v)
+
+        v = np.where(active, v, 0.0)
+        self._apply_but(v, ids, doc, starts, lengths, doc_tokens)
+
+        return self._aggregate(v, doc, lengths, exclaims, questions)
+
+    def _apply_idioms(self, v, ids, pos, doc, doc_tokens, candidates):
+        """
+        VADER's special idiom check, only at tokens near a matching phrase
+        """
+        total = len(ids)
+        phrase_start = np.zeros(total, dtype=bool)
+        for phrase in self.idiom_ids:
+            match = np.ones(total, dtype=bool)
+            for offset, word_id in enumerate(phrase):
+                following = np.zeros(total, dtype=bool)
+                following[:total - offset] = ids[offset:] == word_id
+                match &= following
+            phrase_start |= match
+
+        # Phrases that start between 3 words before and the token itself
+        near = phrase_start.copy()
+        for k in (1, 2, 3):
+            near[k:] |= phrase_start[:-k] if k < total else False
+        for t in np.flatnonzero(candidates & near):
+            d = doc[t]
+            v[t] = SentimentIntensityAnalyzer._special_idioms_check(v[t], doc_tokens[d], int(pos[t]))
+
+    def _apply_but(self, v, ids, doc, starts, lengths, doc_tokens):
+        """
+        VADER's contrastive "but" rule, for texts that contain "but"
+        """
+        for d in np.unique(doc[ids == self.rule_id['but']]):
+            start, end = starts[d], starts[d] + lengths[d]
+            sentiments = SentimentIntensityAnalyzer._but_check(doc_tokens[d], v[start:end].tolist())
+            v[start:end] = sentiments
+
+    @staticmethod
+    def _aggregate(v, doc, lengths, exclaims, questions):
+        n_docs = len(lengths)
+        sum_s = np.bincount(doc, weights=v, minlength=n_docs)
+
+        # Punctuation emphasis: up to 4 "!", and 2+ "?"
+        amplifier = np.minimum(exclaims, 4) * 0.292
+        amplifier += np.where(questions > 3, 0.96, np.where(questions > 1, questions * 0.18, 0.0))
+
+        sum_s = np.where(sum_s > 0, sum_s + amplifier, np.where(sum_s < 0, sum_s - amplifier, sum_s))
+        compound = np.clip(sum_s / np.sqrt(sum_s * sum_s + 15), -1.0, 1.0)
+
+        pos_sum = np.bincount(doc, weights=np.where(v > 0, v + 1, 0.0), minlength=n_docs)
+        neg_sum = np.bincount(doc, weights=np.where(v < 0, v - 1, 0.0), minlength=n_docs)
+        neu_count = np.bincount(doc, weights=(v == 0), minlength=n_docs)
+
+        pos_wins = pos_sum > np.abs(neg_sum)
+        neg_wins = pos_sum < np.abs(neg_sum)
+        pos_sum = np.where(pos_wins, pos_sum + amplifier, pos_sum)
+        neg_sum = np.where(neg_wins, neg_sum - amplifier, neg_sum)
+        total = pos_sum + np.abs(neg_sum) + neu_count
+
+        empty = lengths == 0
+        safe_total = np.where(empty, 1.0, total)
+        # Rounded with Python's round(), as VADER's score_valence does:
+        # np.round scales and rounds, which differs on some halfway values
+        return {
+            'neg': _round(np.where(empty, 0.0, np.abs(neg_sum / safe_total)), 3),
+            'neu': _round(np.where(empty, 0.0, np.abs(neu_count / safe_total)), 3),
+            'pos': _round(np.where(empty, 0.0, np.abs(pos_sum / safe_total)), 3),
+            'compound': _round(np.where(empty, 0.0, compound), 4)
+        }
+
+    def analyze_batch(self, texts):
+        """
+        Same result dicts as analyze_sentiment(), for a list of texts
+        """
+        scores = self.polarity_scores_batch(texts)
+        compound = scores['compound']
+        labels = np.where(compound >= POSITIVE_THRESHOLD, 'positive',
+                          np.where(compound <= NEGATIVE_THRESHOLD, 'negative', 'neutral'))
+        # Same Python round() as classify_scores, so results match /api/analyze exactly
+        rounded = {key: [round(value, 2) for value in values.tolist()] for key, values in scores.items()}
+        return [
+            {
+                'score': rounded['compound'][i],
+                'sentiment': str(labels[i]),
+                'positive': rounded['pos'][i],
+                'negative': rounded['neg'][i],
+                'neutral': rounded['neu'][i]
+            }
+            for i in range(len(texts))
+        ]
@@ -0,0 +1,571 @@
+"""
+Performance Benchmarks
+Compares the optimized data paths against the original implementations
+
+Usage:
+    python benchmark.py storage --rows 1000000
+    python benchmark.py alerts --posts 1000000
+    python benchmark.py serialization
+    python benchmark.py scorer
+    python benchmark.py columnar --rows 1000000
+    python benchmark.py search --posts 1000000
+    python benchmark.py preprocess
+    python benchmark.py memory
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+TOPICS = ['permits', 'funding', 'training', 'taxes', 'support']
+SENTIMENTS = ['positive', 'negative', 'neutral']
+SOURCES = ['twitter', 'reddit', 'facebook']
+
+
+def timed(fn, repeat=3):
+    """
+    Best-of-N wall time of fn() in milliseconds, plus its last result
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, result
+
+
+def synthetic_posts(rows, seed=42):
+    """
+    Simple labelled posts for benchmarking
+    """
+    rng = random.Random(seed)
+    for i in range(rows):
+        yield {
+            'id': f'bench_{i}',
+            'text': f'Benchmark post {i} about {rng.choice(TOPICS)}',
+            'sentiment': rng.choice(SENTIMENTS),
+            'topic': rng.choice(TOPICS),
+            'source': rng.choice(SOURCES),
+            'timestamp': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z'
+        }
+
+
+def bench_storage(args):
+    """
+    JSON file scan vs SQLite pushdown for statistics and filtered pages
+    """
+    from storage import SQLiteStore
+
+    workdir = tempfile.mkdtemp(prefix='bench_storage_')
+    json_path = os.path.join(workdir, 'posts.json')
+    db_path = os.path.join(workdir, 'posts.db')
+
+    print(f"📦 Building {args.rows:,} posts in {workdir}...")
+    posts = list(synthetic_posts(args.rows))
+    with open(json_path, 'w') as f:
+        json.dump(posts, f)
+
+    store = SQLiteStore(db_path)
+    insert_ms, _ = timed(lambda: store.insert_posts(posts), repeat=1)
+    del posts
+    print(f"  SQLite bulk insert: {insert_ms:,.0f} ms")
+
+    def json_statistics():
+        # Mirrors the JSON path of /api/statistics
+        with open(json_path) as f:
+            data = json.load(f)
+        sentiments = [p.get('sentiment', 'neutral') for p in data]
+        topics = [p.get('topic', 'general') for p in data]
+        return {
+            'sentiment_breakdown': {s: sentiments.count(s) for s in SENTIMENTS},
+            'topic_breakdown': {t: topics.count(t) for t in set(topics)}
+        }
+
+    def json_filtered_page():
+        with open(json_path) as f:
+            data = json.load(f)
+        matches = [p for p in data if p['topic'] == 'permits' and p['sentiment'] == 'negative']
+        return matches[1000:1020]
+
+    results = [
+        ('statistics', timed(json_statistics, args.repeat)[0],
+         timed(store.statistics, args.repeat)[0]),
+        ('statistics?topic=permits', None,
+         timed(lambda: store.statistics(topic='permits'), args.repeat)[0]),
+        ('posts?topic=permits&sentiment=negative&offset=1000', timed(json_filtered_page, args.repeat)[0],
+         timed(lambda: store.fetch_posts(1000, 20, topic='permits', sentiment='negative'), args.repeat)[0]),
+    ]
+
+    print(f"\n{'query':<52}{'json ms':>12}{'sqlite ms':>12}")
+    for name, json_ms, sqlite_ms in results:
+        json_text = f'{json_ms:,.1f}' if json_ms is not None else '-'
+        print(f"{name:<52}{json_text:>12}{sqlite_ms:>12,.1f}")
+
+    store.close()
+    shutil.rmtree(workdir)
+
+
+def bench_alerts(args):
+    """
+    Replay a synthetic stream with an injected permits spike through the
+    spike detector and report its ingest rate
+    """
+    from alerts import SpikeDetector
+
+    rng = random.Random(7)
+    spike_start = args.posts // 2
+    spike_end = spike_start + args.posts // 100
+    stream = []
+    for i in range(args.posts):
+        topic = rng.choice(TOPICS)
+        negative_rate = 0.8 if topic == 'permits' and spike_start <= i < spike_end else 0.25
+        stream.append({
+            'topic': topic,
+            'source': rng.choice(SOURCES),
+            'sentiment': 'negative' if rng.random() < negative_rate else rng.choice(['positive', 'neutral'])
+        })
+
+    detector = SpikeDetector()
+    first_alert = None
+    start = time.perf_counter()
+    for i, post in enumerate(stream):
+        detector.observe(post)
+        if first_alert is None and i >= spike_start and i % 100 == 0:
+            if any(a['topic'] == 'permits' for a in detector.anomalies()):
+                first_alert = i
+    elapsed = time.perf_counter() - start
+
+    print(f"📈 Replayed {args.posts:,} posts in {elapsed:.2f} s ({args.posts / elapsed:,.0f} posts/s)")
+    if first_alert is None:
+        print("  ✗ Injected permits spike was not detected")
+    else:
+        print(f"  ✓ Permits spike injected at post {spike_start:,}, flagged by post {first_alert:,}")
+
+
+def bench_serialization(args):
+    """
+    Per-endpoint response encoding cost: stdlib json vs the fast serializer
+    """
+    import gzip
+    import backend_api
+    from serialization import dumps_bytes, orjson
+
+    posts = list(synthetic_posts(args.posts))
+    for post in posts:
+        post['sentiment_score'] = 0.42
+    recommend = backend_api.recommend_resources('I need a food truck permit and a small business loan',
+                                                ['permits', 'funding'])
+    payloads = {
+        f'/api/posts?count={args.posts}': {'posts': posts, 'total': len(posts)},
+        '/api/statistics': {
+            'total_posts': 1000000,
+            'sentiment_breakdown': {'positive': 500000, 'negative': 300000, 'neutral': 200000},
+            'topic_breakdown': {t: 200000 for t in TOPICS},
+            'overall_sentiment_percentage': 50.0
+        },
+        '/api/recommend': {'query': '...', 'topics': ['permits', 'funding'], 'recommendations': recommend},
+        '/api/resources': {'resources': backend_api.RESOURCES},
+    }
+
+    def stdlib(obj):
+        # What jsonify did before: the stdlib encoder with sorted keys
+        return json.dumps(obj, sort_keys=True).encode('utf-8')
+
+    print(f"{'endpoint':<28}{'bytes':>10}{'gzip':>10}{'json µs':>12}{'fast µs':>12}{'speedup':>10}")
+    for name, payload in payloads.items():
+        body = stdlib(payload)
+        slow_ms, _ = timed(lambda: stdlib(payload), args.repeat)
+        fast_ms, _ = timed(lambda: dumps_bytes(payload, sort_keys=True), args.repeat)
+        print(f"{name:<28}{len(body):>10,}{len(gzip.compress(body, 5)):>10,}"
+              f"{slow_ms * 1000:>12,.0f}{fast_ms * 1000:>12,.0f}{slow_ms / fast_ms:>9.1f}x")
+
+    print(f"\nFast serializer: {'orjson' if orjson is not None else 'stdlib json (orjson not installed)'}")
+    print("/api/resources and / are now precomputed: 0 µs per request")
+
+
+def golden_texts():
+    """
+    Texts of real_data.json plus both mock post generators
+    """
+    import backend_api
+    from data_scraper import generate_mock_data
+
+    with open('real_data.json') as f:
+        golden = [post['text'] for post in json.load(f)]
+    random.seed(0)
+    golden += [post['text'] for post in backend_api.generate_mock_posts(200)]
+    golden += [post['text'] for post in generate_mock_data(200)]
+    return golden
+
+
+def fuzz_texts(count, seed=0):
+    """
+    Random texts built from VADER's own lexicon, boosters, negations,
+    emojis, ALL CAPS and punctuation, so every scoring rule is exercised
+    """
+    from vaderSentiment.vaderSentiment import BOOSTER_DICT, NEGATE, SPECIAL_CASES, SentimentIntensityAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer()
+    rng = random.Random(seed)
+    lexicon = sorted(analyzer.lexicon)
+    words = (lexicon + sorted(BOOSTER_DICT) + NEGATE + sorted(SPECIAL_CASES)
+             + ['but', 'no', 'least', 'at', 'very', 'kind', 'of', 'never', 'so', 'this', 'without', 'doubt']
+             + ['permit', 'grant', 'business', 'county', 'the', 'a', 'is', 'my', 'and'] * 20)
+    emojis = sorted(analyzer.emojis)
+    texts = []
+    for _ in range(count):
+        tokens = []
+        for _ in range(rng.randint(1, 20)):
+            token = rng.choice(emojis) if rng.random() < 0.05 else rng.choice(words)
+            if rng.random() < 0.1:
+                token = token.upper()
+            if rng.random() < 0.15:
+                token += rng.choice(['!', '!!', '?', '??', '.', ',', '...', ':)'])
+            tokens.append(token)
+        texts.append(' '.join(tokens))
+    return texts
+
+
+def bench_scorer(args):
+    """
+    analyze_sentiment and the batch scorer vs stock VADER on a golden set
+    built from real_data.json, both mock post generators and seeded fuzz
+    texts; fails unless
+    every result (score, label and pos/neg/neu shares) is identical
+    """
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    import backend_api
+
+    golden = golden_texts() + fuzz_texts(args.fuzz)
+
+    # Both API paths score with this repo's own VADER code, so the reference
+    # is an unmodified analyzer with its own lexicon
+    reference = SentimentIntensityAnalyzer()
+    expected = [backend_api.classify_scores(reference.polarity_scores(text)) for text in golden]
+    mismatches = 0
+    for name, actual in (('analyze_sentiment', [backend_api.analyze_sentiment(text) for text in golden]),
+                         ('analyze_sentiment_batch', backend_api.analyze_sentiment_batch(golden))):
+        differing = [(text, e, a) for text, e, a in zip(golden, expected, actual) if e != a]
+        print(f"🎯 Golden set, {name}: {len(golden)} texts, {len(differing)} results differ from VADER")
+        for text, e, a in differing[:5]:
+            print(f"  {text[:60]!r}: expected {e}, got {a}")
+        mismatches += len(differing)
+
+    texts = (golden * (args.texts // len(golden) + 1))[:args.texts]
+    single_ms, _ = timed(lambda: [backend_api.analyze_sentiment(t) for t in texts], args.repeat)
+    batch_ms, _ = timed(lambda: backend_api.analyze_sentiment_batch(texts), args.repeat)
+    print(f"  analyze_sentiment x{len(texts):,}: {single_ms:,.0f} ms")
+    print(f"  analyze_sentiment_batch:      {batch_ms:,.0f} ms ({single_ms / batch_ms:.1f}x faster)")
+
+    if mismatches:
+        raise SystemExit("❌ Sentiment scoring does not match VADER")
+
+
+def bench_preprocess(args):
+    """
+    /api/recommend work per query: stock VADER and every stage preparing
+    the raw text itself vs one shared Document; fails on any mismatch
+    """
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    import backend_api as api
+
+    golden = golden_texts()
+    texts = (golden * (args.texts // len(golden) + 1))[:args.texts]
+    catalog = api.county_catalog(api.DEFAULT_COUNTY)
+    # The API's analyzer reads shared lexicon tables; the baseline is VADER as shipped
+    stock = SentimentIntensityAnalyzer()
+
+    def separate(text):
+        topics = api.extract_topics(text)
+        return stock.polarity_scores(text), topics, api.recommend_resources(text, topics, catalog)
+
+    def shared(text):
+        doc = api.preprocess(text)
+        topics = api.extract_topics(doc)
+        return api.batch_scorer.polarity_scores(doc), topics, api.recommend_resources(doc, topics, catalog)
+
+    if [separate(text) for text in golden] != [shared(text) for text in golden]:
+        raise SystemExit("❌ Shared preprocessing changed a sentiment, topic or recommendation")
+
+    # Interleaved, so a busy machine slows both paths alike
+    separate_ms = shared_ms = float('inf')
+    for _ in range(args.repeat):
+        separate_ms = min(separate_ms, timed(lambda: [separate(text) for text in texts], repeat=1)[0])
+        shared_ms = min(shared_ms, timed(lambda: [shared(text) for text in texts], repeat=1)[0])
+
+    n = len(texts)
+    print(f"🧾 {n:,} texts from the golden set\n")
+    print(f"{'path':<34}{'separate µs':>13}{'shared µs':>13}{'saved':>8}")
+    name = 'sentiment + topics + recommend'
+    print(f"{name:<34}{separate_ms * 1000 / n:>13.1f}{shared_ms * 1000 / n:>13.1f}{1 - shared_ms / separate_ms:>8.0%}")
+
+
+def _private_bytes():
+    """
+    Private dirty memory of this process (Linux): the part of its unique set
+    size it wrote itself. Clean library pages are left out: in a one-process
+    run they look private, but every worker of a server maps the same ones
+    """
+    with open('/proc/self/smaps_rollup') as f:
+        return sum(int(line.split()[1]) * 1024 for line in f if line.startswith('Private_Dirty:'))
+
+
+def _memory_worker(kind, texts, measure):
+    """
+    Runs in a fresh process: the heap bytes (measure='heap') or private
+    bytes (measure='private') one worker keeps for its scorer ('stock',
+    'shared') or for the whole app ('app') after scoring texts. The two are
+    measured in separate runs, since tracing the heap costs private memory
+    """
+    import gc
+    import tracemalloc
+
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    from batch_scorer import shared_scorer
+    from shared_state import default_state
+
+    gc.collect()
+    private = _private_bytes()
+    if measure == 'heap':
+        tracemalloc.start()
+    if kind == 'stock':
+        analyzer = SentimentIntensityAnalyzer()
+        scores = [analyzer.polarity_scores(text) for text in texts]
+    elif kind == 'shared':
+        analyzer, _ = shared_scorer(default_state())
+        scores = [analyzer.polarity_scores(text) for text in texts]
+    else:
+        import backend_api as api
+        client = api.app.test_client()
+        for county in api.COUNTIES:
+            client.post('/api/recommend', json={'query': texts[0], 'county': county})
+            client.get(f'/api/resources?county={county}')
+        scores = [client.post('/api/analyze', json={'text': text}).status_code for text in texts]
+    # Only what the worker keeps counts, not the results it returned
+    del scores
+    gc.collect()
+    if measure == 'heap':
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return heap
+    return _private_bytes() - private
+
+
+def bench_memory(args):
+    """
+    Private memory each worker keeps after scoring the same texts one at a
+    time (as /api/analyze does): stock VADER (its own lexicon dicts) vs the
+    batch scorer over the shared lexicon tables, plus a whole app worker;
+    each is measured in a fresh process. Fails if the shared scorer keeps
+    more heap or private memory than stock VADER
+    """
+    import multiprocessing
+
+    from batch_scorer import shared_scorer
+    from shared_state import default_state
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        raise SystemExit("❌ Private memory is read from /proc/self/smaps_rollup (Linux only)")
+
+    # Publish the shared tables first, so workers attach instead of building
+    shared_scorer(default_state())
+    texts = (golden_texts() * (args.texts // len(golden_texts()) + 1))[:args.texts]
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for kind in ('stock', 'shared', 'app'):
+            results[kind] = tuple(
+                min(pool.apply(_memory_worker, (kind, texts, measure)) for _ in range(args.repeat))
+                for measure in ('heap', 'private')
+            )
+
+    print(f"{'per worker':<34}{'heap MB':>10}{'private MB':>13}")
+    for kind, label in (('stock', 'stock VADER analyzer'), ('shared', 'shared-table batch scorer'),
+                        ('app', 'app worker (requests served)')):
+        heap, private = results[kind]
+        print(f"{label:<34}{heap / 1e6:>10.2f}{private / 1e6:>13.2f}")
+
+    if results['shared'][0] > results['stock'][0] or results['shared'][1] > results['stock'][1]:
+        raise SystemExit("❌ The shared scorer keeps more private memory per worker than stock VADER")
+
+
+def bench_columnar(args):
+    """
+    CSV export vs Parquet export, and statistics from JSON vs Parquet columns
+    """
+    import pandas as pd
+    from columnar import aggregate_parquet, write_posts
+    from partitions import aggregate_posts
+
+    workdir = tempfile.mkdtemp(prefix='bench_columnar_')
+    json_path = os.path.join(workdir, 'posts.json')
+    csv_path = os.path.join(workdir, 'posts.csv')
+    parquet_path = os.path.join(workdir, 'posts.parquet')
+
+    print(f"📦 Building {args.rows:,} posts in {workdir}...")
+    posts = list(synthetic_posts(args.rows))
+    with open(json_path, 'w') as f:
+        json.dump(posts, f)
+
+    csv_ms, _ = timed(lambda: pd.DataFrame(posts).to_csv(csv_path, index=False), repeat=1)
+    parquet_ms, _ = timed(lambda: write_posts(posts, parquet_path), repeat=1)
+    del posts
+
+    def json_statistics():
+        with open(json_path) as f:
+            return aggregate_posts(json.load(f))
+
+    json_stats_ms, expected = timed(json_statistics, args.repeat)
+    parquet_stats_ms, actual = timed(lambda: aggregate_parquet(parquet_path), args.repeat)
+
+    print(f"\n{'step':<28}{'baseline ms':>14}{'parquet ms':>14}")
+    print(f"{'export (csv vs parquet)':<28}{csv_ms:>14,.0f}{parquet_ms:>14,.0f}")
+    print(f"{'statistics (json vs cols)':<28}{json_stats_ms:>14,.1f}{parquet_stats_ms:>14,.1f}")
+    print(f"\n{'file':<28}{'MB':>14}")
+    for path in (json_path, csv_path, parquet_path):
+        print(f"{os.path.basename(path):<28}{os.path.getsize(path) / 1e6:>14,.1f}")
+
+    shutil.rmtree(workdir)
+    if actual != expected:
+        raise SystemExit("❌ Parquet statistics do not match the JSON aggregate")
+
+
+def bench_search(args):
+    """
+    Inverted-index search vs scanning the corpus, on synthetic posts with a
+    Zipf filler vocabulary; reports the slowest query and every query over
+    the p99 target
+    """
+    from corpus import MappedCorpus
+    from search import CorpusSource, SearchIndex
+    from shared_state import SharedState
+    from synthetic_data import SyntheticCorpus, write_jsonl
+
+    workdir = tempfile.mkdtemp(prefix='bench_search_')
+    jsonl_path = os.path.join(workdir, 'posts.jsonl')
+    index_path = os.path.join(workdir, 'posts.idx')
+    print(f"📦 Generating {args.posts:,} posts ({args.vocabulary:,} filler words) in {workdir}...")
+    generator = SyntheticCorpus(seed=42, vocabulary=args.vocabulary)
+    write_jsonl(generator, args.posts, jsonl_path, index_path)
+    corpus = MappedCorpus(jsonl_path, index_path)
+
+    index = SearchIndex('bench', CorpusSource(corpus), SharedState(workdir, enabled=False))
+    build_ms, _ = timed(index.catch_up, repeat=1)
+    stats = index.stats()
+    print(f"🔎 Index built in {build_ms / 1000:,.1f} s: {stats['main_terms']:,} terms, "
+          f"{stats['main_bytes'] / 1e6:,.0f} MB")
+
+    queries = [
+        ('"food truck"', {}),
+        ('"food truck"', {'sentiment': 'negative'}),
+        ('perm*', {}),
+        ('grant portal', {'topic': 'funding'}),
+        ('"business license" renew*', {}),
+        ('business', {}),
+        ('small business', {}),
+        ('business', {'sentiment': 'negative'}),
+    ]
+    if args.vocabulary:
+        # The most frequent filler words are in most posts, often repeated
+        words = generator.words
+        queries += [
+            (words[0], {}),
+            (f'{words[0]} {words[1]}', {}),
+            (f'business {words[0]}', {}),
+            (f'business {words[0]}', {'sentiment': 'negative'}),
+            (f'{words[0]} {words[1]}', {'source': 'reddit'}),
+            (f'{words[0]} {words[1]} {words[2]}', {}),
+            (f'{words[0]} {words[1]} {words[2]}', {'sentiment': 'negative'}),
+            (f'"{words[0]} {words[1]}"', {}),
+            (f'{words[0][:2]}*', {}),
+            (words[min(100, len(words) - 1)], {}),
+        ]
+
+    scan_ms, _ = timed(lambda: sum('food truck' in post['text'].lower() for post in corpus), repeat=1)
+    print(f"\n{'query':<32}{'filters':<24}{'matches':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    worst = None
+    over = []
+    for query, filters in queries:
+        latencies = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            _, matches, exact = index.search(query, filters, offset=0, count=20)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        shown = f"{matches:,}" if exact else f"≥{matches:,}"
+        print(f"{query:<32}{json.dumps(filters):<24}{shown:>10}{latencies[len(latencies) // 2]:>9.2f}{p99:>9.2f}")
+        if worst is None or p99 > worst[2]:
+            worst = (query, filters, p99)
+        if p99 > args.p99_ms:
+            over.append(f"{query} {json.dumps(filters)}")
+    print(f"\nSlowest: {worst[0]} {json.dumps(worst[1])} at p99 {worst[2]:.2f} ms")
+    print(f"Over the {args.p99_ms:g} ms p99 target: {len(over)} of {len(queries)} queries"
+          + ''.join(f"\n  {query}" for query in over))
+    print(f"Baseline: scanning every post for \"food truck\" takes {scan_ms:,.0f} ms")
+
+    shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the sentiment platform data paths')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    storage = subparsers.add_parser('storage', help='JSON file vs SQLite storage backend')
+    storage.add_argument('--rows', type=int, default=1000000)
+    storage.add_argument('--repeat', type=int, default=3)
+    storage.set_defaults(func=bench_storage)
+
+    alerts = subparsers.add_parser('alerts', help='Spike detector replay throughput')
+    alerts.add_argument('--posts', type=int, default=1000000)
+    alerts.set_defaults(func=bench_alerts)
+
+    serialization = subparsers.add_parser('serialization', help='Response serialization cost per endpoint')
+    serialization.add_argument('--posts', type=int, default=1000)
+    serialization.add_argument('--repeat', type=int, default=20)
+    serialization.set_defaults(func=bench_serialization)
+
+    scorer = subparsers.add_parser('scorer', help='Batch VADER scorer accuracy and speedup')
+    scorer.add_argument('--texts', type=int, default=50000)
+    scorer.add_argument('--repeat', type=int, default=3)
+    scorer.add_argument('--fuzz', type=int, default=20000)
+    scorer.set_defaults(func=bench_scorer)
+
+    preprocess = subparsers.add_parser('preprocess', help='Per-stage vs shared text preprocessing')
+    preprocess.add_argument('--texts', type=int, default=20000)
+    preprocess.add_argument('--repeat', type=int, default=5)
+    preprocess.set_defaults(func=bench_preprocess)
+
+    memory = subparsers.add_parser('memory', help='Private memory per worker: stock VADER vs shared scorer')
+    memory.add_argument('--texts', type=int, default=20000)
+    memory.add_argument('--repeat', type=int, default=3)
+    memory.set_defaults(func=bench_memory)
+
+    columnar = subparsers.add_parser('columnar', help='CSV vs Parquet export and column-only statistics')
+    columnar.add_argument('--rows', type=int, default=1000000)
+    columnar.add_argument('--repeat', type=int, default=3)
+    columnar.set_defaults(func=bench_columnar)
+
+    search = subparsers.add_parser('search', help='Full-text search latency vs a corpus scan')
+    search.add_argument('--posts', type=int, default=1000000)
+    search.add_argument('--repeat', type=int, default=50)
+    search.add_argument('--p99-ms', type=float, default=10.0, help='p99 latency target per query')
+    search.add_argument('--vocabulary', type=int, default=50000,
+                        help='Filler words with Zipf frequencies added to posts (0 = templates only)')
+    search.set_defaults(func=bench_search)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
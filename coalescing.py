@@ -0,0 +1,103 @@
+"""
+Request Coalescing (single-flight)
+Concurrent identical computations share one in-flight execution
+
+The first caller for a key runs the computation; callers that arrive with
+the same key while it is running wait for it and receive the same result
+(or the same exception). Nothing is cached: once the computation finishes
+the next caller runs it again, so results are never staler than a normal
+request.
+
+Counters per computation name (the first element of the key):
+- calls: every call
+- executions: calls that actually ran the computation
+- shared: calls that waited for another caller's execution instead
+- errors: executions that raised
+- saved_seconds: execution time of shared runs times their waiters, i.e.
+  CPU time the waiters would otherwise have spent
+"""
+
+import threading
+import time
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+def _empty_counters():
+    return {'calls': 0, 'executions': 0, 'shared': 0, 'errors': 0, 'saved_seconds': 0.0}
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with equal keys
+    Keys are hashable tuples whose first element names the computation
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Return fn(*args, **kwargs), sharing one execution with concurrent
+        callers of the same key
+        """
+        name = key[0]
+        with self._lock:
+            counters = self._counters.get(name)
+            if counters is None:
+                counters = self._counters[name] = _empty_counters()
+            counters['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                counters['executions'] += 1
+            else:
+                call.waiters += 1
+                counters['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        start = time.perf_counter()
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                del self._calls[key]
+                if call.error is not None:
+                    counters['errors'] += 1
+                counters['saved_seconds'] += elapsed * call.waiters
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """
+        Copy of the counters per computation name
+        """
+        with self._lock:
+            return {
+                name: {**counters, 'saved_seconds': round(counters['saved_seconds'], 3)}
+                for name, counters in self._counters.items()
+            }
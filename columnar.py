@@ -0,0 +1,244 @@
+"""
+Columnar Post Storage (Parquet / Arrow)
+Typed, dictionary-encoded post files that can be read one column at a time
+
+- sentiment, topic, source and county are dictionary-encoded (int32 codes
+  plus a dictionary, so free-form values such as source never overflow the
+  code type) instead of repeated strings
+- ParquetPostWriter buffers posts and writes a row group every
+  `row_group_size` posts, so posts can be streamed in without holding the
+  whole collection in memory
+- Readers project only the columns they need: statistics read sentiment and
+  topic (plus timestamp for trends), never the post text
+
+Requires pyarrow:
+    pip install pyarrow
+"""
+
+import json
+
+# Imported on first use by require_pyarrow(): loading pyarrow adds ~19MB of
+# private memory to every server worker, and most never read Parquet
+pa = pc = pq = None
+
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+# Columns stored natively; any other post field is kept in the `extra` JSON
+POST_COLUMNS = ['id', 'text', 'sentiment', 'sentiment_score', 'topic', 'source', 'author', 'timestamp', 'county']
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+
+class ReadOnlyCorpus(Exception):
+    """
+    Raised when posts are appended to a corpus that cannot take them
+    """
+
+
+def require_pyarrow():
+    global pa, pc, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet support. Run: pip install pyarrow") from None
+        pa, pc, pq = pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def post_schema():
+    require_pyarrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.string()),
+        ('text', pa.string()),
+        ('sentiment', category),
+        ('sentiment_score', pa.float64()),
+        ('topic', category),
+        ('source', category),
+        ('author', pa.string()),
+        ('timestamp', pa.string()),
+        ('county', category),
+        ('extra', pa.string()),
+    ])
+
+
+class ParquetPostWriter:
+    """
+    Streams posts into a Parquet file one row group at a time
+    """
+
+    def __init__(self, path, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        require_pyarrow()
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = post_schema()
+        self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self._buffer = {name: [] for name in self.schema.names}
+        self._buffered = 0
+        self.written = 0
+
+    def write(self, posts):
+        for post in posts:
+            extra = {k: v for k, v in post.items() if k not in POST_COLUMNS and k != 'created_at'}
+            columns = self._buffer
+            columns['id'].append(str(post['id']))
+            columns['text'].append(post['text'])
+            columns['sentiment'].append(post.get('sentiment'))
+            columns['sentiment_score'].append(post.get('sentiment_score'))
+            columns['topic'].append(post.get('topic'))
+            columns['source'].append(post.get('source'))
+            columns['author'].append(post.get('author'))
+            # Scraped posts carry `created_at`; the API corpus uses `timestamp`
+            columns['timestamp'].append(post.get('timestamp') or post.get('created_at'))
+            columns['county'].append(post.get('county'))
+            columns['extra'].append(json.dumps(extra) if extra else None)
+            self._buffered += 1
+            if self._buffered >= self.row_group_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Write buffered posts as one row group
+        """
+        if not self._buffered:
+            return
+        table = pa.Table.from_pydict(self._buffer, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.written += self._buffered
+        self._buffer = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_posts(posts, path, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """
+    Write an iterable of posts to a Parquet file; returns the number written
+    """
+    with ParquetPostWriter(path, row_group_size) as writer:
+        writer.write(posts)
+    return writer.written
+
+
+def read_columns(path, columns, filters=None):
+    """
+    Read only `columns` (plus any filter columns) as an Arrow table
+    filters: {'topic': 'permits', ...} equality filters
+    """
+    require_pyarrow()
+    filters = filters or {}
+    needed = list(dict.fromkeys(list(columns) + list(filters)))
+    table = pq.read_table(path, columns=needed)
+    for column, value in filters.items():
+        table = table.filter(pc.equal(table[column].cast(pa.string()), value))
+    return table.select(list(columns))
+
+
+def _row_post(row):
+    post = {k: v for k, v in row.items() if k != 'extra' and v is not None}
+    if row.get('extra'):
+        post.update(json.loads(row['extra']))
+    return post
+
+
+class ParquetCorpus:
+    """
+    Read-only post access to a Parquet file with the MappedCorpus interface
+    Pages are read from just the row groups that contain them
+    """
+
+    def __init__(self, path):
+        require_pyarrow()
+        self.path = path
+        self._file = pq.ParquetFile(path)
+        metadata = self._file.metadata
+        self._group_starts = []
+        start = 0
+        for i in range(metadata.num_row_groups):
+            self._group_starts.append(start)
+            start += metadata.row_group(i).num_rows
+        self._count = start
+
+    def refresh(self):
+        pass
+
+    def __len__(self):
+        return self._count
+
+    def slice(self, start, stop):
+        start = max(0, start)
+        stop = min(stop, self._count)
+        if start >= stop:
+            return []
+        groups = [
+            i for i, group_start in enumerate(self._group_starts)
+            if group_start < stop and group_start + self._file.metadata.row_group(i).num_rows > start
+        ]
+        table = self._file.read_row_groups(groups)
+        first = self._group_starts[groups[0]]
+        return [_row_post(row) for row in table.slice(start - first, stop - start).to_pylist()]
+
+    def __iter__(self):
+        for batch in self._file.iter_batches():
+            for row in batch.to_pylist():
+                yield _row_post(row)
+
+    def append(self, posts):
+        raise ReadOnlyCorpus('Parquet partitions are read-only')
+
+
+def aggregate_parquet(path, filters=None, label_missing=None):
+    """
+    Partial statistics/trend aggregate from the sentiment, topic and
+    timestamp columns only. label_missing(texts) labels posts stored without
+    a sentiment; the text column is read only when there are such posts.
+    """
+    table = read_columns(path, ['sentiment', 'topic', 'timestamp'], filters)
+    sentiment = table['sentiment'].cast(pa.string())
+
+    missing = sentiment.null_count
+    if missing and label_missing is not None:
+        texts = read_columns(path, ['text'], filters)['text']
+        null_mask = pc.is_null(sentiment)
+        labels = label_missing(pc.filter(texts, null_mask).to_pylist())
+        filled = iter(labels)
+        sentiment = pa.chunked_array([pa.array(
+            [s if s is not None else next(filled) for s in sentiment.to_pylist()], pa.string()
+        )])
+    else:
+        sentiment = pc.fill_null(sentiment, 'neutral')
+
+    topic = pc.fill_null(table['topic'].cast(pa.string()), 'general')
+    day = pc.fill_null(pc.utf8_slice_codeunits(table['timestamp'], 0, 10), 'unknown')
+
+    sentiment_breakdown = {s: 0 for s in SENTIMENTS}
+    for item in pc.value_counts(sentiment).to_pylist():
+        if item['values'] in sentiment_breakdown:
+            sentiment_breakdown[item['values']] = item['counts']
+    topic_breakdown = {item['values']: item['counts'] for item in pc.value_counts(topic).to_pylist()}
+
+    trend = {}
+    grouped = pa.table({'day': day, 'sentiment': sentiment}).group_by(['day', 'sentiment']).aggregate(
+        [([], 'count_all')]
+    )
+    for row in grouped.to_pylist():
+        bucket = trend.setdefault(row['day'], {s: 0 for s in SENTIMENTS})
+        if row['sentiment'] in bucket:
+            bucket[row['sentiment']] = row['count_all']
+
+    return {
+        'total_posts': table.num_rows,
+        'sentiment_breakdown': sentiment_breakdown,
+        'topic_breakdown': topic_breakdown,
+        'trend': trend
+    }
@@ -0,0 +1,278 @@
+"""
+Memory-Mapped Post Corpus
+Random access to the post corpus without parsing the whole file
+
+Format:
+- <name>.jsonl  one JSON post per line
+- <name>.idx    fixed-width index, one (offset, length) entry per post
+
+Both files are opened read-only with mmap, so every gunicorn worker shares
+the same OS page cache instead of holding its own parsed copy. Reading post
+N is one index lookup plus one slice of the mapped data file.
+
+- <name>.idx.lock  flock taken exclusively to append or replace the pair
+  and shared to map it, so a reader never pairs a new data file with a
+  stale index
+
+Usage:
+    python corpus.py real_data.json     # build real_data.jsonl + real_data.idx
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within a process
+    fcntl = None
+
+# Each index entry: byte offset (uint64) and byte length (uint32) of one line
+INDEX_ENTRY = struct.Struct('<QI')
+# Posts decoded per page read when iterating the whole corpus
+ITER_BATCH = 1000
+
+
+def corpus_paths(json_path):
+    """
+    Derive the .jsonl and .idx paths that sit next to a JSON corpus file
+    """
+    base, _ = os.path.splitext(json_path)
+    return base + '.jsonl', base + '.idx'
+
+
+@contextmanager
+def corpus_lock(index_path, exclusive=False):
+    """
+    Hold the corpus lock file; it is never replaced, unlike the files it guards
+    """
+    with open(index_path + '.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def build_corpus(json_path, jsonl_path=None, index_path=None):
+    """
+    Convert a JSON array of posts into line-delimited data plus offset index
+    Files are written to temporary names and swapped in atomically so
+    workers that are reading the old files never see a half-written corpus
+    """
+    default_jsonl, default_index = corpus_paths(json_path)
+    jsonl_path = jsonl_path or default_jsonl
+    index_path = index_path or default_index
+
+    with open(json_path, 'r') as f:
+        posts = json.load(f)
+
+    write_corpus(posts, jsonl_path, index_path)
+    return jsonl_path, index_path
+
+
+def write_corpus(posts, jsonl_path, index_path):
+    """
+    Write an iterable of posts as line-delimited JSON plus its offset index
+    """
+    suffix = f'.tmp{os.getpid()}'
+    offset = 0
+    count = 0
+    with open(jsonl_path + suffix, 'wb') as data_file, open(index_path + suffix, 'wb') as index_file:
+        for post in posts:
+            line = json.dumps(post, ensure_ascii=False).encode('utf-8')
+            data_file.write(line + b'\n')
+            index_file.write(INDEX_ENTRY.pack(offset, len(line)))
+            offset += len(line) + 1
+            count += 1
+
+    # Swapped as a pair: readers map both under the shared lock
+    with corpus_lock(index_path, exclusive=True):
+        os.replace(jsonl_path + suffix, jsonl_path)
+        os.replace(index_path + suffix, index_path)
+    return count
+
+
+class _Mapping:
+    """
+    One immutable view of both files: readers capture it once per call, so
+    a concurrent remap never changes the maps or count under them
+    """
+
+    __slots__ = ('data', 'index', 'count', 'index_stat')
+
+    def __init__(self, data=None, index=None, count=0, index_stat=None):
+        self.data = data
+        self.index = index
+        self.count = count
+        self.index_stat = index_stat
+
+    def entry(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('post index out of range')
+        return INDEX_ENTRY.unpack_from(self.index, i * INDEX_ENTRY.size)
+
+
+class MappedCorpus:
+    """
+    Read-only, memory-mapped view of a .jsonl corpus and its offset index
+    """
+
+    def __init__(self, jsonl_path, index_path):
+        self.jsonl_path = jsonl_path
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._mapping = _Mapping()
+        self._map()
+
+    def _map(self):
+        """
+        (Re)map both files; called on open and when another writer appended
+        Old maps are never closed here: a reader may still be using them,
+        and they are released once the last reference is dropped
+        """
+        with corpus_lock(self.index_path):
+            index_stat = self._index_stat()
+            # Mapped after the index size is read: every entry counted below
+            # points at data that was written before it
+            data = self._mmap(self.jsonl_path)
+            index = self._mmap(self.index_path)
+        self._mapping = _Mapping(data, index, index_stat[1] // INDEX_ENTRY.size, index_stat)
+
+    def _index_stat(self):
+        # The inode tells a replaced corpus from an appended one
+        stat = os.stat(self.index_path)
+        return stat.st_ino, stat.st_size
+
+    @staticmethod
+    def _mmap(path):
+        if os.path.getsize(path) == 0:
+            # mmap refuses empty files; an empty corpus maps to nothing
+            return None
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def refresh(self):
+        """
+        Pick up posts appended (or a corpus written) by other workers since
+        the files were mapped
+        """
+        with self._lock:
+            if self._index_stat() != self._mapping.index_stat:
+                self._map()
+
+    def __len__(self):
+        return self._mapping.count
+
+    def raw(self, i):
+        """
+        Zero-copy view of the encoded JSON for post i
+        """
+        mapping = self._mapping
+        offset, length = mapping.entry(i)
+        return memoryview(mapping.data)[offset:offset + length]
+
+    def get(self, i):
+        """
+        Decode post i only
+        """
+        mapping = self._mapping
+        offset, length = mapping.entry(i)
+        return json.loads(mapping.data[offset:offset + length])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.slice(*i.indices(len(self))[:2])
+        return self.get(i)
+
+    def slice(self, start, stop):
+        """
+        Decode posts [start, stop) as a list, reading only their bytes
+        """
+        return self._slice(self._mapping, start, stop)
+
+    @staticmethod
+    def _slice(mapping, start, stop):
+        start = max(0, start)
+        stop = min(stop, mapping.count)
+        if start >= stop:
+            return []
+
+        entries = list(INDEX_ENTRY.iter_unpack(
+            mapping.index[start * INDEX_ENTRY.size:stop * INDEX_ENTRY.size]
+        ))
+        first = entries[0][0]
+        last, last_length = entries[-1]
+        # One read for the page; each post is then cut out by its own index
+        # entry, so a data line without one (a writer that crashed before
+        # its index write) is skipped rather than decoded
+        chunk = mapping.data[first:last + last_length]
+        return [json.loads(chunk[offset - first:offset - first + length]) for offset, length in entries]
+
+    def __iter__(self):
+        mapping = self._mapping
+        for start in range(0, mapping.count, ITER_BATCH):
+            yield from self._slice(mapping, start, start + ITER_BATCH)
+
+    def append(self, posts):
+        """
+        Append posts to the data file and index
+        The data line is written before its index entry, so readers that
+        go through the index never see a partially written post
+        """
+        with self._lock:
+            # Opened under the lock, so a corpus written meanwhile is the one appended to
+            with corpus_lock(self.index_path, exclusive=True), \
+                    open(self.jsonl_path, 'ab') as data_file, open(self.index_path, 'ab') as index_file:
+                # Drop a partial entry left by a writer that crashed mid-write
+                index_size = index_file.seek(0, os.SEEK_END)
+                if index_size % INDEX_ENTRY.size:
+                    index_file.truncate(index_size - index_size % INDEX_ENTRY.size)
+                offset = data_file.seek(0, os.SEEK_END)
+                entries = []
+                for post in posts:
+                    line = json.dumps(post, ensure_ascii=False).encode('utf-8')
+                    data_file.write(line + b'\n')
+                    entries.append(INDEX_ENTRY.pack(offset, len(line)))
+                    offset += len(line) + 1
+                data_file.flush()
+                index_file.write(b''.join(entries))
+                index_file.flush()
+            self._map()
+
+    def close(self):
+        with self._lock:
+            self._mapping = _Mapping()
+
+
+def open_corpus(json_path):
+    """
+    Open the mapped corpus for a JSON file, building it on first use
+    An existing corpus is never rebuilt from the JSON source, since it may
+    hold ingested posts the source lacks; re-import a changed source with
+    `python corpus.py <file>`
+    Raises FileNotFoundError when neither the JSON source nor a built corpus exist
+    """
+    jsonl_path, index_path = corpus_paths(json_path)
+
+    if not (os.path.exists(jsonl_path) and os.path.exists(index_path)):
+        if not os.path.exists(json_path):
+            raise FileNotFoundError(json_path)
+        build_corpus(json_path, jsonl_path, index_path)
+
+    return MappedCorpus(jsonl_path, index_path)
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'real_data.json'
+    jsonl_path, index_path = build_corpus(source)
+    corpus = MappedCorpus(jsonl_path, index_path)
+    print(f"✅ Built {jsonl_path} + {index_path} ({len(corpus)} posts)")
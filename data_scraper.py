@@ -6,16 +6,26 @@ Usage:
     python data_scraper.py --source twitter --count 100
     python data_scraper.py --source reddit --count 50
     python data_scraper.py --source all --count 100
+    python data_scraper.py --source reddit --county howard --format partition
 
 Requirements:
     pip install tweepy praw textblob pandas --break-system-packages
+    pip install pyarrow  (only for --format parquet)
 """
 
 import argparse
 import json
+import os
 from datetime import datetime
 import pandas as pd
 
+from corpus import MappedCorpus, corpus_paths
+from documents import extract_topics
+from storage import SQLiteStore
+from partitions import (
+    COUNTIES, DEFAULT_COUNTY, county_search_queries, is_parquet, partition_path, update_partition_sketches
+)
+
 # You'll need to fill these in with your own API credentials
 TWITTER_CONFIG = {
     'consumer_key': 'YOUR_CONSUMER_KEY',
@@ -42,9 +52,27 @@ SEARCH_QUERIES = [
     "#MiamiEntrepreneur"
 ]
 
-def scrape_twitter(count=100):
+# Reddit subreddits and searches for Miami-Dade business topics
+REDDIT_SUBREDDITS = ['Miami', 'Florida', 'smallbusiness', 'Entrepreneur']
+REDDIT_QUERIES = ['small business', 'business permit', 'startup Miami']
+
+# State-wide subreddit per state in COUNTIES
+STATE_SUBREDDITS = {'FL': 'Florida', 'MD': 'maryland'}
+
+# Source file of the Miami-Dade partition (see partitions.py)
+DEFAULT_PARTITION_FILE = 'real_data.json'
+
+def search_queries_for(county):
+    """
+    Search queries for a county (the hand-tuned list for Miami-Dade)
     """
-    Scrape tweets about Miami-Dade small businesses
+    if county == DEFAULT_COUNTY:
+        return SEARCH_QUERIES
+    return county_search_queries(county)
+
+def scrape_twitter(count=100, queries=SEARCH_QUERIES):
+    """
+    Scrape tweets about small businesses for the given search queries
     """
     try:
         import tweepy
@@ -64,12 +92,12 @@ def scrape_twitter(count=100):
         
         print(f"🐦 Scraping Twitter for {count} tweets...")
         
-        for query in SEARCH_QUERIES:
+        for query in queries:
             try:
                 tweets = api.search_tweets(
                     q=query,
                     lang='en',
-                    count=min(100, count // len(SEARCH_QUERIES)),
+                    count=min(100, count // len(queries)),
                     tweet_mode='extended'
                 )
                 
@@ -101,9 +129,22 @@ def scrape_twitter(count=100):
         print("💡 Make sure your API credentials are set up correctly")
         return []
 
-def scrape_reddit(count=50):
+def reddit_targets_for(county):
+    """
+    (subreddits, search queries) for a county (the hand-tuned lists for
+    Miami-Dade). Elsewhere the subreddits are state-wide or general, so
+    every query names the county.
     """
-    Scrape Reddit posts about Miami-Dade small businesses
+    if county == DEFAULT_COUNTY:
+        return REDDIT_SUBREDDITS, REDDIT_QUERIES
+    info = COUNTIES[county]
+    short = info['name'].replace(' County', '')
+    subreddits = [STATE_SUBREDDITS[info['state']], 'smallbusiness', 'Entrepreneur']
+    return subreddits, [f"{short} small business", f"{short} business permit", f"startup {short}"]
+
+def scrape_reddit(count=50, county=DEFAULT_COUNTY):
+    """
+    Scrape Reddit posts about a county's small businesses
     """
     try:
         import praw
@@ -120,14 +161,14 @@ def scrape_reddit(count=50):
         print(f"🤖 Scraping Reddit for {count} posts...")
         
         # Relevant subreddits
-        subreddits = ['Miami', 'Florida', 'smallbusiness', 'Entrepreneur']
+        subreddits, queries = reddit_targets_for(county)
         
         for subreddit_name in subreddits:
             try:
                 subreddit = reddit.subreddit(subreddit_name)
                 
                 # Search for small business related posts
-                for query in ['small business', 'business permit', 'startup Miami']:
+                for query in queries:
                     for submission in subreddit.search(query, limit=count // len(subreddits)):
                         posts.append({
                             'id': submission.id,
@@ -250,7 +291,56 @@ def analyze_posts(posts):
         print("❌ TextBlob not installed. Run: pip install textblob")
         return posts, {}
 
-def save_data(posts, stats, format='json'):
+def normalize_posts(posts):
+    """
+    Give scraped posts the fields the API aggregates on: `timestamp` (from
+    `created_at`) and `topic`/`topics` (from the text)
+    """
+    normalized = []
+    for post in posts:
+        post = dict(post)
+        if post.get('created_at'):
+            post.setdefault('timestamp', post['created_at'])
+        if 'topic' not in post or 'topics' not in post:
+            topics = extract_topics(post.get('text') or '')
+            post.setdefault('topics', topics)
+            post.setdefault('topic', topics[0])
+        normalized.append(post)
+    return normalized
+
+def save_partition(posts, county, default_file=DEFAULT_PARTITION_FILE):
+    """
+    Add posts to a county's partition (see partitions.py): appended to its
+    mapped corpus when one is built, otherwise merged into its posts.json;
+    its stored sketches are then brought up to date
+    Returns the partition's path
+    """
+    path = partition_path(county, default_file)
+    if is_parquet(path):
+        raise ValueError(f'{path} is a read-only Parquet partition')
+    
+    posts = normalize_posts(posts)
+    jsonl_path, index_path = corpus_paths(path)
+    if os.path.exists(jsonl_path) and os.path.exists(index_path):
+        corpus = MappedCorpus(jsonl_path, index_path)
+        corpus.append(posts)
+        corpus.close()
+        update_partition_sketches(path)
+        return path
+    
+    existing = []
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(existing + posts, f, indent=2)
+    os.replace(tmp, path)
+    update_partition_sketches(path)
+    return path
+
+def save_data(posts, stats, format='json', county=DEFAULT_COUNTY):
     """
     Save collected data to file
     """
@@ -274,6 +364,27 @@ def save_data(posts, stats, format='json'):
         filename = f'social_media_posts_{timestamp}.csv'
         df.to_csv(filename, index=False)
         print(f"💾 Saved {len(posts)} posts to {filename}")
+        
+    elif format == 'sqlite':
+        # One shared database; repeated runs append (or update by post id)
+        filename = 'sentiment.db'
+        store = SQLiteStore(filename)
+        written = store.insert_posts(normalize_posts(posts))
+        total = store.count()
+        store.close()
+        print(f"💾 Saved {written} posts to {filename} ({total} total)")
+        
+    elif format == 'parquet':
+        # Dictionary-encoded columns, one row group per 10,000 posts
+        from columnar import write_posts
+        filename = f'social_media_posts_{timestamp}.parquet'
+        written = write_posts(posts, filename, row_group_size=10000)
+        print(f"💾 Saved {written} posts to {filename}")
+    
+    elif format == 'partition':
+        # The county's partition, where the API reads it from
+        filename = save_partition(posts, county)
+        print(f"💾 Added {len(posts)} posts to the {county} partition ({filename})")
     
     return filename
 
@@ -283,10 +394,12 @@ def main():
                         help='Data source to scrape')
     parser.add_argument('--count', type=int, default=100,
                         help='Number of posts to collect')
-    parser.add_argument('--format', choices=['json', 'csv'], default='json',
-                        help='Output format')
+    parser.add_argument('--format', choices=['json', 'csv', 'sqlite', 'parquet', 'partition'], default='json',
+                        help='Output format (partition: add to data/<county>/posts.json)')
     parser.add_argument('--no-analyze', action='store_true',
                         help='Skip sentiment analysis')
+    parser.add_argument('--county', choices=list(COUNTIES), default=DEFAULT_COUNTY,
+                        help='County to collect posts for')
     
     args = parser.parse_args()
     
@@ -298,10 +411,10 @@ def main():
     posts = []
     
     if args.source == 'twitter' or args.source == 'all':
-        posts.extend(scrape_twitter(args.count))
+        posts.extend(scrape_twitter(args.count, search_queries_for(args.county)))
     
     if args.source == 'reddit' or args.source == 'all':
-        posts.extend(scrape_reddit(args.count))
+        posts.extend(scrape_reddit(args.count, args.county))
     
     if args.source == 'mock' or (args.source == 'all' and len(posts) == 0):
         posts.extend(generate_mock_data(args.count))
@@ -310,6 +423,10 @@ def main():
         print("❌ No data collected. Using mock data instead.")
         posts = generate_mock_data(args.count)
     
+    # Tag posts with their county partition
+    for post in posts:
+        post['county'] = args.county
+    
     # Analyze sentiment
     if not args.no_analyze:
         posts, stats = analyze_posts(posts)
@@ -317,7 +434,7 @@ def main():
         stats = {}
     
     # Save data
-    filename = save_data(posts, stats, args.format)
+    filename = save_data(posts, stats, args.format, args.county)
     
     print("\n" + "="*60)
     print("✅ Data collection complete!")
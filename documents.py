@@ -0,0 +1,106 @@
+"""
+Preprocessed Documents
+Normalize and tokenize a text once, for every analysis stage that reads it
+
+A Document carries a text in the forms the stages need, each computed on
+first use and then shared by every later stage:
+- lower: the lowercase text, for topic and resource keyword matching
+- vader_text / entries: the text after VADER's emoji pass and its tokens as
+  (lowercase word, vocabulary id, ALL CAPS, word) entries from a
+  BatchScorer, for sentiment scoring
+- tokens: the words exactly as VADER's SentiText splits them
+
+Usage:
+    doc = as_document(text, batch_scorer)
+    batch_scorer.polarity_scores(doc)
+    extract_topics(doc)
+"""
+
+# Comprehensive topic keywords for 12 categories, in order of specificity
+# (most specific first)
+TOPIC_KEYWORDS = {
+    'permits': ['permit', 'license', 'approval', 'registration', 'certificate', 'zoning', 'inspection', 'code'],
+    'funding': ['grant', 'loan', 'funding', 'money', 'finance', 'capital', 'investment', 'relief'],
+    'training': ['training', 'workshop', 'course', 'education', 'learn', 'teach', 'bootcamp', 'class'],
+    'taxes': ['tax', 'taxes', 'irs', 'filing', 'deduction', 'credit', 'return', 'obligation'],
+    'legal': ['legal', 'lawyer', 'attorney', 'law', 'contract', 'lawsuit', 'court', 'guardianship', 'estate', 'succession', 'llc', 'corporation', 'incorporation', 'entity', 'structure'],
+    'insurance': ['insurance', 'liability', 'coverage', 'workers comp', 'protection', 'health insurance', 'medical', 'benefits', 'broker', 'agent'],
+    'marketing': ['marketing', 'advertising', 'promotion', 'branding', 'social media', 'website', 'web', 'online presence', 'seo', 'digital'],
+    'technology': ['technology', 'it', 'computer', 'software', 'system', 'tech', 'cybersecurity', 'security', 'ecommerce', 'online store'],
+    'real_estate': ['property', 'real estate', 'location', 'space', 'lease', 'rent', 'office', 'zoning', 'land use', 'landlord'],
+    'hr': ['hiring', 'employee', 'staff', 'recruit', 'employment', 'hr', 'payroll', 'benefits', 'compensation', 'compliance', 'labor'],
+    'export': ['export', 'international', 'trade', 'global', 'foreign', 'import', 'customs', 'shipping', 'tariff'],
+    'networking': ['networking', 'events', 'meetup', 'connect', 'community', 'entrepreneurs', 'chamber', 'industry group'],
+    'certification': ['minority', 'mbe', 'wbe', 'sbe', 'certification', 'certified', 'women-owned', 'diversity', 'contractor'],
+    'support': ['help', 'support', 'assistance', 'advisor', 'mentor', 'guidance', 'hotline', 'question']
+}
+TOPIC_ITEMS = tuple((topic, tuple(keywords)) for topic, keywords in TOPIC_KEYWORDS.items())
+
+
+class Document:
+    """
+    One text plus its lazily computed, shared preprocessing
+    scorer: the BatchScorer whose vocabulary the sentiment entries use
+    (only needed when the document is scored)
+    """
+
+    # Plain slots rather than functools.cached_property, whose per-access
+    # lock costs more than a shared stage saves
+    __slots__ = ('text', 'scorer', '_lower', '_prepared', '_tokens')
+
+    def __init__(self, text, scorer=None):
+        self.text = text
+        self.scorer = scorer
+        self._lower = None
+        self._prepared = None
+        self._tokens = None
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def prepared(self):
+        """
+        (VADER-prepared text, token entries) from the scorer
+        """
+        if self._prepared is None:
+            if self.scorer is None:
+                raise ValueError('Document has no sentiment scorer to prepare it with')
+            self._prepared = self.scorer.prepare(self.text)
+        return self._prepared
+
+    @property
+    def vader_text(self):
+        return self.prepared[0]
+
+    @property
+    def entries(self):
+        return self.prepared[1]
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = [entry[3] for entry in self.entries]
+        return self._tokens
+
+
+def as_document(text, scorer=None):
+    """
+    A Document for text; Documents are passed through unchanged
+    """
+    if isinstance(text, Document):
+        return text
+    return Document(text, scorer)
+
+
+def extract_topics(text):
+    """
+    Extract topics from text (or a Document) using keyword matching
+    Returns: list of topics found
+    """
+    text_lower = as_document(text).lower
+    topics = [topic for topic, keywords in TOPIC_ITEMS if any(keyword in text_lower for keyword in keywords)]
+    return topics if topics else ['support']  # Default to support
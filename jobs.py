@@ -0,0 +1,453 @@
+"""
+Asynchronous Analysis Jobs
+Runs large scoring requests in local worker processes instead of the request thread
+
+- Bounded concurrency: a fixed number of runner processes plus a bounded
+  backlog; scoring holds their GIL, not the one the web worker's request
+  threads share
+- Persisted state: each job is a JSON file under the jobs directory, so any
+  gunicorn worker can report on a job that another worker is running
+- Progress is recorded after every chunk; results go to <id>.results.jsonl
+- Cancellation: a <id>.cancel marker is checked between chunks
+- Expiry: finished jobs and their results are deleted once they have not
+  changed for `ttl` seconds
+- File inputs ({"file": ...}) are read only from a dedicated input directory
+- A job records the pid and boot id of the process running it, so a job whose
+  runner died is reported as interrupted even if its pid was reused
+
+score_fn runs in the runner processes, so it must be a module-level function
+(it is pickled by reference) that sets up whatever it needs on first use.
+
+Usage:
+    manager = JobManager(score_posts, state_dir='jobs', input_dir='job_inputs')
+    job = manager.submit({'texts': ['...']})
+    manager.get(job['id'])
+    manager.cancel(job['id'])
+"""
+
+import functools
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: state updates are only serialized within a process
+    fcntl = None
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_PENDING = 16
+DEFAULT_CHUNK_SIZE = 1000
+# Finished jobs are kept this long after their last update
+DEFAULT_TTL = 24 * 3600
+# Expired jobs are looked for at most this often per manager
+EXPIRE_INTERVAL = 60
+
+ACTIVE_STATES = ('queued', 'running')
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when the backlog of queued jobs is at capacity
+    """
+
+
+class JobInputError(ValueError):
+    """
+    Raised when a job submission does not describe a valid corpus
+    """
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _boot_id(pid):
+    """
+    Identifies one run of process pid: the machine's boot id plus the
+    process start time, so a pid reused after a restart or reboot does not
+    pass for the same worker. None where /proc is unavailable.
+    """
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            machine = f.read().strip()
+        with open(f'/proc/{pid}/stat') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name (field 2) may contain spaces; starttime is field 22
+    return f'{machine}:{stat.rsplit(")", 1)[1].split()[19]}'
+
+
+def _check_posts(posts):
+    """
+    Raise JobInputError unless posts is a list of dicts with a text string
+    """
+    if not isinstance(posts, list):
+        raise JobInputError('posts must be a list')
+    for i, post in enumerate(posts):
+        if not isinstance(post, dict) or not isinstance(post.get('text'), str):
+            raise JobInputError(f'post {i} must be an object with a "text" string')
+
+
+def _pool_context():
+    # Same reasoning as the partition pool (see partitions.py): the pool is
+    # started from a threaded server worker, so never fork it directly
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _owner_alive(job):
+    if not _pid_alive(job['pid']):
+        return False
+    boot_id = job.get('boot_id')
+    return boot_id is None or _boot_id(job['pid']) in (None, boot_id)
+
+
+class JobManager:
+    """
+    Submits, runs, tracks and cancels scoring jobs
+    score_fn(posts) must return the analyzed post dicts for a chunk of posts
+    """
+
+    def __init__(self, score_fn, state_dir='jobs', input_dir='job_inputs',
+                 max_workers=DEFAULT_MAX_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 chunk_size=DEFAULT_CHUNK_SIZE, ttl=DEFAULT_TTL):
+        self.score_fn = score_fn
+        self.state_dir = state_dir
+        self.input_dir = os.path.realpath(input_dir)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self._executor = None
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        # Jobs submitted here that have not finished: running plus queued
+        self._unfinished = 0
+        self._expired_at = 0.0
+        os.makedirs(state_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # Runner processes get the manager's settings, not its pool or locks
+        state = self.__dict__.copy()
+        for name in ('_executor', '_lock', '_state_lock'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    # --- persisted state -------------------------------------------------
+
+    def _path(self, job_id, suffix='.json'):
+        return os.path.join(self.state_dir, job_id + suffix)
+
+    @contextmanager
+    def _locked(self):
+        """
+        Serializes state file updates across threads and workers, so a
+        cancel never overwrites a runner's newer save
+        """
+        with self._state_lock, open(os.path.join(self.state_dir, 'jobs.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self, job):
+        with self._locked():
+            self._write(job)
+
+    def _write(self, job):
+        job['updated_at'] = datetime.now().isoformat()
+        if self._cancelled(job['id']):
+            # Keep a cancel requested by another worker in every later save
+            job['cancel_requested'] = True
+        tmp_path = self._path(job['id'], f'.json.tmp{os.getpid()}.{threading.get_ident()}')
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(job['id']))
+
+    def _load(self, job_id):
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    # --- input -----------------------------------------------------------
+
+    def _resolve_file(self, name):
+        """
+        Resolve a file reference, refusing paths outside the input directory
+        """
+        path = os.path.realpath(os.path.join(self.input_dir, name))
+        if os.path.commonpath([path, self.input_dir]) != self.input_dir:
+            raise JobInputError('file must be inside the input directory')
+        if not os.path.isfile(path):
+            raise JobInputError(f'file not found: {name}')
+        return path
+
+    def _read_posts(self, spec):
+        """
+        Materialize the posts described by a job spec
+        """
+        if 'file' in spec:
+            path = self._resolve_file(spec['file'])
+            with open(path) as f:
+                if path.endswith('.jsonl'):
+                    return [json.loads(line) for line in f if line.strip()]
+                return json.load(f)
+        if 'texts' in spec:
+            return [{'id': i, 'text': text} for i, text in enumerate(spec['texts'])]
+        return spec['posts']
+
+    @staticmethod
+    def _validate(spec):
+        if not isinstance(spec, dict):
+            raise JobInputError('job must be a JSON object')
+        sources = [key for key in ('posts', 'texts', 'file') if key in spec]
+        if len(sources) != 1:
+            raise JobInputError("provide exactly one of 'posts', 'texts' or 'file'")
+        if 'file' in spec and not isinstance(spec['file'], str):
+            raise JobInputError("'file' must be a file name")
+        if 'texts' in spec:
+            if not isinstance(spec['texts'], list):
+                raise JobInputError("'texts' must be a list")
+            if not all(isinstance(text, str) for text in spec['texts']):
+                raise JobInputError("every entry of 'texts' must be a string")
+        if 'posts' in spec:
+            _check_posts(spec['posts'])
+
+    # --- lifecycle -------------------------------------------------------
+
+    def submit(self, spec):
+        """
+        Queue a job; raises JobQueueFull when the backlog is at capacity
+        """
+        self._validate(spec)
+        if 'file' in spec:
+            self._resolve_file(spec['file'])
+        self.expire()
+
+        with self._lock:
+            if self._unfinished >= self.max_workers + self.max_pending:
+                raise JobQueueFull('too many pending jobs')
+            self._unfinished += 1
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'pid': os.getpid(),
+            'boot_id': _boot_id(os.getpid()),
+            'created_at': datetime.now().isoformat(),
+            'processed': 0,
+            'total': len(spec['posts'] if 'posts' in spec else spec.get('texts', [])),
+            'summary': None,
+            'error': None
+        }
+        try:
+            self._save(job)
+            executor = self._pool()
+            try:
+                future = executor.submit(self._run, job, spec)
+            except BrokenProcessPool:
+                # A runner process died since the last job finished
+                self._discard_pool(executor)
+                executor = self._pool()
+                future = executor.submit(self._run, job, spec)
+        except BaseException as e:
+            # Never queued, so _finished will not release its slot
+            with self._lock:
+                self._unfinished -= 1
+            if os.path.exists(self._path(job['id'])):
+                job['status'] = 'failed'
+                job['error'] = str(e) or type(e).__name__
+                job['finished_at'] = datetime.now().isoformat()
+                try:
+                    self._save(job)
+                except OSError:
+                    pass
+            raise
+        future.add_done_callback(functools.partial(self._finished, job['id'], executor))
+        return job
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_pool_context())
+            return self._executor
+
+    def _discard_pool(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def _finished(self, job_id, executor, future):
+        with self._lock:
+            self._unfinished -= 1
+        error = future.exception()
+        if error is None:
+            return
+        if isinstance(error, BrokenProcessPool):
+            self._discard_pool(executor)
+        # The job never ran to its own final save (a runner process died
+        # and took the pool's other jobs with it)
+        with self._locked():
+            job = self._load(job_id)
+            if job is not None and job['status'] in ACTIVE_STATES:
+                job['status'] = 'interrupted'
+                job['error'] = str(error) or type(error).__name__
+                job['finished_at'] = datetime.now().isoformat()
+                self._write(job)
+
+    def expire(self, force=False):
+        """
+        Delete jobs that are no longer active (finished, or their runner
+        died) and have not been updated for ttl seconds, with their results.
+        Runs at most every EXPIRE_INTERVAL seconds unless forced; returns
+        the number of jobs removed
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._expired_at < EXPIRE_INTERVAL:
+                return 0
+            self._expired_at = now
+
+        removed = 0
+        for name in os.listdir(self.state_dir):
+            job_id, ext = os.path.splitext(name)
+            if ext != '.json' or not job_id.isalnum():
+                continue
+            with self._locked():
+                try:
+                    if now - os.path.getmtime(self._path(job_id)) < self.ttl:
+                        continue
+                except FileNotFoundError:
+                    continue
+                job = self.get(job_id)
+                if job is None or job['status'] in ACTIVE_STATES:
+                    continue
+                for suffix in ('.results.jsonl', '.cancel', '.json'):
+                    try:
+                        os.remove(self._path(job_id, suffix))
+                    except FileNotFoundError:
+                        pass
+            removed += 1
+        return removed
+
+    def get(self, job_id):
+        """
+        Return the job state, or None if unknown
+        """
+        job = self._load(job_id)
+        if job and job['status'] in ACTIVE_STATES and not _owner_alive(job):
+            # The worker process that owned the job exited mid-run
+            job['status'] = 'interrupted'
+        return job
+
+    def results(self, job_id, offset=0, count=100):
+        """
+        Return a page of scored posts for a job
+        """
+        page = []
+        try:
+            with open(self._path(job_id, '.results.jsonl')) as f:
+                for i, line in enumerate(f):
+                    if i < offset:
+                        continue
+                    if len(page) >= count:
+                        break
+                    page.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        return page
+
+    def cancel(self, job_id):
+        """
+        Request cancellation; the runner stops at its next chunk boundary
+        """
+        with self._locked():
+            job = self._load(job_id)
+            if job is None:
+                return None
+            if job['status'] in ACTIVE_STATES:
+                # A marker file reaches the runner even if it lives in another worker
+                open(self._path(job_id, '.cancel'), 'w').close()
+                self._write(job)
+        return job
+
+    def _cancelled(self, job_id):
+        return os.path.exists(self._path(job_id, '.cancel'))
+
+    def _run(self, job, spec):
+        """
+        Runs in a pool process
+        """
+        # The job now belongs to this process: if it dies, the job is interrupted
+        job['pid'] = os.getpid()
+        job['boot_id'] = _boot_id(os.getpid())
+        try:
+            if self._cancelled(job['id']):
+                job['status'] = 'cancelled'
+                return
+
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+            posts = self._read_posts(spec)
+            if 'file' in spec:
+                # Inline posts were checked on submit
+                _check_posts(posts)
+            job['total'] = len(posts)
+            self._save(job)
+
+            counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+            with open(self._path(job['id'], '.results.jsonl'), 'w') as out:
+                for start in range(0, len(posts), self.chunk_size):
+                    if self._cancelled(job['id']):
+                        job['status'] = 'cancelled'
+                        return
+
+                    for scored in self.score_fn(posts[start:start + self.chunk_size]):
+                        counts[scored['sentiment']] = counts.get(scored['sentiment'], 0) + 1
+                        out.write(json.dumps(scored) + '\n')
+                    out.flush()
+
+                    job['processed'] = min(start + self.chunk_size, len(posts))
+                    job['summary'] = {'sentiment_breakdown': counts}
+                    self._save(job)
+
+            job['status'] = 'completed'
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            job['finished_at'] = datetime.now().isoformat()
+            with self._locked():
+                self._write(job)
+                try:
+                    os.remove(self._path(job['id'], '.cancel'))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,465 @@
+"""
+County Partitions
+Per-county post corpora, resource catalogs and scatter-gather aggregation
+
+Layout:
+    real_data.json                  default county (Miami-Dade)
+    data/<county>/posts.json        one partition per additional county
+    data/<county>/posts.parquet     columnar alternative (see columnar.py),
+                                    used instead of posts.json when present
+    data/<county>/resources.json    the county's resource catalog, shaped like
+                                    RESOURCES in backend_api.py; a county
+                                    without one lists no resources
+
+Statistics and trend queries run one task per partition in a process pool;
+each task returns a small partial aggregate (counts only) that the caller
+merges, so query time follows the largest partition, not the total corpus.
+The pool has a process per partition (up to the CPU count), and each
+partition's partial is kept by the calling process until that partition's
+files change, so a repeated query only decodes partitions that grew.
+
+Each partition also keeps its sketches (distinct authors, top terms; see
+sketches.py) next to its files, as <name>.sketches. They are updated
+when posts are added (the scraper's save_partition, the API's ingest), so a
+sketch query only loads the stored sketches and merges them; a partition
+whose sketches lag its posts (built or appended to by other tools) catches
+up once, in the pool, and stores the result for every later query.
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import corpus_lock, corpus_paths, open_corpus
+
+DATA_DIR = os.environ.get('PARTITIONS_DIR', 'data')
+DEFAULT_COUNTY = 'miami-dade'
+
+COUNTIES = {
+    'miami-dade': {'name': 'Miami-Dade County', 'state': 'FL', 'site': 'https://business.miamidade.gov'},
+    'allegany': {'name': 'Allegany County', 'state': 'MD', 'site': 'https://www.alleganygov.org'},
+    'anne-arundel': {'name': 'Anne Arundel County', 'state': 'MD', 'site': 'https://www.aacounty.org'},
+    'baltimore-city': {'name': 'Baltimore City', 'state': 'MD', 'site': 'https://www.baltimorecity.gov'},
+    'baltimore-county': {'name': 'Baltimore County', 'state': 'MD', 'site': 'https://www.baltimorecountymd.gov'},
+    'calvert': {'name': 'Calvert County', 'state': 'MD', 'site': 'https://www.calvertcountymd.gov'},
+    'carroll': {'name': 'Carroll County', 'state': 'MD', 'site': 'https://www.carrollcountymd.gov'},
+    'cecil': {'name': 'Cecil County', 'state': 'MD', 'site': 'https://www.ccgov.org'},
+    'charles': {'name': 'Charles County', 'state': 'MD', 'site': 'https://www.charlescountymd.gov'},
+    'frederick': {'name': 'Frederick County', 'state': 'MD', 'site': 'https://www.frederickcountymd.gov'},
+    'harford': {'name': 'Harford County', 'state': 'MD', 'site': 'https://www.harfordcountymd.gov'},
+    'howard': {'name': 'Howard County', 'state': 'MD', 'site': 'https://www.howardcountymd.gov'},
+    'montgomery': {'name': 'Montgomery County', 'state': 'MD', 'site': 'https://www.montgomerycountymd.gov'},
+    'prince-georges': {'name': "Prince George's County", 'state': 'MD', 'site': 'https://www.princegeorgescountymd.gov'},
+    'st-marys': {'name': "St. Mary's County", 'state': 'MD', 'site': 'https://www.stmarysmd.com'},
+    'washington': {'name': 'Washington County', 'state': 'MD', 'site': 'https://www.washco-md.net'},
+    'wicomico': {'name': 'Wicomico County', 'state': 'MD', 'site': 'https://www.wicomicocounty.org'},
+}
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+# One pool process per partition, as long as there are cores for them;
+# processes are only started when a query needs them
+DEFAULT_POOL_WORKERS = min(len(COUNTIES), os.cpu_count() or 1)
+# Partial aggregates kept per process; cleared when it grows past this
+AGGREGATE_CACHE_SIZE = 1024
+
+_executor = None
+_open_corpora = {}
+# (path, filters) -> (partition_signature, partial aggregate), per process
+_aggregates = {}
+_partition_lock = threading.Lock()
+
+
+def partition_path(county, default_file):
+    """
+    Source file for a county's partition: the Parquet file when one exists,
+    otherwise the JSON file
+    """
+    if county == DEFAULT_COUNTY:
+        path = default_file
+    else:
+        path = os.path.join(DATA_DIR, county, 'posts.json')
+    parquet = os.path.splitext(path)[0] + '.parquet'
+    return parquet if os.path.exists(parquet) else path
+
+
+def is_parquet(path):
+    """
+    Parquet partitions are read-only (see columnar.py)
+    """
+    return path.endswith('.parquet')
+
+
+def partition_exists(path):
+    return os.path.exists(path) or os.path.exists(corpus_paths(path)[1])
+
+
+def partition_signature(path):
+    """
+    (inode, size, mtime) of the files a partition is read from: changes when
+    posts are appended or the partition is rebuilt. None until it is built
+    """
+    files = [path] if is_parquet(path) else corpus_paths(path)
+    try:
+        stats = [os.stat(name) for name in files]
+    except FileNotFoundError:
+        return None
+    return tuple((stat.st_ino, stat.st_size, stat.st_mtime_ns) for stat in stats)
+
+
+def open_partition(path):
+    """
+    Open a partition as a corpus (MappedCorpus or ParquetCorpus)
+    """
+    if is_parquet(path):
+        from columnar import ParquetCorpus
+        return ParquetCorpus(path)
+    return open_corpus(path)
+
+
+def available_partitions(default_file):
+    """
+    {county: path} for every county that has data on disk
+    """
+    paths = {}
+    for county in COUNTIES:
+        path = partition_path(county, default_file)
+        if partition_exists(path):
+            paths[county] = path
+    return paths
+
+
+def county_search_queries(county):
+    """
+    Social media search queries for one county
+    """
+    info = COUNTIES[county]
+    name = info['name']
+    short = name.replace(' County', '')
+    return [
+        f"{name} small business",
+        f"{short} business permit",
+        f"{name} business license",
+        f"{short} small business grant",
+        f"{short} business help",
+        f"{short} {info['state']} small business",
+    ]
+
+
+def county_resources(county, template):
+    """
+    Resource catalog for a county: data/<county>/resources.json when present,
+    otherwise the template catalog for the default county and none for the
+    others (another county's programs and links would be wrong for them)
+    """
+    path = os.path.join(DATA_DIR, county, 'resources.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return template if county == DEFAULT_COUNTY else {}
+
+
+# --- partial aggregates --------------------------------------------------
+
+def empty_aggregate():
+    return {
+        'total_posts': 0,
+        'sentiment_breakdown': {s: 0 for s in SENTIMENTS},
+        'topic_breakdown': {},
+        'trend': {}
+    }
+
+
+def _label_texts(texts):
+    """
+    Sentiment labels for a list of texts
+    """
+    # Pool processes attach to the workers' shared lexicon tables
+    from batch_scorer import process_scorer
+    return [analysis['sentiment'] for analysis in process_scorer().analyze_batch(texts)]
+
+
+def _label_missing(posts):
+    """
+    Fill in sentiment for posts that were stored without it
+    """
+    missing = [post for post in posts if 'sentiment' not in post]
+    if not missing:
+        return
+    for post, sentiment in zip(missing, _label_texts([p['text'] for p in missing])):
+        post['sentiment'] = sentiment
+
+
+def aggregate_posts(posts, filters=None, aggregate=None):
+    """
+    Add a sequence of posts to a partial aggregate
+    Trend buckets are days (the first 10 characters of the timestamp, or of
+    `created_at` for posts stored straight from the scraper)
+    """
+    filters = filters or {}
+    aggregate = aggregate or empty_aggregate()
+    posts = [p for p in posts if all(p.get(k) == v for k, v in filters.items())]
+    _label_missing(posts)
+
+    sentiment_breakdown = aggregate['sentiment_breakdown']
+    topic_breakdown = aggregate['topic_breakdown']
+    trend = aggregate['trend']
+    for post in posts:
+        sentiment = post.get('sentiment', 'neutral')
+        if sentiment in sentiment_breakdown:
+            sentiment_breakdown[sentiment] += 1
+        topic = post.get('topic', 'general')
+        topic_breakdown[topic] = topic_breakdown.get(topic, 0) + 1
+        day = str(post.get('timestamp') or post.get('created_at') or '')[:10] or 'unknown'
+        bucket = trend.get(day)
+        if bucket is None:
+            bucket = trend[day] = {s: 0 for s in SENTIMENTS}
+        if sentiment in bucket:
+            bucket[sentiment] += 1
+    aggregate['total_posts'] += len(posts)
+    return aggregate
+
+
+def merge_aggregates(parts):
+    """
+    Combine partial aggregates from several partitions
+    """
+    merged = empty_aggregate()
+    for part in parts:
+        merged['total_posts'] += part['total_posts']
+        for sentiment, count in part['sentiment_breakdown'].items():
+            merged['sentiment_breakdown'][sentiment] += count
+        for topic, count in part['topic_breakdown'].items():
+            merged['topic_breakdown'][topic] = merged['topic_breakdown'].get(topic, 0) + count
+        for day, bucket in part['trend'].items():
+            target = merged['trend'].setdefault(day, {s: 0 for s in SENTIMENTS})
+            for sentiment, count in bucket.items():
+                target[sentiment] += count
+    return merged
+
+
+def statistics_response(aggregate):
+    """
+    Shape an aggregate like /api/statistics
+    """
+    total = aggregate['total_posts']
+    positive = aggregate['sentiment_breakdown']['positive']
+    return {
+        'total_posts': total,
+        'sentiment_breakdown': aggregate['sentiment_breakdown'],
+        'topic_breakdown': aggregate['topic_breakdown'],
+        'overall_sentiment_percentage': round((positive / total) * 100, 1) if total else 0
+    }
+
+
+def trend_response(aggregate):
+    """
+    Shape an aggregate as a date-ordered sentiment trend
+    """
+    return [
+        {'date': day, **bucket, 'total': sum(bucket.values())}
+        for day, bucket in sorted(aggregate['trend'].items())
+    ]
+
+
+# --- scatter-gather ------------------------------------------------------
+
+def _partition_corpus(path):
+    with _partition_lock:
+        corpus = _open_corpora.get(path)
+        if corpus is None:
+            corpus = _open_corpora[path] = open_partition(path)
+    corpus.refresh()
+    return corpus
+
+
+def partition_aggregate(path, filters=None):
+    """
+    Worker task: aggregate one partition (runs in a pool process)
+    Parquet partitions are counted from the sentiment, topic and timestamp
+    columns without reading post text
+    """
+    if is_parquet(path):
+        from columnar import aggregate_parquet
+        return aggregate_parquet(path, filters, _label_texts)
+
+    return aggregate_posts(iter(_partition_corpus(path)), filters)
+
+
+def sketch_path(path):
+    """
+    Stored sketches of a partition, next to its files
+    """
+    return os.path.splitext(path)[0] + '.sketches'
+
+
+def _sketch_source(path):
+    """
+    Identifies the data a partition's sketches are folded from: a rebuilt
+    corpus (new index inode) or a rewritten Parquet file starts them over
+    """
+    if is_parquet(path):
+        return [list(stat) for stat in partition_signature(path)]
+    return os.stat(corpus_paths(path)[1]).st_ino
+
+
+def _stored_sketches(path, source):
+    """
+    (SketchIndex, posts folded in) stored for a partition, or (None, 0)
+    when there are none for its data as of `source`
+    """
+    from sketches import SketchIndex
+
+    try:
+        index, meta = SketchIndex.load(sketch_path(path))
+    except FileNotFoundError:
+        return None, 0
+    if meta.get('source') != source:
+        return None, 0
+    return index, meta['posts']
+
+
+def update_partition_sketches(path, max_buckets=None):
+    """
+    Fold the posts of a partition that its stored sketches have not seen
+    into them and store them again; run after posts are added
+    Returns the number of posts folded in
+    """
+    from sketches import DEFAULT_MAX_BUCKETS, SketchIndex
+
+    stored = sketch_path(path)
+    # One writer at a time, so no post is folded in twice
+    with corpus_lock(stored, exclusive=True):
+        # A JSON partition is built into a corpus on first open
+        _partition_corpus(path)
+        # Taken before the corpus is remapped: if it is replaced in between,
+        # the stored source is already stale and the next update starts over
+        source = _sketch_source(path)
+        corpus = _partition_corpus(path)
+        index, seen = _stored_sketches(path, source)
+        if index is None or seen > len(corpus):
+            index, seen = SketchIndex(max_buckets or DEFAULT_MAX_BUCKETS), 0
+        start = seen
+        while seen < len(corpus):
+            posts = corpus.slice(seen, seen + 10000)
+            _label_missing(posts)
+            index.observe_many(posts)
+            seen += len(posts)
+        if seen != start or not os.path.exists(stored):
+            index.save(stored, source=source, posts=seen)
+    return seen - start
+
+
+def _sketches_stale(path):
+    """
+    Whether a partition has posts its stored sketches lack
+    """
+    from sketches import SketchIndex
+
+    try:
+        meta = SketchIndex.load_meta(sketch_path(path))
+    except FileNotFoundError:
+        return True
+    return meta.get('source') != _sketch_source(path) or meta['posts'] != len(_partition_corpus(path))
+
+
+def partition_sketches(path, query=None):
+    """
+    SketchSummary of one partition's stored sketches for a query
+    ({'topic', 'sentiment', 'since', 'until'}, all optional)
+    """
+    from sketches import SketchIndex
+
+    try:
+        summary, _ = SketchIndex.load_summary(sketch_path(path), **(query or {}))
+    except FileNotFoundError:
+        summary = SketchIndex().summary()
+    return summary
+
+
+def _pool_context():
+    # The pool is created inside an already threaded server worker; forking
+    # there copies locks other threads hold (logging, corpus, coalescer)
+    # into the children, so they start from a clean interpreter instead
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def get_executor(max_workers=None):
+    """
+    Shared process pool for partition tasks, created on first use
+    Every server worker gets its own pool of up to max_workers processes
+    """
+    global _executor
+    with _partition_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max_workers or DEFAULT_POOL_WORKERS,
+                                            mp_context=_pool_context())
+    return _executor
+
+
+def scatter(paths, task, *args, max_workers=None):
+    """
+    Run task(path, *args) for every partition in parallel
+    Returns {county: result}
+    """
+    if len(paths) == 1:
+        # Nothing to parallelize; skip the inter-process round trip
+        county, path = next(iter(paths.items()))
+        return {county: task(path, *args)}
+
+    executor = get_executor(max_workers)
+    futures = {county: executor.submit(task, path, *args) for county, path in paths.items()}
+    return {county: future.result() for county, future in futures.items()}
+
+
+def scatter_gather(paths, filters=None, max_workers=None):
+    """
+    Aggregate several partitions in parallel and merge the partials
+    Partitions whose files have not changed since the last query with the
+    same filters are not read again
+    Returns (merged aggregate, {county: partition total}); treat it as read-only
+    """
+    key = tuple(sorted((filters or {}).items()))
+    # Taken before reading: a partition that grows meanwhile is read again next time
+    signatures = {county: partition_signature(path) for county, path in paths.items()}
+    parts = {}
+    for county, path in paths.items():
+        cached = _aggregates.get((path, key))
+        if signatures[county] is not None and cached is not None and cached[0] == signatures[county]:
+            parts[county] = cached[1]
+
+    stale = {county: path for county, path in paths.items() if county not in parts}
+    if stale:
+        fresh = scatter(stale, partition_aggregate, filters, max_workers=max_workers)
+        with _partition_lock:
+            if len(_aggregates) + len(fresh) > AGGREGATE_CACHE_SIZE:
+                _aggregates.clear()
+            for county, part in fresh.items():
+                if signatures[county] is not None:
+                    _aggregates[(paths[county], key)] = (signatures[county], part)
+        parts.update(fresh)
+    parts = {county: parts[county] for county in paths}
+
+    if len(parts) == 1:
+        part = next(iter(parts.values()))
+        return part, {county: part['total_posts'] for county in parts}
+    return merge_aggregates(parts.values()), {county: part['total_posts'] for county, part in parts.items()}
+
+
+def scatter_gather_sketches(paths, query=None, max_workers=None, max_buckets=None):
+    """
+    Sketch summaries of several partitions' stored sketches, merged
+    Returns (merged SketchSummary, {county: partition posts})
+    """
+    stale = {county: path for county, path in paths.items() if _sketches_stale(path)}
+    if stale:
+        scatter(stale, update_partition_sketches, max_buckets, max_workers=max_workers)
+    parts = {county: partition_sketches(path, query) for county, path in paths.items()}
+    partition_posts = {county: summary.posts for county, summary in parts.items()}
+    summaries = iter(parts.values())
+    merged = next(summaries)
+    for summary in summaries:
+        merged.merge(summary)
+    return merged, partition_posts
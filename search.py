@@ -0,0 +1,823 @@
+"""
+Full-Text Search
+Positional inverted index over post text, for phrase and prefix queries
+
+Query syntax (every clause must match):
+    food truck          both words, anywhere in the post
+    "food truck"        the exact phrase
+    BTR-1               a word that splits into several tokens is a phrase (btr 1)
+    perm*               any word starting with "perm"
+
+Index layout:
+- main: postings of the first `cursor` posts of a source as flat arrays
+  (sorted term bytes, per-term offsets, one doc id and position per
+  occurrence, per-post length and filter codes). Published as a shared-memory
+  state (see shared_state.py), so every worker attaches the same copy.
+  Main doc ids are numbered shortest post first, and every BLOCK postings
+  record their first doc id (skip pointers) and highest term frequency.
+- delta: postings of posts added since, in growable arrays private to this
+  worker and appended to on ingest. Past `delta_max` posts the two are
+  merged into a new main and published; other workers move to it on their
+  next query.
+
+Results are ranked by BM25 over the matched clauses, ties newest first; a
+phrase scores the summed idf of its words, and a prefix the idf of the posts
+holding any of its words. Queries skip blocks (block-max pruning): the
+shortest postings list of the query is read a batch of blocks at a time,
+highest score bound first, and every other clause is searched for only in
+the posts left, until no block left can beat the page's lowest score.
+`total` then counts the matches read so far and is reported as not exact.
+Phrases and prefixes of the most common words prune little: their blocks
+rarely bound below a match, so they read most of their postings.
+
+Usage:
+    index = SearchIndex('search.miami-dade', CorpusSource(corpus), default_state())
+    index.search('"food truck" perm*', {'sentiment': 'negative'}, offset=0, count=20)
+"""
+
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from shared_state import SharedArrays, fingerprint
+
+FILTERS = ('topic', 'sentiment', 'source')
+MAX_TERM_LENGTH = 32        # longer tokens (URLs, hashes) are truncated
+MAX_POSITIONS = 65535       # tokens indexed per post (positions are uint16)
+MISSING = 255               # filter code of posts without the field
+DEFAULT_DELTA_MAX = 20000   # posts held in the delta before compacting
+BM25_K1 = 1.2
+BM25_B = 0.75
+BLOCK = 32                  # postings per term frequency bound
+FIRST_BLOCKS = 8            # blocks read before the first score threshold
+SEEK_POSTINGS = 16          # postings scanned in the time one doc is sought
+# Bump when the layout of the main arrays changes
+INDEX_FORMAT = 2
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+QUERY_PATTERN = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+@lru_cache(maxsize=65536)
+def tokenize(text):
+    """
+    Lowercase word tokens of a text, as indexed
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())[:MAX_POSITIONS]
+    return tuple(token[:MAX_TERM_LENGTH] for token in tokens)
+
+
+def parse_query(query):
+    """
+    [(kind, tokens)] clauses of a query; kind is 'term', 'phrase' or 'prefix'
+    Raises ValueError when the query has no searchable words
+    """
+    clauses = []
+    for match in QUERY_PATTERN.finditer(query):
+        phrase, word = match.groups()
+        if phrase is not None:
+            tokens = tokenize(phrase)
+            prefix = False
+        else:
+            tokens = tokenize(word)
+            prefix = word.endswith('*')
+        if not tokens:
+            continue
+        if prefix:
+            if len(tokens) > 1:
+                clauses.append(('phrase', tokens[:-1]) if len(tokens) > 2 else ('term', tokens[:1]))
+            clauses.append(('prefix', tokens[-1:]))
+        else:
+            clauses.append(('term', tokens) if len(tokens) == 1 else ('phrase', tokens))
+    if not clauses:
+        raise ValueError('Query has no searchable words')
+    return clauses
+
+
+def _runs(docs):
+    """
+    (unique docs, occurrences of each) of a sorted doc id array
+    """
+    if not len(docs):
+        return docs.astype(np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(docs)) + 1))
+    counts = np.diff(np.append(starts, len(docs)))
+    return docs[starts].astype(np.int64), counts
+
+
+def _member(sorted_values, values):
+    """
+    Boolean mask of values present in sorted_values
+    """
+    if not len(sorted_values):
+        return np.zeros(len(values), dtype=bool)
+    idx = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[idx] == values
+
+
+def _bm25(tfs, lengths, average_length):
+    """
+    BM25 term frequency part (without idf) for tf in posts of these lengths
+    """
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+    return tfs * (BM25_K1 + 1) / (tfs + norm)
+
+
+def _top(docs, scores, wanted):
+    """
+    (docs, scores) of the `wanted` best scores and every doc tied with the last
+    """
+    if wanted >= len(docs):
+        return docs, scores
+    cutoff = -np.partition(-scores, wanted - 1)[wanted - 1]
+    keep = scores >= cutoff
+    return docs[keep], scores[keep]
+
+
+def _keys(docs, positions):
+    """
+    Sortable (doc << 32 | position) keys of postings
+    """
+    return (docs.astype(np.int64) << 32) | positions
+
+
+def _phrase_docs(keys):
+    """
+    Sorted doc ids of every occurrence of a phrase, from the sorted keys of
+    each of its tokens
+    """
+    # Start from the rarest token and check its neighbours by offset
+    anchor = min(range(len(keys)), key=lambda i: len(keys[i]))
+    starts = keys[anchor][(keys[anchor] & 0xffffffff) >= anchor] - anchor
+    for i, token_keys in enumerate(keys):
+        if i != anchor:
+            starts = starts[_member(token_keys, starts + i)]
+    return starts >> 32
+
+
+def _empty_arrays():
+    arrays = {
+        'terms': np.zeros(0, dtype='S1'),
+        'starts': np.zeros(1, dtype=np.int64),
+        'docs': np.zeros(0, dtype=np.uint32),
+        'positions': np.zeros(0, dtype=np.uint16),
+        'block_tf': np.zeros(0, dtype=np.uint16),
+        'block_docs': np.zeros(0, dtype=np.uint32),
+        'dfs': np.zeros(0, dtype=np.uint32),
+        'lengths': np.zeros(0, dtype=np.uint16),
+        'keys': np.zeros(0, dtype=np.int64),
+    }
+    for field in FILTERS:
+        arrays[field] = np.zeros(0, dtype=np.uint8)
+    return arrays
+
+
+class PostIndex:
+    """
+    Read-only main postings plus an append-only delta; not thread-safe
+    """
+
+    def __init__(self, main=None):
+        self.main = main
+        arrays = main.arrays if main is not None else _empty_arrays()
+        meta = main.meta if main is not None else {}
+        self._terms = arrays['terms']
+        self._starts = arrays['starts']
+        self._docs = arrays['docs']
+        self._positions = arrays['positions']
+        self._block_tf = arrays['block_tf']
+        self._block_docs = arrays['block_docs']
+        self._dfs = arrays['dfs']
+        self._main_lengths = arrays['lengths']
+        self._main_keys = arrays['keys']
+        self._main_codes = {field: arrays[field] for field in FILTERS}
+        self.main_docs = len(self._main_lengths)
+        self.total_length = meta.get('total_length', 0)
+
+        categories = meta.get('categories', {})
+        self.categories = {field: list(categories.get(field, [])) for field in FILTERS}
+        self._codes = {field: {value: i for i, value in enumerate(values)}
+                       for field, values in self.categories.items()}
+
+        # Delta: term -> (doc ids, positions), its terms in order, plus per-post columns
+        self._postings = {}
+        self._delta_terms = []
+        self._keys = array('q')
+        self._lengths = array('H')
+        self._delta_codes = {field: array('B') for field in FILTERS}
+
+    def __len__(self):
+        return self.main_docs + len(self._lengths)
+
+    @property
+    def delta_docs(self):
+        return len(self._lengths)
+
+    def _code(self, field, value):
+        if value is None:
+            return MISSING
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            if len(codes) >= MISSING:
+                return MISSING
+            code = codes[value] = len(self.categories[field])
+            self.categories[field].append(value)
+        return code
+
+    def add(self, keys, posts):
+        """
+        Index posts; keys are what search() returns for them
+        """
+        doc = len(self)
+        postings = self._postings
+        for key, post in zip(keys, posts):
+            tokens = tokenize(post.get('text') or '')
+            for position, term in enumerate(tokens):
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array('I'), array('H'))
+                    insort(self._delta_terms, term)
+                entry[0].append(doc)
+                entry[1].append(position)
+            self._keys.append(key)
+            self._lengths.append(len(tokens))
+            self.total_length += len(tokens)
+            for field in FILTERS:
+                self._delta_codes[field].append(self._code(field, post.get(field)))
+            doc += 1
+
+    def compacted(self):
+        """
+        (arrays, meta) of main and delta merged into one main
+        Docs are renumbered shortest first (newest first among equal
+        lengths), so every term's postings start with the posts it can score
+        highest in
+        """
+        delta_terms = self._delta_terms
+        delta_bytes = np.array([term.encode('utf-8') for term in delta_terms] or [b''], dtype=bytes)
+        terms = np.union1d(self._terms, delta_bytes[:len(delta_terms)])
+
+        main_ids = np.repeat(np.searchsorted(terms, self._terms), np.diff(self._starts))
+        delta_entries = [self._postings[term] for term in delta_terms]
+        delta_ids = np.repeat(np.searchsorted(terms, delta_bytes[:len(delta_terms)]),
+                              [len(entry[0]) for entry in delta_entries]).astype(np.int64)
+        term_ids = np.concatenate((main_ids, delta_ids))
+        docs = np.concatenate([self._docs] + [np.array(entry[0], dtype=np.uint32) for entry in delta_entries])
+        positions = np.concatenate([self._positions] + [np.array(entry[1], dtype=np.uint16) for entry in delta_entries])
+
+        lengths = np.concatenate((self._main_lengths, np.array(self._lengths, dtype=np.uint16)))
+        keys = np.concatenate((self._main_keys, np.array(self._keys, dtype=np.int64)))
+        renumbered = np.lexsort((-keys, lengths))
+        new_ids = np.empty(len(lengths), dtype=np.int64)
+        new_ids[renumbered] = np.arange(len(lengths))
+        docs = new_ids[docs]
+
+        # Each (term, doc)'s positions are already in order and come from one
+        # source, so a stable sort by (term, doc) keeps them in order
+        order = np.argsort(term_ids * max(len(lengths), 1) + docs, kind='stable')
+        term_ids = term_ids[order]
+        docs = docs[order]
+        starts = np.concatenate(([0], np.cumsum(np.bincount(term_ids, minlength=len(terms)))))
+
+        # tf of every (term, doc) run; a block's bound is the highest tf of
+        # any run with a posting in it
+        runs = np.flatnonzero(np.diff(term_ids) | np.diff(docs)) + 1 if len(docs) else docs
+        runs = np.concatenate(([0], runs)) if len(docs) else runs
+        tfs = np.diff(np.append(runs, len(docs)))
+        block_tf = (np.maximum.reduceat(np.repeat(tfs, tfs), np.arange(0, len(docs), BLOCK))
+                    if len(docs) else tfs).astype(np.uint16)
+
+        arrays = {
+            'terms': terms,
+            'starts': starts.astype(np.int64),
+            'docs': docs.astype(np.uint32),
+            'positions': positions[order],
+            'block_tf': block_tf,
+            'block_docs': docs[::BLOCK].astype(np.uint32),
+            'dfs': np.bincount(term_ids[runs], minlength=len(terms)).astype(np.uint32),
+            'lengths': lengths[renumbered],
+            'keys': keys[renumbered],
+        }
+        for field in FILTERS:
+            codes = np.concatenate((self._main_codes[field], np.array(self._delta_codes[field], dtype=np.uint8)))
+            arrays[field] = codes[renumbered]
+        return arrays, {'categories': self.categories, 'total_length': self.total_length, 'format': INDEX_FORMAT}
+
+    # --- postings --------------------------------------------------------
+
+    def _main_ids(self, kind, token):
+        """
+        [lo, hi) ids of the main terms a clause token matches
+        Terms are sorted, so a prefix's terms are one contiguous range
+        """
+        needle = token.encode('utf-8')
+        if kind == 'prefix':
+            lo, hi = np.searchsorted(self._terms, [needle, needle + b'\xff'])
+            return int(lo), int(hi)
+        i = int(np.searchsorted(self._terms, needle))
+        if i < len(self._terms) and self._terms[i] == needle:
+            return i, i + 1
+        return i, i
+
+    def _delta_entries(self, kind, token):
+        """
+        (doc ids, positions) of every delta term a clause token matches
+        """
+        if kind == 'prefix':
+            terms = self._delta_terms
+            matched = terms[bisect_left(terms, token):bisect_left(terms, token + '\U0010ffff')]
+            return [self._postings[term] for term in matched]
+        entry = self._postings.get(token)
+        return [entry] if entry is not None else []
+
+    def _term_list(self, i):
+        """
+        (docs, positions, block tfs, block first docs) of main term i
+        Blocks are counted over all the postings, so the term's first block
+        may begin with another term's; its first doc stands in for that
+        block's
+        """
+        start, end = int(self._starts[i]), int(self._starts[i + 1])
+        blocks = slice(start // BLOCK, (end - 1) // BLOCK + 1)
+        skips = np.concatenate((self._docs[start:start + 1], self._block_docs[blocks][1:]))
+        return self._docs[start:end], self._positions[start:end], self._block_tf[blocks], skips
+
+    def _merged_list(self, lo, hi):
+        """
+        One list of the main postings of terms [lo, hi), in doc order, with a
+        block's tf bound counting a post's occurrences of any of them
+        """
+        docs = np.sort(self._docs[self._starts[lo]:self._starts[hi]])
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(docs)) + 1))
+        counts = np.diff(np.append(starts, len(docs)))
+        # A block's bound is the most occurrences of any post it touches
+        blocks = np.arange(0, len(docs), BLOCK)
+        first = np.searchsorted(starts, blocks, side='right') - 1
+        last = np.searchsorted(starts, np.minimum(blocks + BLOCK, len(docs)) - 1, side='right') - 1
+        tfs = np.maximum(np.maximum.reduceat(counts, first), counts[last])
+        return docs, None, tfs.astype(np.uint16), docs[::BLOCK]
+
+    @staticmethod
+    def _span_tf(postings, firsts):
+        """
+        Highest tf of a list over each doc span from one first to the next
+        A span ends where the next begins, so it ends no later than the block
+        the next one starts in. A list with fewer postings than two per span
+        has blocks wider than the spans, so its posts are placed exactly
+        """
+        docs, _, tfs, skips = postings
+        if len(docs) < 2 * len(firsts):
+            docs, counts = _runs(docs)
+            spans = np.searchsorted(firsts, docs, side='right') - 1
+            tf = np.zeros(len(firsts), dtype=np.int64)
+            np.maximum.at(tf, spans[spans >= 0], counts[spans >= 0])
+            return tf
+        lo = np.maximum(np.searchsorted(skips, firsts, side='right') - 1, 0)
+        return np.maximum(np.maximum.reduceat(tfs, lo), tfs[np.append(lo[1:], len(tfs) - 1)])
+
+    @staticmethod
+    def _span_postings(postings, firsts, ends):
+        """
+        Indices of a list's postings within any [first, end) doc span, in order
+        """
+        docs = postings[0]
+        lo = np.searchsorted(docs, firsts)
+        counts = np.searchsorted(docs, ends) - lo
+        return np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    def _plan(self, kind, tokens):
+        """
+        (idf, document frequency, delta matches, main lists) of a clause, or
+        None when no post can match it
+        A term has one list and a phrase one per word; a prefix's words are
+        merged into one. The idf is known before any posting is read: a
+        prefix takes the summed document frequency of its words and a phrase
+        the summed idf of its words (as Lucene scores phrases)
+        """
+        n = len(self)
+        idf = 0.0
+        lists = []
+        delta = []
+        for token in tokens:
+            lo, hi = self._main_ids(kind, token)
+            entries = self._delta_entries(kind, token)
+            delta_docs = [np.array(docs, dtype=np.uint32) for docs, _ in entries]
+            df = int(self._dfs[lo:hi].sum()) + sum(1 + np.count_nonzero(np.diff(docs)) for docs in delta_docs)
+            if not df:
+                return None
+            df = min(df, n)
+            idf += np.log(1 + (n - df + 0.5) / (df + 0.5))
+            if kind == 'phrase':
+                lists.append(self._term_list(lo) if lo < hi else None)
+                delta.append(_keys(delta_docs[0], np.array(entries[0][1], dtype=np.uint16)) if entries
+                             else np.zeros(0, dtype=np.int64))
+            else:
+                lists = [self._term_list(lo) if hi - lo == 1 else self._merged_list(lo, hi)]
+                delta = np.sort(np.concatenate(delta_docs)) if delta_docs else np.zeros(0, dtype=np.uint32)
+        delta = _runs(_phrase_docs(delta) if kind == 'phrase' else delta)
+        if None in lists:
+            # A phrase word missing from main: only delta posts can match
+            lists = []
+        return idf, df, delta, lists
+
+    def _tf(self, kind, lists, docs, firsts, ends, source, read):
+        """
+        Occurrences of a clause in each of the main docs, all within the
+        [first, end) doc spans, where the source list's postings `read` are
+        A list is read whole over the spans, or where that holds far more
+        postings than there are docs, searched for each doc
+        """
+        found = []
+        for postings in lists:
+            idx = read if postings is source else self._span_postings(postings, firsts, ends)
+            if len(docs) * SEEK_POSTINGS < len(idx):
+                # Same dtype as the postings, so searchsorted does not copy them
+                needles = docs.astype(postings[0].dtype)
+                start = np.searchsorted(postings[0], needles)
+                counts = np.searchsorted(postings[0], needles, side='right') - start
+                idx = np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            found.append(idx)
+        if kind == 'phrase':
+            # Only postings in the docs left can be part of a match
+            left = np.zeros(self.main_docs, dtype=bool)
+            left[docs] = True
+            keys = []
+            for postings, idx in zip(lists, found):
+                idx = idx[left[postings[0][idx]]]
+                keys.append(_keys(postings[0][idx], postings[1][idx]))
+            occurrences = _phrase_docs(keys)
+        else:
+            occurrences = lists[0][0][found[0]]
+        occurrences, counts = _runs(occurrences)
+        # Search the fewer among the more
+        if len(docs) < len(occurrences):
+            idx = np.minimum(np.searchsorted(occurrences, docs), len(occurrences) - 1)
+            return np.where(occurrences[idx] == docs, counts[idx], 0)
+        idx = np.minimum(np.searchsorted(docs, occurrences), max(len(docs) - 1, 0))
+        hit = docs[idx] == occurrences if len(docs) else np.zeros(len(occurrences), dtype=bool)
+        tf = np.zeros(len(docs), dtype=np.int64)
+        tf[idx[hit]] = counts[hit]
+        return tf
+
+    def _read(self, plans, source, firsts, ends, codes):
+        """
+        (docs, BM25 scores) of the main posts in the [first, end) doc spans
+        that match every clause and pass the filters
+        Only the source list is read over the spans; every clause is then
+        looked up at the docs that are left
+        """
+        read = self._span_postings(source, firsts, ends)
+        docs, counts = _runs(source[0][read])
+        for field, code in codes.items():
+            keep = self._main_codes[field][docs] == code
+            docs = docs[keep]
+            counts = counts[keep]
+        # A clause of the source list alone occurs as often as it was read
+        tfs = {i: counts for i, plan in enumerate(plans) if plan[0] != 'phrase' and plan[5][0] is source}
+        # Rarest clause first, so each lookup is at fewer docs
+        for i in sorted(range(len(plans)), key=lambda i: sum(len(postings[0]) for postings in plans[i][5])):
+            if i in tfs:
+                continue
+            kind, _, _, _, _, lists = plans[i]
+            tf = self._tf(kind, lists, docs, firsts, ends, source, read)
+            found = tf > 0
+            docs = docs[found]
+            tfs = {j: counts[found] for j, counts in tfs.items()}
+            tfs[i] = tf[found]
+
+        scores = np.zeros(len(docs))
+        if len(docs):
+            lengths = self._main_lengths[docs].astype(np.float64)
+            # Summed in clause order, as _rank does
+            for i, (_, _, idf, _, _, _) in enumerate(plans):
+                scores += idf * _bm25(tfs[i], lengths, self.total_length / len(self))
+        return docs, scores
+
+    # --- per-post columns ------------------------------------------------
+
+    def _column(self, main, delta, docs, dtype):
+        if not len(delta):
+            return main[docs].astype(dtype, copy=False)
+        values = np.empty(len(docs), dtype=dtype)
+        in_main = docs < self.main_docs
+        values[in_main] = main[docs[in_main]]
+        if not in_main.all():
+            values[~in_main] = np.array(delta, dtype=dtype)[docs[~in_main] - self.main_docs]
+        return values
+
+    def _rank(self, matches, idfs, codes):
+        """
+        (docs, BM25 scores) of the docs in every clause that pass the filters
+        """
+        # Filter the rarest clause, then intersect the others into it,
+        # carrying each clause's term frequencies along with the surviving docs
+        order = sorted(range(len(matches)), key=lambda i: len(matches[i][0]))
+        docs, counts = matches[order[0]]
+        for field, code in codes.items():
+            keep = self._column(self._main_codes[field], self._delta_codes[field], docs, np.uint8) == code
+            docs = docs[keep]
+            counts = counts[keep]
+        tfs = {order[0]: counts}
+        for i in order[1:]:
+            clause_docs, clause_counts = matches[i]
+            idx = np.minimum(np.searchsorted(clause_docs, docs), max(len(clause_docs) - 1, 0))
+            found = clause_docs[idx] == docs if len(clause_docs) else np.zeros(len(docs), dtype=bool)
+            docs = docs[found]
+            tfs = {j: tf[found] for j, tf in tfs.items()}
+            tfs[i] = clause_counts[idx[found]]
+
+        scores = np.zeros(len(docs))
+        if len(docs):
+            lengths = self._column(self._main_lengths, self._lengths, docs, np.float64)
+            # Summed in clause order, so a doc scores the same in any batch
+            for i, idf in enumerate(idfs):
+                scores += idf * _bm25(tfs[i], lengths, self.total_length / len(self))
+        return docs, scores
+
+    def _search(self, clauses, codes, wanted):
+        """
+        (docs, scores, total, exact) holding the `wanted` best docs matching
+        every clause and any tied with them
+        The delta is ranked whole. Main postings are read by the blocks of
+        the shortest list (a word's, a prefix's or a phrase word's): each
+        block spans the docs up to the next one's first, bounded by its own
+        tf and every other list's highest block tf over that span, found
+        through the list's block firsts. Blocks are read a batch at a time,
+        highest bounds first, until none left can reach the wanted-th score
+        """
+        plans = []
+        # A repeated clause counts once per repeat
+        for (kind, tokens), repeats in Counter(clauses).items():
+            plan = self._plan(kind, tokens)
+            if plan is None:
+                return np.zeros(0, dtype=np.int64), np.zeros(0), 0, True
+            idf, df, delta, lists = plan
+            plans.append((kind, tokens, repeats * idf, df, delta, lists))
+        idfs = [plan[2] for plan in plans]
+        docs, scores = self._rank([plan[4] for plan in plans], idfs, codes)
+        total = len(docs)
+        if any(not plan[5] for plan in plans):
+            return docs, scores, total, True
+
+        # Every match is in each list, so the shortest bounds the spans
+        driver = min((postings for plan in plans for postings in plan[5]), key=lambda postings: len(postings[0]))
+        firsts = driver[3]
+        ends = np.append(firsts[1:], driver[0][-1] + np.uint32(1))
+        # Posts are numbered shortest first, so a span's first post is its shortest
+        lengths = self._main_lengths[firsts]
+        bounds = np.zeros(len(firsts))
+        for _, _, idf, _, _, lists in plans:
+            tfs = [driver[2] if postings is driver else self._span_tf(postings, firsts) for postings in lists]
+            # A phrase occurs no more often than any of its words
+            bounds += idf * _bm25(np.minimum.reduce(tfs), lengths, self.total_length / len(self))
+        bounds[firsts == ends] = -np.inf
+
+        threshold = -np.inf
+        if len(docs) >= wanted > 0:
+            docs, scores = _top(docs, scores, wanted)
+            threshold = scores.min()
+        # Margin so a rounding difference cannot skip a tied doc
+        reach = bounds * (1 + 1e-9)
+        unread = bounds > -np.inf
+        batch = FIRST_BLOCKS
+        while True:
+            chosen = np.flatnonzero(unread & (reach >= threshold))
+            if not len(chosen):
+                break
+            if len(chosen) > batch:
+                chosen = np.sort(chosen[np.argpartition(-bounds[chosen], batch - 1)[:batch]])
+            unread[chosen] = False
+            batch *= 2
+            # Adjacent spans are read as one
+            joined = np.flatnonzero(np.diff(chosen, prepend=-2) != 1)
+            last = chosen[np.append(joined[1:], len(chosen)) - 1]
+            found, found_scores = self._read(plans, driver, firsts[chosen[joined]], ends[last], codes)
+            total += len(found)
+            docs = np.concatenate((docs, found))
+            scores = np.concatenate((scores, found_scores))
+            if len(docs) >= wanted > 0:
+                docs, scores = _top(docs, scores, wanted)
+                threshold = scores.min()
+
+        if not unread.any():
+            return docs, scores, total, True
+        if len(plans) == 1 and plans[0][0] == 'term' and not codes:
+            # Every post with the word matches
+            return docs, scores, plans[0][3], True
+        return docs, scores, total, False
+
+    def search(self, clauses, filters=None, offset=0, count=20):
+        """
+        (keys, scores, total matches, whether total is exact) for one page of
+        the ranked results; total is a lower bound when the query stopped
+        early
+        """
+        codes = {}
+        for field, value in (filters or {}).items():
+            code = self._codes[field].get(value)
+            if code is None:
+                return [], [], 0, True
+            codes[field] = code
+
+        wanted = offset + count
+        docs, scores, total, exact = self._search([(kind, tuple(tokens)) for kind, tokens in clauses],
+                                                  codes, wanted)
+        if wanted <= 0 or not len(docs):
+            return [], [], total, exact
+
+        docs, scores = _top(docs, scores, wanted)
+        keys = self._column(self._main_keys, self._keys, docs, np.int64)
+        # Ties break newest first
+        order = np.lexsort((-keys, -scores))[offset:wanted]
+        return keys[order].tolist(), scores[order].tolist(), total, exact
+
+    def stats(self):
+        delta_bytes = sum(docs.itemsize * len(docs) + positions.itemsize * len(positions)
+                          for docs, positions in self._postings.values())
+        delta_bytes += len(self._lengths) * (self._keys.itemsize + self._lengths.itemsize + len(FILTERS))
+        return {
+            'posts': len(self),
+            'delta_posts': self.delta_docs,
+            'main_terms': len(self._terms),
+            'delta_terms': len(self._postings),
+            'shared': self.main is not None and self.main.shared,
+            'main_bytes': self.main.nbytes() if self.main is not None else 0,
+            'delta_bytes': delta_bytes
+        }
+
+
+class CorpusSource:
+    """
+    Posts of a mapped (or Parquet) corpus; keys are post positions
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.path = os.path.abspath(getattr(corpus, 'jsonl_path', None) or corpus.path)
+
+    def identity(self):
+        # A rebuilt corpus is a new file, so index entries from the old one are
+        # invalid; the first post guards against a reused inode number
+        with open(self.path, 'rb') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            head = f.read(4096).split(b'\n', 1)[0]
+        return f'{self.path}:{inode}:{fingerprint(head)}'
+
+    def end(self):
+        self.corpus.refresh()
+        return len(self.corpus)
+
+    def read(self, cursor, end, limit):
+        stop = min(end, cursor + limit)
+        return range(cursor, stop), self.corpus.slice(cursor, stop), stop
+
+    def fetch(self, keys):
+        return [self.corpus.slice(key, key + 1)[0] for key in keys]
+
+
+class StoreSource:
+    """
+    Posts of a SQLiteStore; keys are rowids
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def identity(self):
+        return f'sqlite:{os.path.abspath(self.store.path)}'
+
+    def end(self):
+        return self.store.max_rowid()
+
+    def read(self, cursor, end, limit):
+        rowids, posts = self.store.keyed_posts_after(cursor, limit)
+        while rowids and rowids[-1] > end:
+            rowids.pop()
+            posts.pop()
+        return rowids, posts, rowids[-1] if rowids else end
+
+    def fetch(self, keys):
+        posts = self.store.posts_by_rowid(keys)
+        return [posts.get(key) for key in keys]
+
+
+class SearchIndex:
+    """
+    A PostIndex kept in step with a source and shared through a SharedState
+    label_texts(texts) labels posts stored without a sentiment
+    """
+
+    def __init__(self, name, source, state, label_texts=None, delta_max=DEFAULT_DELTA_MAX, batch_size=10000):
+        self.name = name
+        self.source = source
+        self.state = state
+        self.label_texts = label_texts
+        self.delta_max = delta_max
+        self.batch_size = batch_size
+        self.index = None
+        self.identity = None
+        self.cursor = 0
+        self._lock = threading.Lock()
+
+    def _read(self, index, cursor, end):
+        while cursor < end:
+            keys, posts, cursor = self.source.read(cursor, end, self.batch_size)
+            missing = [post for post in posts if 'sentiment' not in post]
+            if missing and self.label_texts is not None:
+                for post, sentiment in zip(missing, self.label_texts([p.get('text', '') for p in missing])):
+                    post['sentiment'] = sentiment
+            index.add(keys, posts)
+        return cursor
+
+    def _publish(self, cursor, build):
+        """
+        Attach the main for (identity, cursor), building it when no worker has
+        """
+        def build_meta():
+            arrays, meta = build()
+            return arrays, {**meta, 'source': self.identity, 'cursor': cursor}
+
+        version = fingerprint(INDEX_FORMAT, self.name, self.identity, cursor)
+        if self.state is None:
+            return SharedArrays(self.name, version, *build_meta())
+        return self.state.load(self.name, version, build_meta)
+
+    def _current(self, main):
+        """
+        Whether a published main indexes this source in this layout
+        """
+        return main.meta.get('source') == self.identity and main.meta.get('format') == INDEX_FORMAT
+
+    def _open(self):
+        """
+        Start from the published main when it indexes this source, otherwise
+        build one over everything the source holds now
+        """
+        self.identity = self.source.identity()
+        end = self.source.end()
+        main = self.state.current(self.name) if self.state is not None else None
+        if main is None or not self._current(main) or main.meta['cursor'] > end:
+            def build():
+                index = PostIndex()
+                self._read(index, 0, end)
+                return index.compacted()
+            main = self._publish(end, build)
+        self.index = PostIndex(main)
+        self.cursor = main.meta['cursor']
+
+    def catch_up(self):
+        """
+        Index posts added to the source since the last call
+        """
+        with self._lock:
+            self._catch_up()
+
+    def _catch_up(self):
+        if self.index is None or self.source.identity() != self.identity:
+            self._open()
+        elif self.state is not None:
+            main = self.state.refresh(self.index.main)
+            if main is not self.index.main and self._current(main) \
+                    and main.meta['cursor'] > self.index.main.meta['cursor']:
+                # Another worker compacted; its main replaces our delta
+                self.index = PostIndex(main)
+                self.cursor = main.meta['cursor']
+
+        end = self.source.end()
+        if end < self.cursor:
+            self._open()
+            end = self.source.end()
+        self.cursor = self._read(self.index, self.cursor, end)
+
+        if self.index.delta_docs > self.delta_max:
+            self.index = PostIndex(self._publish(self.cursor, self.index.compacted))
+
+    def search(self, query, filters=None, offset=0, count=20):
+        """
+        (posts with a `relevance` score, total matches, whether total is
+        exact) for one page
+        Raises ValueError for a query with no searchable words
+        """
+        clauses = parse_query(query)
+        with self._lock:
+            self._catch_up()
+            keys, scores, total, exact = self.index.search(clauses, filters, offset, count)
+        posts = []
+        for post, score in zip(self.source.fetch(keys), scores):
+            if post is not None:  # replaced or deleted since it was indexed
+                post['relevance'] = round(score, 4)
+                posts.append(post)
+        return posts, total, exact
+
+    def stats(self):
+        with self._lock:
+            if self.index is None:
+                return {'posts': 0}
+            return self.index.stats()
@@ -0,0 +1,121 @@
+"""
+Fast JSON Serialization
+Pluggable JSON encoder for Flask plus response compression and static payloads
+
+- FastJSONProvider: every jsonify() call goes through orjson when it is
+  installed (JSON_SERIALIZER=orjson, the default) or the stdlib encoder
+  (JSON_SERIALIZER=json)
+- compress_response: gzip for large responses when the client accepts it
+- StaticPayload: bodies that never change (resource catalog, index page)
+  are encoded and gzipped once at startup, with an ETag for 304s; the
+  buffers may live in shared memory (see shared_state.py)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'orjson')
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = 5
+
+
+def use_orjson():
+    return orjson is not None and JSON_SERIALIZER == 'orjson'
+
+
+def dumps_bytes(obj, sort_keys=False, default=None):
+    """
+    Serialize to UTF-8 JSON bytes with the configured encoder
+    """
+    if use_orjson():
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, default=default, sort_keys=sort_keys, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by dumps_bytes
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                           default=DefaultJSONProvider.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if use_orjson() and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, default=DefaultJSONProvider.default)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def accepts_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def compress_response(response):
+    """
+    after_request hook: gzip large buffered responses for gzip-capable clients
+    Streaming responses (e.g. /api/stream) are left untouched
+    """
+    if (response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or not accepts_gzip()):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.set_data(gzip.compress(body, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+class StaticPayload:
+    """
+    A response body encoded (and gzipped) once, served with an ETag
+    body and gzipped may also be memoryviews of prebuilt buffers
+    """
+
+    def __init__(self, body, mimetype='application/json', gzipped=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        elif not isinstance(body, (bytes, memoryview)):
+            body = dumps_bytes(body)
+        self.body = body
+        self.gzipped = gzipped if gzipped is not None else gzip.compress(body, 9)
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+
+    def response(self):
+        # bytes() copies shared-memory views and is free for bytes
+        if request.if_none_match.contains(self.etag):
+            response = Response(status=304)
+        elif accepts_gzip():
+            response = Response(bytes(self.gzipped), mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(bytes(self.body), mimetype=self.mimetype)
+        response.set_etag(self.etag)
+        response.vary.add('Accept-Encoding')
+        return response
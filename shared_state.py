@@ -0,0 +1,288 @@
+"""
+Cross-Worker Shared State
+Read-mostly NumPy arrays in named shared-memory segments
+
+One process builds a set of arrays and publishes them as a shared-memory
+segment; every other worker attaches to the same segment instead of building
+its own copy, so memory for this state stays constant as workers are added.
+
+Layout:
+    <dir>/manifest.json   {name: {version, segment, arrays, meta}} of the
+                          current version of every published state
+    <dir>/manifest.lock   flock held while building and publishing
+
+Version swaps:
+- A new version is built into a fresh segment and only then published by
+  atomically replacing the manifest, so nobody attaches a half-built segment
+- The publisher unlinks the previous segment's name; workers still mapped
+  to it keep a valid mapping until they move to the new version (refresh)
+  or exit, then the OS frees it
+
+When shared memory is unavailable (or SHARED_STATE=off) load() falls back to
+building the arrays locally, so callers never need a second code path.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: building is only serialized within a process
+    fcntl = None
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    resource_tracker = shared_memory = None
+
+SHARED_STATE_DIR = os.environ.get('SHARED_STATE_DIR', 'shared_state')
+SHARED_STATE_ENABLED = os.environ.get('SHARED_STATE', 'on') != 'off'
+ALIGNMENT = 64
+
+_default_state = None
+
+
+def fingerprint(*parts):
+    """
+    Short version string for the data a state was built from
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def _untrack(segment):
+    # Segments outlive the process that created or attached them; stop the
+    # resource tracker from unlinking them when a worker exits
+    try:
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+class SharedArrays:
+    """
+    One version of a named state: read-only arrays plus JSON metadata
+    """
+
+    def __init__(self, name, version, arrays, meta=None, segment=None):
+        self.name = name
+        self.version = version
+        self.arrays = arrays
+        self.meta = meta or {}
+        self.segment = segment
+
+    @property
+    def shared(self):
+        return self.segment is not None
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def __contains__(self, key):
+        return key in self.arrays
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+
+class SharedState:
+    """
+    Registry of named shared-memory states for one deployment directory
+    """
+
+    def __init__(self, directory, enabled=True):
+        self.directory = directory
+        self.enabled = enabled and shared_memory is not None
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.lock_path = os.path.join(directory, 'manifest.lock')
+        # Segment names are global to the machine; keep deployments apart
+        self.prefix = 'sbs' + fingerprint(os.path.abspath(directory))[:8]
+        self._local_lock = threading.Lock()
+        self._manifest_signature = None
+        self._manifest = {}
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    # --- manifest --------------------------------------------------------
+
+    def _read_manifest(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return {}
+        # os.replace gives every manifest version a new inode
+        signature = (stat.st_ino, stat.st_mtime_ns)
+        if signature != self._manifest_signature:
+            with open(self.manifest_path) as f:
+                self._manifest = json.load(f)
+            self._manifest_signature = signature
+        return self._manifest
+
+    def _write_manifest(self, manifest):
+        tmp = f'{self.manifest_path}.tmp{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    @contextmanager
+    def _locked(self):
+        """
+        Exclusive across threads and processes (flock on the lock file)
+        """
+        with self._local_lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- segments --------------------------------------------------------
+
+    def _attach(self, name, entry):
+        segment = shared_memory.SharedMemory(name=entry['segment'])
+        _untrack(segment)
+        arrays = {}
+        for key, (offset, dtype, shape) in entry['arrays'].items():
+            array = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=segment.buf, offset=offset)
+            array.flags.writeable = False
+            arrays[key] = array
+        return SharedArrays(name, entry['version'], arrays, entry.get('meta'), segment)
+
+    def publish(self, name, version, arrays, meta=None):
+        """
+        Copy arrays into a new segment and make it the current version
+        Caller holds the manifest lock
+        """
+        arrays = {key: np.ascontiguousarray(array) for key, array in arrays.items()}
+        layout = {}
+        size = 0
+        for key, array in arrays.items():
+            size = -(-size // ALIGNMENT) * ALIGNMENT
+            layout[key] = [size, array.dtype.str, list(array.shape)]
+            size += array.nbytes
+
+        segment = shared_memory.SharedMemory(
+            name=f'{self.prefix}_{uuid.uuid4().hex[:12]}', create=True, size=max(size, 1)
+        )
+        _untrack(segment)
+        for key, array in arrays.items():
+            offset = layout[key][0]
+            segment.buf[offset:offset + array.nbytes] = array.tobytes()
+
+        manifest = dict(self._read_manifest())
+        previous = manifest.get(name)
+        manifest[name] = {
+            'version': version,
+            'segment': segment.name,
+            'arrays': layout,
+            'meta': meta or {}
+        }
+        self._write_manifest(manifest)
+        segment.close()
+
+        if previous:
+            self._unlink(previous['segment'])
+
+    @staticmethod
+    def _unlink(segment_name):
+        try:
+            segment = shared_memory.SharedMemory(name=segment_name)
+        except FileNotFoundError:
+            return
+        segment.close()
+        segment.unlink()
+
+    # --- public API ------------------------------------------------------
+
+    def load(self, name, version, build):
+        """
+        Attach to `name` at `version`, building and publishing it first when
+        no process has yet. build() returns (arrays, meta).
+        """
+        if self.enabled:
+            try:
+                with self._locked():
+                    entry = self._read_manifest().get(name)
+                    if entry is None or entry['version'] != version:
+                        arrays, meta = build()
+                        self.publish(name, version, arrays, meta)
+                        entry = self._read_manifest()[name]
+                    try:
+                        return self._attach(name, entry)
+                    except FileNotFoundError:
+                        # Manifest outlived its segment (e.g. after a reboot)
+                        arrays, meta = build()
+                        self.publish(name, version, arrays, meta)
+                        return self._attach(name, self._read_manifest()[name])
+            except OSError:
+                pass
+        arrays, meta = build()
+        return SharedArrays(name, version, arrays, meta)
+
+    def refresh(self, current):
+        """
+        Return the published version of current.name if it changed, otherwise
+        current. The old mapping is released once nothing references it.
+        """
+        if not current.shared:
+            return current
+        with self._local_lock:
+            entry = self._read_manifest().get(current.name)
+        if entry is None or entry['version'] == current.version:
+            return current
+        try:
+            return self._attach(current.name, entry)
+        except FileNotFoundError:
+            # Superseded again while we looked; keep serving the mapping we have
+            return current
+
+    def current(self, name):
+        """
+        Attach whatever version of `name` is published, or None when there
+        is none (or shared memory is off). For states that callers extend
+        from a published base rather than rebuild to an exact version.
+        """
+        if not self.enabled:
+            return None
+        with self._local_lock:
+            entry = self._read_manifest().get(name)
+        if entry is None:
+            return None
+        try:
+            return self._attach(name, entry)
+        except FileNotFoundError:
+            return None
+
+    def release(self, name):
+        """
+        Unlink a state's segment and drop it from the manifest
+        """
+        if not self.enabled:
+            return
+        with self._locked():
+            manifest = dict(self._read_manifest())
+            entry = manifest.pop(name, None)
+            if entry:
+                self._write_manifest(manifest)
+                self._unlink(entry['segment'])
+
+
+def default_state():
+    """
+    This process's SharedState for SHARED_STATE_DIR
+    """
+    global _default_state
+    if _default_state is None:
+        _default_state = SharedState(SHARED_STATE_DIR, SHARED_STATE_ENABLED)
+    return _default_state
@@ -0,0 +1,435 @@
+"""
+Streaming Sketch Analytics
+Distinct authors and heavy-hitter terms per topic and day, in fixed memory
+
+Each (topic, day, sentiment) bucket keeps:
+- a HyperLogLog over post authors (distinct counts; the union of buckets is
+  a register-wise max, so "distinct authors across sentiments" is exact to
+  the sketch's error, not a sum)
+- a Count-Min sketch over the terms of the post text, plus a bounded set of
+  candidate heavy hitters ranked by their Count-Min estimate
+
+Every sketch has a fixed size, at most `max_buckets` days are kept (oldest
+dropped first), and hashes are stable across processes, so sketches built
+by different workers or partitions merge exactly: HyperLogLogs by register
+max, Count-Min tables by addition. An index can be saved to a file and
+summarized from it, mapping only the buckets a query selects, so it is
+built once as posts arrive rather than per query.
+
+Usage:
+    index = SketchIndex()
+    index.observe_many(posts)                       # after analysis
+    index.save('posts.sketches', posts=len(posts))
+    summary, meta = SketchIndex.load_summary('posts.sketches', topic='permits')
+    summary = index.summary(topic='permits', sentiment='negative')
+    summary.merge(other_partition_summary)
+    summary.response(k=10)
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+HLL_PRECISION = 10          # 1024 registers, ~3% standard error
+CMS_WIDTH = 256
+CMS_DEPTH = 4
+DEFAULT_TOP_K = 20
+DEFAULT_MAX_BUCKETS = 60    # days kept per index
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+# Length of the JSON header at the start of a saved index
+STORED_HEADER = struct.Struct('<Q')
+
+TERM_PATTERN = re.compile(r"[a-z][a-z'-]{2,}")
+STOPWORDS = frozenset("""
+    the and for are but not you all any can had her was one our out has him his how its
+    may new now old see two way who did get got let say she too use been from have into
+    just like more most much only over some such than that them then they this very what
+    when will with your about after again also been being could does doing each even ever
+    every here just last made make many must need never other same should since still
+    their there these those through under until were where which while would yet it's i'm
+    don't can't anyone anybody someone really
+""".split())
+
+_MASK64 = (1 << 64) - 1
+
+
+@lru_cache(maxsize=200000)
+def hash64(value):
+    """
+    Process-independent 64-bit hash (Python's hash() is salted per process)
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def terms(text):
+    """
+    Lowercase words of a post worth counting
+    """
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch with 2**precision one-byte registers
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    @staticmethod
+    @lru_cache(maxsize=200000)
+    def _position(value, precision):
+        h = hash64(value)
+        rest = (h << precision) & _MASK64
+        rank = 64 - precision + 1 if rest == 0 else 65 - rest.bit_length()
+        return h >> (64 - precision), rank
+
+    def add_many(self, values):
+        if not values:
+            return
+        positions = np.array([self._position(value, self.precision) for value in values], dtype=np.int64)
+        np.maximum.at(self.registers, positions[:, 0], positions[:, 1].astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        return HyperLogLog(self.precision, self.registers.copy())
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class CountMinTopK:
+    """
+    Count-Min sketch of term frequencies with a bounded heavy-hitter set
+    """
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, capacity=DEFAULT_TOP_K * 2,
+                 table=None, candidates=None):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.int32)
+        self.candidates = set(candidates or ())
+        self._rows = np.arange(depth)[:, None]
+
+    @staticmethod
+    @lru_cache(maxsize=200000)
+    def _columns(term, width, depth):
+        # Double hashing: depth independent-enough columns from one 64-bit hash
+        h = hash64(term)
+        h1, h2 = h & 0xffffffff, (h >> 32) | 1
+        return tuple((h1 + i * h2) % width for i in range(depth))
+
+    def _positions(self, values):
+        return np.array([self._columns(value, self.width, self.depth) for value in values],
+                        dtype=np.int64).T
+
+    def add_many(self, values):
+        if not values:
+            return
+        columns = self._positions(values)
+        np.add.at(self.table, (np.broadcast_to(self._rows, columns.shape), columns), 1)
+        self.candidates.update(values)
+        if len(self.candidates) > self.capacity:
+            self._prune()
+
+    def estimate(self, values):
+        if not values:
+            return np.zeros(0, dtype=np.int64)
+        return self.table[self._rows, self._positions(values)].min(axis=0)
+
+    def _prune(self):
+        ranked = self.top(self.capacity // 2)
+        self.candidates = {term for term, _ in ranked}
+
+    def top(self, k):
+        """
+        [(term, estimated count)] for the k heaviest candidates
+        """
+        candidates = sorted(self.candidates)
+        counts = self.estimate(candidates)
+        order = np.argsort(-counts, kind='stable')[:k]
+        return [(candidates[i], int(counts[i])) for i in order]
+
+    def merge(self, other):
+        self.table += other.table
+        self.candidates |= other.candidates
+        if len(self.candidates) > self.capacity:
+            self._prune()
+        return self
+
+    def copy(self):
+        return CountMinTopK(self.width, self.depth, self.capacity, self.table.copy(), self.candidates)
+
+
+class _Bucket:
+    """
+    Sketches for one (topic, day, sentiment)
+    """
+
+    __slots__ = ('authors', 'terms', 'posts')
+
+    def __init__(self, precision, width, depth, capacity):
+        self.authors = HyperLogLog(precision)
+        self.terms = CountMinTopK(width, depth, capacity)
+        self.posts = 0
+
+
+def _selected(key, topic, sentiment, since, until):
+    """
+    Whether a (topic, day, sentiment) bucket matches a summary query
+    """
+    bucket_topic, day, bucket_sentiment = key
+    if (topic and bucket_topic != topic) or (sentiment and bucket_sentiment != sentiment):
+        return False
+    return not ((since and day < since) or (until and day > until))
+
+
+class SketchSummary:
+    """
+    Merged sketches for one query: overall distinct authors and terms, plus
+    distinct authors and post counts per day. Picklable and mergeable, so
+    partitions can each build one and the caller merges them.
+    """
+
+    def __init__(self, authors, terms, days=None, posts=0):
+        self.authors = authors
+        self.terms = terms
+        self.days = days or {}
+        self.posts = posts
+
+    def merge(self, other):
+        self.authors.merge(other.authors)
+        self.terms.merge(other.terms)
+        for day, (authors, posts) in other.days.items():
+            if day in self.days:
+                mine, count = self.days[day]
+                self.days[day] = (mine.merge(authors), count + posts)
+            else:
+                self.days[day] = (authors.copy(), posts)
+        self.posts += other.posts
+        return self
+
+    def response(self, k=10):
+        return {
+            'distinct_authors': self.authors.count(),
+            'posts': self.posts,
+            'top_terms': [{'term': term, 'count': count} for term, count in self.terms.top(k)],
+            'days': [
+                {'date': day, 'distinct_authors': authors.count(), 'posts': posts}
+                for day, (authors, posts) in sorted(self.days.items())
+            ]
+        }
+
+
+class SketchIndex:
+    """
+    Per-(topic, day, sentiment) sketches, updated as posts are analyzed
+    """
+
+    def __init__(self, max_buckets=DEFAULT_MAX_BUCKETS, precision=HLL_PRECISION,
+                 width=CMS_WIDTH, depth=CMS_DEPTH, top_k=DEFAULT_TOP_K):
+        self.max_buckets = max_buckets
+        self.precision = precision
+        self.width = width
+        self.depth = depth
+        self.capacity = top_k * 2
+        self._buckets = {}
+        self._days = set()
+        self._lock = threading.Lock()
+
+    def _empty_summary(self):
+        return SketchSummary(HyperLogLog(self.precision), CountMinTopK(self.width, self.depth, self.capacity))
+
+    def observe_many(self, posts):
+        """
+        Fold analyzed posts into their buckets, one sketch update per bucket
+        """
+        groups = {}
+        for post in posts:
+            sentiment = post.get('sentiment', 'neutral')
+            if sentiment not in SENTIMENTS:
+                continue
+            day = str(post.get('timestamp') or post.get('created_at') or '')[:10] or 'unknown'
+            key = (post.get('topic', 'general'), day, sentiment)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = ([], [], [0])
+            group[2][0] += 1
+            if post.get('author'):
+                group[0].append(str(post['author']))
+            group[1].extend(terms(post.get('text', '')))
+
+        with self._lock:
+            for key, (authors, words, count) in groups.items():
+                day = key[1]
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    if day not in self._days and len(self._days) >= self.max_buckets:
+                        oldest = min(self._days)
+                        if day < oldest:
+                            continue  # older than every day we keep
+                        self._evict(oldest)
+                    bucket = self._buckets[key] = _Bucket(self.precision, self.width, self.depth, self.capacity)
+                    self._days.add(day)
+                bucket.authors.add_many(authors)
+                bucket.terms.add_many(words)
+                bucket.posts += count[0]
+
+    def _evict(self, day):
+        self._days.discard(day)
+        for key in [key for key in self._buckets if key[1] == day]:
+            del self._buckets[key]
+
+    def summary(self, topic=None, sentiment=None, since=None, until=None):
+        """
+        Merge the buckets matching a topic (None: all), a sentiment (None:
+        all) and an inclusive day range into one SketchSummary
+        """
+        summary = self._empty_summary()
+        with self._lock:
+            for key, bucket in self._buckets.items():
+                if not _selected(key, topic, sentiment, since, until):
+                    continue
+                day = key[1]
+                summary.merge(SketchSummary(bucket.authors, bucket.terms,
+                                            {day: (bucket.authors, bucket.posts)}, bucket.posts))
+        return summary
+
+    def save(self, path, **meta):
+        """
+        Write the index to a file (see _read_stored), swapped in atomically;
+        `meta` (JSON values) is stored with it and returned by load()
+        """
+        with self._lock:
+            keys = list(self._buckets)
+            buckets = [self._buckets[key] for key in keys]
+            header = {
+                'max_buckets': self.max_buckets, 'precision': self.precision,
+                'width': self.width, 'depth': self.depth, 'capacity': self.capacity,
+                'keys': keys, 'posts': [bucket.posts for bucket in buckets],
+                'candidates': [sorted(bucket.terms.candidates) for bucket in buckets],
+                'meta': meta
+            }
+            registers = [bucket.authors.registers.tobytes() for bucket in buckets]
+            tables = [bucket.terms.table.astype(np.int32).tobytes() for bucket in buckets]
+
+        encoded = json.dumps(header).encode('utf-8')
+        encoded += b' ' * (-(STORED_HEADER.size + len(encoded)) % 8)
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(STORED_HEADER.pack(len(encoded)))
+            f.write(encoded)
+            f.writelines(registers)
+            f.writelines(tables)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_stored(path, select=None):
+        """
+        (header, rows, registers, tables) of a saved index: a length-prefixed
+        JSON header, then every bucket's HyperLogLog registers, then every
+        bucket's Count-Min table. The arrays are mapped, not read, and only
+        the rows of buckets whose key passes `select` (default: all) are
+        copied out
+        """
+        with open(path, 'rb') as f:
+            length, = STORED_HEADER.unpack(f.read(STORED_HEADER.size))
+            header = json.loads(f.read(length))
+            keys = header['keys']
+            rows = [i for i, key in enumerate(keys) if select is None or select(key)]
+            shape = (header['depth'], header['width'])
+            if not keys:
+                return header, rows, np.zeros((0, 1 << header['precision']), np.uint8), np.zeros((0, *shape), np.int32)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                offset = STORED_HEADER.size + length
+                registers = np.frombuffer(mapped, np.uint8, len(keys) << header['precision'], offset)
+                offset += registers.nbytes
+                tables = np.frombuffer(mapped, np.int32, len(keys) * shape[0] * shape[1], offset)
+                # Fancy indexing copies, so nothing refers to the map once it closes
+                registers = registers.reshape(len(keys), -1)[rows]
+                tables = tables.reshape(len(keys), *shape)[rows]
+        return header, rows, registers, tables
+
+    @staticmethod
+    def load_meta(path):
+        """
+        The `meta` a saved index was stored with, without reading its sketches
+        """
+        with open(path, 'rb') as f:
+            length, = STORED_HEADER.unpack(f.read(STORED_HEADER.size))
+            return json.loads(f.read(length))['meta']
+
+    @staticmethod
+    def load_summary(path, topic=None, sentiment=None, since=None, until=None):
+        """
+        summary() of a saved index, merged straight from the stored arrays
+        of the matching buckets, without loading the rest
+        Returns (SketchSummary, meta)
+        """
+        header, rows, registers, tables = SketchIndex._read_stored(
+            path, lambda key: _selected(key, topic, sentiment, since, until)
+        )
+        precision = header['precision']
+        posts = np.array(header['posts'], dtype=np.int64)[rows]
+        terms = CountMinTopK(header['width'], header['depth'], header['capacity'],
+                             tables.sum(axis=0, dtype=np.int32),
+                             set().union(*(header['candidates'][i] for i in rows)))
+        if len(terms.candidates) > terms.capacity:
+            terms._prune()
+        days = {}
+        row_days = np.array([header['keys'][i][1] for i in rows])
+        for day in np.unique(row_days):
+            mask = row_days == day
+            days[str(day)] = (HyperLogLog(precision, registers[mask].max(axis=0)), int(posts[mask].sum()))
+        summary = SketchSummary(HyperLogLog(precision, registers.max(axis=0, initial=0)), terms, days,
+                                int(posts.sum()))
+        return summary, header['meta']
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an index written by save()
+        Returns (SketchIndex, meta)
+        """
+        header, _, registers, tables = cls._read_stored(path)
+        index = cls(header['max_buckets'], header['precision'], header['width'], header['depth'])
+        index.capacity = header['capacity']
+        for i, (key, candidates) in enumerate(zip(header['keys'], header['candidates'])):
+            bucket = _Bucket(index.precision, index.width, index.depth, index.capacity)
+            bucket.authors.registers = registers[i]
+            bucket.terms.table = tables[i]
+            bucket.terms.candidates = set(candidates)
+            bucket.posts = header['posts'][i]
+            index._buckets[tuple(key)] = bucket
+            index._days.add(key[1])
+        return index, header['meta']
+
+    def buckets(self):
+        with self._lock:
+            return len(self._buckets)
+
+    def memory_bytes(self):
+        per_bucket = (1 << self.precision) + self.width * self.depth * 4
+        with self._lock:
+            return len(self._buckets) * per_bucket
@@ -0,0 +1,302 @@
+"""
+SQLite Storage Backend
+Indexed post and annotation storage for filtered queries and safe appends
+
+- WAL journal mode so readers never block the writer (and vice versa)
+- Indexes on topic, sentiment, source and timestamp for filtered queries
+- Bulk inserts with executemany in fixed-size batches; a post stored again
+  under the same id is updated in place and keeps its rowid, so rowid
+  cursors (the live stream, sketches, search) never see it as new
+- One connection per worker thread (sqlite3 connections are not shareable)
+- Aggregates (sentiment/topic breakdowns) computed in SQL, not in Python
+
+Usage:
+    store = SQLiteStore('sentiment.db')
+    store.insert_posts(posts)
+    store.fetch_posts(offset=0, count=20, topic='permits')
+    store.annotate([('post_1', 'reviewed', True)])
+    store.statistics()
+"""
+
+import json
+import sqlite3
+import threading
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Columns stored natively; anything else on a post is kept in the `extra` JSON
+POST_COLUMNS = ['id', 'text', 'sentiment', 'sentiment_score', 'topic', 'source', 'author', 'timestamp']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    text TEXT NOT NULL,
+    sentiment TEXT,
+    sentiment_score REAL,
+    topic TEXT,
+    source TEXT,
+    author TEXT,
+    timestamp TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_posts_topic ON posts(topic);
+CREATE INDEX IF NOT EXISTS idx_posts_sentiment ON posts(sentiment);
+CREATE INDEX IF NOT EXISTS idx_posts_source ON posts(source);
+CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts(timestamp);
+
+CREATE TABLE IF NOT EXISTS annotations (
+    post_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (post_id, key)
+);
+"""
+
+
+def _post_row(post):
+    """
+    Flatten a post dict into a row tuple for the posts table
+    """
+    extra = {k: v for k, v in post.items() if k not in POST_COLUMNS}
+    return (
+        str(post['id']),
+        post['text'],
+        post.get('sentiment'),
+        post.get('sentiment_score'),
+        post.get('topic'),
+        post.get('source'),
+        post.get('author'),
+        # Scraped posts carry `created_at`; the API corpus uses `timestamp`
+        post.get('timestamp') or post.get('created_at'),
+        json.dumps(extra) if extra else None,
+    )
+
+
+def _row_post(row):
+    """
+    Rebuild a post dict from a posts row, omitting empty columns
+    """
+    post = {}
+    for column in POST_COLUMNS:
+        if row[column] is not None:
+            post[column] = row[column]
+    if row['extra']:
+        post.update(json.loads(row['extra']))
+    return post
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class SQLiteStore:
+    """
+    Posts and annotations in a single SQLite database file
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """
+        Return this thread's connection, opening it on first use
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def insert_posts(self, posts):
+        """
+        Insert posts in batches, updating existing ids in place (INSERT OR
+        REPLACE would delete and reinsert them under a new rowid); returns
+        the number written
+        """
+        conn = self.connection()
+        written = 0
+        for batch in _batches((_post_row(p) for p in posts), self.batch_size):
+            with conn:
+                conn.executemany(
+                    'INSERT INTO posts '
+                    '(id, text, sentiment, sentiment_score, topic, source, author, timestamp, extra) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(id) DO UPDATE SET '
+                    + ', '.join(f'{column} = excluded.{column}' for column in POST_COLUMNS[1:] + ['extra']),
+                    batch
+                )
+            written += len(batch)
+        return written
+
+    def annotate(self, annotations):
+        """
+        Store (post_id, key, value) annotations, replacing existing keys
+        """
+        conn = self.connection()
+        rows = ((str(post_id), key, json.dumps(value)) for post_id, key, value in annotations)
+        for batch in _batches(rows, self.batch_size):
+            with conn:
+                conn.executemany(
+                    'INSERT INTO annotations (post_id, key, value) VALUES (?, ?, ?) '
+                    'ON CONFLICT(post_id, key) DO UPDATE SET '
+                    'value = excluded.value, created_at = CURRENT_TIMESTAMP',
+                    batch
+                )
+
+    def annotations(self, post_id):
+        """
+        Return all annotations for a post as a dict
+        """
+        rows = self.connection().execute(
+            'SELECT key, value FROM annotations WHERE post_id = ?', (str(post_id),)
+        )
+        return {row['key']: json.loads(row['value']) for row in rows}
+
+    def has_post(self, post_id):
+        return self.connection().execute(
+            'SELECT 1 FROM posts WHERE id = ?', (str(post_id),)
+        ).fetchone() is not None
+
+    @staticmethod
+    def _where(filters):
+        clauses = []
+        params = []
+        for column in ('topic', 'sentiment', 'source'):
+            value = filters.get(column)
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if filters.get('since'):
+            clauses.append('timestamp >= ?')
+            params.append(filters['since'])
+        if filters.get('until'):
+            # Inclusive, like the sketch filters: until=2025-01-31 keeps
+            # every timestamp on that day
+            clauses.append('timestamp < ?')
+            params.append(filters['until'] + '\uffff')
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def count(self, **filters):
+        where, params = self._where(filters)
+        return self.connection().execute(f'SELECT COUNT(*) FROM posts{where}', params).fetchone()[0]
+
+    def fetch_posts(self, offset=0, count=20, **filters):
+        """
+        Return one page of posts in insertion order, optionally filtered
+        by topic, sentiment, source and timestamp range (since/until, inclusive)
+        """
+        where, params = self._where(filters)
+        rows = self.connection().execute(
+            f'SELECT * FROM posts{where} ORDER BY rowid LIMIT ? OFFSET ?',
+            params + [count, offset]
+        )
+        return [_row_post(row) for row in rows]
+
+    def posts_after(self, rowid, limit=1000):
+        """
+        Return (posts, last_rowid) for rows inserted after rowid
+        Used to tail the table for newly ingested posts
+        """
+        rows = self.connection().execute(
+            'SELECT * FROM posts WHERE rowid > ? ORDER BY rowid LIMIT ?', (rowid, limit)
+        ).fetchall()
+        if not rows:
+            return [], rowid
+        return [_row_post(row) for row in rows], rows[-1]['rowid']
+
+    def keyed_posts_after(self, rowid, limit=1000):
+        """
+        Return (rowids, posts) for rows inserted after rowid
+        """
+        rows = self.connection().execute(
+            'SELECT * FROM posts WHERE rowid > ? ORDER BY rowid LIMIT ?', (rowid, limit)
+        ).fetchall()
+        return [row['rowid'] for row in rows], [_row_post(row) for row in rows]
+
+    def posts_by_rowid(self, rowids):
+        """
+        Return {rowid: post} for those of the given rowids that exist
+        """
+        rowids = [int(rowid) for rowid in rowids]
+        if not rowids:
+            return {}
+        placeholders = ','.join('?' * len(rowids))
+        rows = self.connection().execute(
+            f'SELECT * FROM posts WHERE rowid IN ({placeholders})', rowids
+        )
+        return {row['rowid']: _row_post(row) for row in rows}
+
+    def max_rowid(self):
+        return self.connection().execute('SELECT COALESCE(MAX(rowid), 0) FROM posts').fetchone()[0]
+
+    def statistics(self, **filters):
+        """
+        Sentiment and topic breakdowns computed with GROUP BY in SQLite
+        Returns the same shape as /api/statistics
+        """
+        conn = self.connection()
+        where, params = self._where(filters)
+
+        sentiment_breakdown = {'positive': 0, 'negative': 0, 'neutral': 0}
+        for row in conn.execute(
+            f"SELECT COALESCE(sentiment, 'neutral') AS s, COUNT(*) AS n FROM posts{where} GROUP BY s",
+            params
+        ):
+            if row['s'] in sentiment_breakdown:
+                sentiment_breakdown[row['s']] = row['n']
+
+        topic_breakdown = {}
+        for row in conn.execute(
+            f"SELECT COALESCE(topic, 'general') AS t, COUNT(*) AS n FROM posts{where} GROUP BY t",
+            params
+        ):
+            topic_breakdown[row['t']] = row['n']
+
+        total = sum(topic_breakdown.values())
+        return {
+            'total_posts': total,
+            'sentiment_breakdown': sentiment_breakdown,
+            'topic_breakdown': topic_breakdown,
+            'overall_sentiment_percentage': round((sentiment_breakdown['positive'] / total) * 100, 1) if total else 0
+        }
+
+    def trend(self, **filters):
+        """
+        Daily sentiment counts computed with GROUP BY in SQLite
+        Returns the same shape as /api/trends' `trend`
+        """
+        where, params = self._where(filters)
+        days = {}
+        for row in self.connection().execute(
+            f"SELECT COALESCE(NULLIF(substr(timestamp, 1, 10), ''), 'unknown') AS d, "
+            f"COALESCE(sentiment, 'neutral') AS s, COUNT(*) AS n FROM posts{where} GROUP BY d, s",
+            params
+        ):
+            bucket = days.setdefault(row['d'], {'positive': 0, 'negative': 0, 'neutral': 0})
+            if row['s'] in bucket:
+                bucket[row['s']] = row['n']
+        return [
+            {'date': day, **bucket, 'total': sum(bucket.values())}
+            for day, bucket in sorted(days.items())
+        ]
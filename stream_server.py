@@ -0,0 +1,268 @@
+"""
+Event-Loop SSE Fan-Out
+Serves /api/stream from one asyncio event loop, so an open stream costs a
+coroutine and its buffer instead of a server thread
+
+The threaded /api/stream in backend_api.py holds a gunicorn thread per client
+and is capped at a quarter of the threads so streams cannot starve normal
+requests (64 streams for the two workers in render.yaml). This server is for
+hundreds of live dashboards:
+
+- One feed task tails the API's /api/feed for posts stored since its cursor:
+  one request per poll however many clients are connected, so posts ingested
+  by any API worker reach every client
+- Each event is encoded once and handed to every client's bounded buffer; a
+  slow client loses its oldest events and is sent a `lagged` event instead
+  of blocking the feed or growing memory
+- Same events as the threaded endpoint: `post`, `stats`, `lagged`, plus a
+  keepalive comment every HEARTBEAT_SECONDS
+
+Usage:
+    API_URL=http://localhost:5000 python stream_server.py --port 5001
+    # dashboards open an EventSource on http://localhost:5001/api/stream
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import urllib.parse
+import urllib.request
+from collections import deque
+
+from streaming import DEFAULT_BUFFER_SIZE, HEARTBEAT_SECONDS, POLL_SECONDS, format_event, stat_delta
+
+API_URL = os.environ.get('API_URL', 'http://localhost:5000')
+# Open file descriptors are the real limit; raise `ulimit -n` to go past ~1000
+DEFAULT_MAX_CLIENTS = 2000
+FEED_TIMEOUT = 10
+# Seconds a new connection gets to send its request line and headers
+REQUEST_TIMEOUT = 10
+# Posts asked for per /api/feed request (the API serves at most 1000)
+FEED_PAGE = 1000
+# A client whose socket has not accepted data for this long is dropped
+WRITE_TIMEOUT = 60
+MAX_REQUEST_BYTES = 8192
+
+STREAM_HEADERS = (
+    'HTTP/1.1 200 OK\r\n'
+    'Content-Type: text/event-stream\r\n'
+    'Cache-Control: no-cache\r\n'
+    'X-Accel-Buffering: no\r\n'
+    'Access-Control-Allow-Origin: *\r\n'
+    'Connection: close\r\n'
+    '\r\n'
+    'retry: 3000\n\n'
+).encode('ascii')
+
+
+def api_feed(api_url, timeout=FEED_TIMEOUT):
+    """
+    Blocking callable returning the posts the API stored since its previous
+    call (the first call only finds the current cursor)
+    """
+    cursor = [None]
+
+    def get(params):
+        url = f"{api_url.rstrip('/')}/api/feed?{urllib.parse.urlencode(params)}"
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.load(response)
+
+    def fetch():
+        if cursor[0] is None:
+            cursor[0] = get({})['cursor']
+            return []
+        posts = []
+        while True:
+            page = get({'after': cursor[0], 'count': FEED_PAGE})
+            cursor[0] = page['cursor']
+            posts.extend(page['posts'])
+            if len(page['posts']) < FEED_PAGE or len(posts) >= 10 * FEED_PAGE:
+                return posts
+
+    return fetch
+
+
+def http_response(status, body, content_type='application/json'):
+    body = body.encode('utf-8')
+    return (
+        f'HTTP/1.1 {status}\r\n'
+        f'Content-Type: {content_type}\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        'Access-Control-Allow-Origin: *\r\n'
+        'Access-Control-Allow-Methods: GET, OPTIONS\r\n'
+        'Connection: close\r\n'
+        '\r\n'
+    ).encode('ascii') + body
+
+
+class Client:
+    """
+    One connected client: a bounded buffer of pending frames
+    """
+
+    def __init__(self, buffer_size):
+        self.frames = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def push(self, frame):
+        if len(self.frames) == self.frames.maxlen:
+            # deque(maxlen) discards the oldest frame on append
+            self.dropped += 1
+        self.frames.append(frame)
+        self.ready.set()
+
+    async def pop_all(self, timeout):
+        """
+        Wait up to timeout for frames; returns (frames, dropped since last call)
+        """
+        if not self.frames:
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.ready.clear()
+        frames = list(self.frames)
+        self.frames.clear()
+        dropped, self.dropped = self.dropped, 0
+        return frames, dropped
+
+
+class StreamServer:
+    """
+    Fan-out of pre-encoded SSE frames to every client of one event loop
+    """
+
+    def __init__(self, fetch_new_posts, buffer_size=DEFAULT_BUFFER_SIZE,
+                 max_clients=DEFAULT_MAX_CLIENTS, poll_interval=POLL_SECONDS):
+        self.fetch_new_posts = fetch_new_posts
+        self.buffer_size = buffer_size
+        self.max_clients = max_clients
+        self.poll_interval = poll_interval
+        self.clients = set()
+        self.counters = {'connected': 0, 'rejected': 0, 'lagged': 0}
+
+    def publish(self, event, data):
+        """
+        Encode once, then hand the same frame to every client
+        """
+        frame = format_event(event, data)
+        for client in self.clients:
+            client.push(frame)
+
+    def publish_posts(self, posts):
+        if not posts:
+            return
+        for post in posts:
+            self.publish('post', post)
+        self.publish('stats', stat_delta(posts))
+
+    async def run_feed(self):
+        """
+        Poll for new posts forever; the blocking fetch runs in a thread so
+        the loop keeps serving clients
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Keep polling without clients so a new one only sees new posts
+                posts = await loop.run_in_executor(None, self.fetch_new_posts)
+                if self.clients:
+                    self.publish_posts(posts)
+            except Exception as e:
+                print(f"❌ Stream feed error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def handle(self, reader, writer):
+        """
+        One HTTP connection: GET /api/stream, /api/health, or a CORS preflight
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT)
+            method, target = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ')[:2]
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError, ValueError):
+            writer.close()
+            return
+
+        path = urllib.parse.urlsplit(target).path
+        try:
+            if method == 'OPTIONS':
+                writer.write(http_response('204 No Content', ''))
+            elif method != 'GET':
+                writer.write(http_response('405 Method Not Allowed', json.dumps({'error': 'Method not allowed'})))
+            elif path == '/api/stream':
+                await self.stream(writer)
+            elif path == '/api/health':
+                writer.write(http_response('200 OK', json.dumps({
+                    'status': 'healthy',
+                    'clients': len(self.clients),
+                    'max_clients': self.max_clients,
+                    **self.counters
+                })))
+            else:
+                writer.write(http_response('404 Not Found', json.dumps({'error': 'Not found'})))
+            await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer):
+        """
+        Write SSE frames to one client until it disconnects or stalls
+        """
+        if len(self.clients) >= self.max_clients:
+            self.counters['rejected'] += 1
+            writer.write(http_response('503 Service Unavailable', json.dumps({'error': 'too many open streams'})))
+            return
+
+        client = Client(self.buffer_size)
+        self.clients.add(client)
+        self.counters['connected'] += 1
+        try:
+            writer.write(STREAM_HEADERS)
+            await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+            while not writer.is_closing():
+                frames, dropped = await client.pop_all(HEARTBEAT_SECONDS)
+                chunks = []
+                if dropped:
+                    self.counters['lagged'] += 1
+                    chunks.append(format_event('lagged', {'dropped': dropped}))
+                # Comment frame keeps proxies from closing an idle stream
+                chunks.extend(frames or ([] if dropped else [': keepalive\n\n']))
+                writer.write(''.join(chunks).encode('utf-8'))
+                await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+        finally:
+            self.clients.discard(client)
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST_BYTES)
+        feed = asyncio.create_task(self.run_feed())
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                feed.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve /api/stream to many clients from one event loop')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5001)))
+    parser.add_argument('--api-url', default=API_URL,
+                        help='Base URL of the sentiment API whose /api/feed is tailed')
+    parser.add_argument('--max-clients', type=int,
+                        default=int(os.environ.get('STREAM_MAX_CLIENTS', DEFAULT_MAX_CLIENTS)))
+    parser.add_argument('--buffer-size', type=int,
+                        default=int(os.environ.get('STREAM_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)))
+    args = parser.parse_args()
+
+    server = StreamServer(api_feed(args.api_url), buffer_size=args.buffer_size, max_clients=args.max_clients)
+    print(f"📡 Streaming {args.api_url} to up to {args.max_clients:,} clients on port {args.port}")
+    asyncio.run(server.serve(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Server-Sent Events Broadcaster
+Fans newly ingested posts and statistic deltas out to live dashboard clients
+
+- One bounded buffer per subscriber; a slow consumer loses its oldest events
+  (and is told how many) instead of blocking the publisher or growing memory
+- A single feed thread per worker process polls the shared corpus for new
+  posts, so posts ingested by any gunicorn worker reach every subscriber.
+  It only polls while the worker has subscribers; catch_up() reads the
+  posts in between for other consumers of the feed
+
+Every open stream occupies one server thread until the client leaves, so a
+gthread worker can only hold a few dozen next to its normal requests. For
+hundreds of connections, stream_server.py serves the same events (built with
+format_event and stat_delta below) from a single asyncio event loop.
+
+Usage:
+    broadcaster = Broadcaster()
+    broadcaster.start_feed(fetch_new_posts)
+    return Response(broadcaster.stream(), mimetype='text/event-stream')
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+DEFAULT_BUFFER_SIZE = 256
+# Every open stream holds a server thread, so this stays well below the
+# worker's thread count
+DEFAULT_MAX_SUBSCRIBERS = 32
+HEARTBEAT_SECONDS = 15
+POLL_SECONDS = 0.5
+
+
+class TooManySubscribers(Exception):
+    """
+    Raised when the broadcaster is already serving its connection limit
+    """
+
+
+def format_event(event, data):
+    """
+    Encode one SSE frame
+    """
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def stat_delta(posts):
+    """
+    Sentiment and topic count changes contributed by a batch of new posts
+    """
+    sentiment_breakdown = {'positive': 0, 'negative': 0, 'neutral': 0}
+    topic_breakdown = {}
+    for post in posts:
+        sentiment = post.get('sentiment', 'neutral')
+        if sentiment in sentiment_breakdown:
+            sentiment_breakdown[sentiment] += 1
+        topic = post.get('topic', 'general')
+        topic_breakdown[topic] = topic_breakdown.get(topic, 0) + 1
+    return {
+        'total_posts': len(posts),
+        'sentiment_breakdown': sentiment_breakdown,
+        'topic_breakdown': topic_breakdown
+    }
+
+
+class Subscriber:
+    """
+    One connected client: a bounded buffer of pending frames
+    """
+
+    def __init__(self, buffer_size):
+        self.frames = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.cond = threading.Condition()
+
+    def push(self, frame):
+        with self.cond:
+            if len(self.frames) == self.frames.maxlen:
+                # deque(maxlen) discards the oldest frame on append
+                self.dropped += 1
+            self.frames.append(frame)
+            self.cond.notify()
+
+    def pop_all(self, timeout):
+        """
+        Wait up to timeout for frames; returns (frames, dropped since last call)
+        """
+        with self.cond:
+            if not self.frames:
+                self.cond.wait(timeout)
+            frames = list(self.frames)
+            self.frames.clear()
+            dropped, self.dropped = self.dropped, 0
+        return frames, dropped
+
+
+class Broadcaster:
+    """
+    Fan-out of pre-encoded SSE frames to all subscribers in this process
+    """
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, max_subscribers=DEFAULT_MAX_SUBSCRIBERS):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._feed = None
+        self._fetch = None
+        self._fetch_lock = threading.Lock()
+        # Set while there are subscribers; the feed thread sleeps otherwise
+        self._active = threading.Event()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers('too many open streams')
+            idle = not self._subscribers
+        if idle:
+            # Skip what was stored while nobody listened, so the first
+            # client only sees new posts
+            self.catch_up()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers('too many open streams')
+            subscriber = Subscriber(self.buffer_size)
+            self._subscribers.add(subscriber)
+            self._active.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers:
+                self._active.clear()
+
+    def publish(self, event, data):
+        """
+        Encode once, then hand the same frame to every subscriber
+        """
+        frame = format_event(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(frame)
+
+    def publish_posts(self, posts):
+        if not posts:
+            return
+        for post in posts:
+            self.publish('post', post)
+        self.publish('stats', stat_delta(posts))
+
+    def stream(self, subscriber=None):
+        """
+        Generator of SSE frames for one client; unsubscribes on disconnect
+        """
+        subscriber = subscriber or self.subscribe()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                frames, dropped = subscriber.pop_all(HEARTBEAT_SECONDS)
+                if dropped:
+                    yield format_event('lagged', {'dropped': dropped})
+                if frames:
+                    yield ''.join(frames)
+                else:
+                    # Comment frame keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    def catch_up(self):
+        """
+        Read the feed up to now without publishing; returns the posts read
+        """
+        if self._fetch is None:
+            return []
+        with self._fetch_lock:
+            return self._fetch()
+
+    def start_feed(self, fetch_new_posts, interval=POLL_SECONDS):
+        """
+        Start the feed thread; fetch_new_posts() returns posts added since its
+        previous call. Safe to call more than once.
+        """
+        with self._lock:
+            if self._feed is not None:
+                return
+            self._fetch = fetch_new_posts
+            self._feed = threading.Thread(
+                target=self._run_feed, args=(fetch_new_posts, interval),
+                name='sse-feed', daemon=True
+            )
+            self._feed.start()
+
+    def _run_feed(self, fetch_new_posts, interval):
+        while True:
+            self._active.wait()
+            try:
+                with self._fetch_lock:
+                    posts = fetch_new_posts()
+                self.publish_posts(posts)
+            except Exception as e:
+                print(f"❌ Stream feed error: {e}")
+            time.sleep(interval)
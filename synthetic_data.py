@@ -0,0 +1,478 @@
+"""
+Synthetic Corpus Generator
+Seeded, high-volume generator of realistic small business posts for load tests
+
+- Topic, sentiment, source and timestamp are sampled with NumPy in chunks,
+  from distributions you control on the command line
+- Post text is drawn from per-topic, per-sentiment templates that are
+  JSON-encoded once, so each output line is a single string format
+- Optionally each post also gets filler words from a Zipf-distributed
+  vocabulary, so search sees a natural-language term distribution instead of
+  the few hundred template words
+- Output streams straight to disk: JSONL, the mapped corpus format
+  (.jsonl + .idx, see corpus.py), the SQLite store or Parquet (columnar.py)
+
+Usage:
+    python synthetic_data.py --posts 10000000 --out data/montgomery/posts.jsonl --format corpus
+    python synthetic_data.py --posts 100000 --topics permits=0.5,funding=0.5 --sentiment negative=0.7,positive=0.3
+    python synthetic_data.py --posts 1000000 --start 2025-01-01 --end 2025-12-31 --time-profile recent
+    python synthetic_data.py --posts 1000000 --vocabulary 50000 --filler-words 12
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from corpus import INDEX_ENTRY
+from partitions import COUNTIES
+
+CHUNK_SIZE = 200000
+
+TEMPLATES = {
+    'permits': {
+        'positive': [
+            "Just got my business license approved! The online portal made it so easy.",
+            "Business license renewal process was smooth this year. Much improved!",
+            "Just received my certificate of use! Ready to open my coffee shop!",
+            "Finally got my vendors license. Now I can sell at the farmers market!",
+            "Zoning approval came through in {weeks} weeks. Faster than I expected, thank you!",
+        ],
+        'negative': [
+            "Still waiting on my permit approval. It's been {weeks} weeks. Very frustrating.",
+            "Frustrated with the zoning approval process. Been waiting months.",
+            "County website is confusing. Can't find information about health permits.",
+            "Permit fees seem high compared to other counties. This is ridiculous.",
+            "Food truck permit denied again after {weeks} weeks. Losing money every day.",
+        ],
+        'neutral': [
+            "Trying to start a food truck. Where do I begin with permits?",
+            "Does anyone know how long a certificate of use takes?",
+            "Submitted my building permit application {weeks} weeks ago.",
+        ],
+    },
+    'funding': {
+        'positive': [
+            "The small business grant workshop was incredibly helpful! Highly recommend.",
+            "The pandemic relief program saved my restaurant. Forever grateful.",
+            "Approved for a microloan in {weeks} weeks. Great support from the county!",
+        ],
+        'negative': [
+            "Applied for a business grant {weeks} weeks ago. No response yet. So disappointed.",
+            "Loan application rejected with no explanation. Terrible experience.",
+            "The grant portal keeps crashing. Wasted hours on this broken system.",
+        ],
+        'neutral': [
+            "Applied for a grant {weeks} weeks ago. Anyone else waiting?",
+            "Looking for information about small business loans.",
+            "What documents do I need for the relief fund application?",
+        ],
+    },
+    'training': {
+        'positive': [
+            "Attended the entrepreneur training session. Great resources available!",
+            "The business development center helped me write my business plan. Free service!",
+            "Loved the digital marketing workshop. Learned so much!",
+        ],
+        'negative': [
+            "The workshop was canceled again without notice. Annoying.",
+            "Training session was a waste of time, outdated material.",
+        ],
+        'neutral': [
+            "Is there a bookkeeping course for new business owners?",
+            "Signed up for the {weeks} week entrepreneur bootcamp.",
+        ],
+    },
+    'taxes': {
+        'positive': [
+            "The free tax clinic sorted out my filing. Really helpful staff!",
+            "Finally understand my quarterly tax obligations thanks to the county guide.",
+        ],
+        'negative': [
+            "Why is the business tax process so complicated? Need help!",
+            "Got hit with a penalty because the tax deadline info was wrong. Unacceptable.",
+        ],
+        'neutral': [
+            "Does anyone know about tax incentives for minority-owned businesses?",
+            "When is the business personal property tax return due?",
+        ],
+    },
+    'legal': {
+        'positive': [
+            "The free legal clinic reviewed my lease contract. Saved me from a bad deal!",
+            "Forming my LLC took {weeks} days with the county guide. Super easy.",
+            "A volunteer attorney helped me with my vendor contract. So grateful!",
+        ],
+        'negative': [
+            "Spent {weeks} weeks trying to find an affordable lawyer. Nobody returns calls. Awful.",
+            "The incorporation paperwork is a nightmare. Rejected twice for a typo.",
+            "Got sued by a supplier and the legal aid line was useless. Terrible.",
+        ],
+        'neutral': [
+            "Should I register as an LLC or a corporation for a small bakery?",
+            "Where can I get a business contract reviewed by an attorney?",
+        ],
+    },
+    'insurance': {
+        'positive': [
+            "Found affordable liability coverage through the county broker list. Great!",
+            "Our insurance agent explained workers comp clearly. Really helpful.",
+        ],
+        'negative': [
+            "Liability insurance quote doubled this year. Can't afford it.",
+            "Health insurance for my {weeks} employees is crushing my budget. Awful.",
+        ],
+        'neutral': [
+            "What insurance coverage does a food truck need?",
+            "Comparing workers comp quotes from {weeks} brokers.",
+        ],
+    },
+    'marketing': {
+        'positive': [
+            "The social media workshop doubled our online orders. Amazing results!",
+            "Free branding session at the library was fantastic. Love our new logo!",
+        ],
+        'negative': [
+            "Paid for advertising for {weeks} weeks and got zero customers. Waste of money.",
+            "Our website looks outdated and the marketing grant was denied. Frustrating.",
+        ],
+        'neutral': [
+            "Any tips for local SEO for a small retail shop?",
+            "Planning a {weeks} week advertising campaign for our opening.",
+        ],
+    },
+    'technology': {
+        'positive': [
+            "The county helped us set up an online store. Sales are up, thank you!",
+            "New point of sale software is great. Checkout is so much faster.",
+        ],
+        'negative': [
+            "Our computer system got hit by ransomware. Lost {weeks} days of orders.",
+            "The ecommerce platform keeps crashing. Terrible support.",
+        ],
+        'neutral': [
+            "What cybersecurity basics should a small business have?",
+            "Looking for accounting software recommendations.",
+        ],
+    },
+    'real_estate': {
+        'positive': [
+            "Signed a lease on a great location downtown. So excited!",
+            "The landlord agreed to {weeks} months of reduced rent. Huge relief!",
+        ],
+        'negative': [
+            "Rent went up again. Might have to close my office. Heartbreaking.",
+            "Landlord won't fix the roof after {weeks} weeks. Horrible.",
+        ],
+        'neutral': [
+            "Looking for a small retail space near the metro.",
+            "How do commercial lease terms usually work for a first location?",
+        ],
+    },
+    'hr': {
+        'positive': [
+            "Hired {weeks} new employees through the county job fair. Great candidates!",
+            "The payroll workshop made compliance so much easier. Thank you!",
+        ],
+        'negative': [
+            "Can't find staff anywhere. Been hiring for {weeks} weeks with no luck.",
+            "Labor compliance rules are confusing and the penalties are scary.",
+        ],
+        'neutral': [
+            "What payroll service do other small businesses use?",
+            "How many hours can part-time employees work?",
+        ],
+    },
+    'export': {
+        'positive': [
+            "Shipped our first international order! The export program was a big help.",
+            "The trade mission opened {weeks} new foreign markets for us. Excellent!",
+        ],
+        'negative': [
+            "Our shipment has been stuck in customs for {weeks} weeks. Losing customers.",
+            "New tariffs wiped out our margins on imports. Devastating.",
+        ],
+        'neutral': [
+            "How do I get started with exporting to Canada?",
+            "Which forms are needed for international shipping?",
+        ],
+    },
+    'networking': {
+        'positive': [
+            "Great networking event at the chamber last night. Met so many entrepreneurs!",
+            "The monthly meetup connected me with {weeks} new clients. Love this community!",
+        ],
+        'negative': [
+            "Networking events are always during work hours. Impossible to attend. Annoying.",
+            "Went to the meetup and it was just sales pitches. Disappointing.",
+        ],
+        'neutral': [
+            "Are there any industry group meetings for restaurant owners?",
+            "When is the next chamber networking event?",
+        ],
+    },
+    'certification': {
+        'positive': [
+            "Finally certified as a minority business enterprise! Proud moment.",
+            "Got our women-owned certification in {weeks} weeks. Great, smooth process!",
+        ],
+        'negative': [
+            "MBE certification has been pending for {weeks} months. Ridiculous delay.",
+            "Lost a contractor bid because my certification expired. So frustrating.",
+        ],
+        'neutral': [
+            "What documents are needed for SBE certification?",
+            "Does certification matter for county contractor bids?",
+        ],
+    },
+    'support': {
+        'positive': [
+            "Got connected with a business advisor through the county. Game changer!",
+            "The County's small business hotline was super helpful. Got answers immediately.",
+            "The county's website redesign made finding resources so much easier.",
+        ],
+        'negative': [
+            "Called the business hotline {weeks} times and nobody answered. Awful.",
+            "Nobody at the county office could help me. Very disappointing.",
+        ],
+        'neutral': [
+            "Looking for small business networking groups. Recommendations?",
+            "Who do I contact about opening a second location?",
+        ],
+    },
+}
+
+SENTIMENTS = ['positive', 'negative', 'neutral']
+SOURCES = ['twitter', 'reddit', 'facebook']
+WEEKS = range(2, 9)
+# Word frequency falls as rank^-ZIPF_EXPONENT in English text
+ZIPF_EXPONENT = 1.07
+SYLLABLES = [c + v for c in 'bcdfghjklmnprstvwz' for v in 'aeiou']
+
+
+def parse_distribution(spec, choices):
+    """
+    Parse "a=0.5,b=0.3" into probabilities aligned with choices
+    Missing choices get 0; weights are normalized to sum to 1
+    """
+    if not spec:
+        return np.full(len(choices), 1.0 / len(choices))
+    weights = dict.fromkeys(choices, 0.0)
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"unknown value '{name}' (choose from {', '.join(choices)})")
+        weights[name] = float(weight)
+    probs = np.array([weights[c] for c in choices])
+    if probs.sum() <= 0:
+        raise ValueError(f"distribution '{spec}' has no positive weights")
+    return probs / probs.sum()
+
+
+class SyntheticCorpus:
+    """
+    Seeded post generator; yields chunks of encoded JSON lines
+    """
+
+    def __init__(self, seed=42, topic_probs=None, sentiment_probs=None, source_probs=None,
+                 start='2025-01-01', end='2025-12-31', time_profile='uniform',
+                 authors=50000, county=None, vocabulary=0, filler_words=12):
+        self.rng = np.random.default_rng(seed)
+        self.topics = list(TEMPLATES)
+        self.topic_probs = topic_probs if topic_probs is not None else parse_distribution(None, self.topics)
+        self.sentiment_probs = sentiment_probs if sentiment_probs is not None else parse_distribution(None, SENTIMENTS)
+        self.source_probs = source_probs if source_probs is not None else parse_distribution(None, SOURCES)
+        self.start = np.datetime64(start, 's').astype(np.int64)
+        # end is included: a date covers that whole day, a time that second
+        self.end = (np.datetime64(end) + 1).astype('datetime64[s]').astype(np.int64)
+        if self.end <= self.start:
+            raise ValueError(f"end {end} is before start {start}")
+        self.time_profile = time_profile
+        self.authors = authors
+        self.county_field = f',"county":{json.dumps(county)}' if county else ''
+
+        # Every (topic, sentiment) pair gets a pool of pre-encoded texts
+        self.pools = []
+        for topic in self.topics:
+            for sentiment in SENTIMENTS:
+                texts = [t.format(weeks=w) for t in TEMPLATES[topic][sentiment] for w in WEEKS]
+                self.pools.append(np.array([json.dumps(t) for t in dict.fromkeys(texts)], dtype=object))
+        self.pool_sizes = np.array([len(pool) for pool in self.pools])
+        self.next_id = 0
+
+        # Filler vocabulary: distinct made-up words, most frequent first
+        self.filler_words = filler_words if vocabulary else 0
+        self.words = []
+        seen = set()
+        while len(self.words) < vocabulary:
+            word = ''.join(self.rng.choice(SYLLABLES, self.rng.integers(1, 5)))
+            if word not in seen:
+                seen.add(word)
+                self.words.append(word)
+        self.words = np.array(self.words, dtype=object)
+        ranks = np.arange(1, vocabulary + 1)
+        self.word_probs = ranks ** -ZIPF_EXPONENT / (ranks ** -ZIPF_EXPONENT).sum()
+
+    def _timestamps(self, n):
+        span = self.end - self.start
+        if self.time_profile == 'recent':
+            # Exponentially more posts toward the end of the range
+            offsets = (span - 1) - np.minimum(self.rng.exponential(span / 5, n), span - 1)
+        else:
+            offsets = self.rng.uniform(0, span, n)
+        seconds = (self.start + offsets.astype(np.int64)).astype('datetime64[s]')
+        return np.datetime_as_string(seconds, unit='s')
+
+    def chunk(self, n):
+        """
+        Generate n posts as a list of JSON lines (without newlines)
+        """
+        rng = self.rng
+        topic = rng.choice(len(self.topics), n, p=self.topic_probs)
+        sentiment = rng.choice(len(SENTIMENTS), n, p=self.sentiment_probs)
+        source = rng.choice(len(SOURCES), n, p=self.source_probs)
+        author = rng.integers(1000, 1000 + self.authors, n)
+        timestamps = self._timestamps(n)
+
+        # Pick a text from the (topic, sentiment) pool of every post
+        pool = topic * len(SENTIMENTS) + sentiment
+        pick = (rng.random(n) * self.pool_sizes[pool]).astype(np.int64)
+        texts = np.empty(n, dtype=object)
+        for p in np.unique(pool):
+            mask = pool == p
+            texts[mask] = self.pools[p][pick[mask]]
+        if self.filler_words:
+            # Between none and twice filler_words words, appended inside the
+            # encoded string (the made-up words need no escaping)
+            counts = rng.integers(0, 2 * self.filler_words + 1, n)
+            words = self.words[rng.choice(len(self.words), int(counts.sum()), p=self.word_probs)].tolist()
+            ends = np.cumsum(counts).tolist()
+            texts = np.array([
+                f'{text[:-1]} {" ".join(words[end - count:end])}"' if count else text
+                for text, count, end in zip(texts.tolist(), counts.tolist(), ends)
+            ], dtype=object)
+
+        topic_names = np.array(self.topics, dtype=object)[topic]
+        sentiment_names = np.array(SENTIMENTS, dtype=object)[sentiment]
+        source_names = np.array(SOURCES, dtype=object)[source]
+        first_id = self.next_id
+        self.next_id += n
+        county = self.county_field
+
+        return [
+            f'{{"id":"syn_{first_id + i}","text":{text},"sentiment":"{s}","topic":"{t}",'
+            f'"source":"{src}","author":"user{a}","timestamp":"{ts}Z"{county}}}'
+            for i, (text, s, t, src, a, ts) in enumerate(zip(
+                texts.tolist(), sentiment_names.tolist(), topic_names.tolist(),
+                source_names.tolist(), author.tolist(), timestamps.tolist()
+            ))
+        ]
+
+    def chunks(self, total, chunk_size=CHUNK_SIZE):
+        remaining = total
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            yield self.chunk(n)
+            remaining -= n
+
+
+def write_jsonl(generator, total, path, index_path=None):
+    """
+    Stream posts to a JSONL file, optionally with the mapped corpus index
+    Lines are pure ASCII, so string length equals byte length
+    """
+    entry = np.dtype([('offset', '<u8'), ('length', '<u4')])
+    assert entry.itemsize == INDEX_ENTRY.size
+    offset = 0
+    index_file = open(index_path, 'wb') if index_path else None
+    try:
+        with open(path, 'w') as f:
+            for lines in generator.chunks(total):
+                f.write('\n'.join(lines))
+                f.write('\n')
+                if index_file:
+                    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+                    entries = np.empty(len(lines), dtype=entry)
+                    entries['length'] = lengths
+                    entries['offset'] = offset + np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+                    entries.tofile(index_file)
+                    offset += int(lengths.sum()) + len(lines)
+    finally:
+        if index_file:
+            index_file.close()
+
+
+def write_sqlite(generator, total, path):
+    from storage import SQLiteStore
+
+    store = SQLiteStore(path, batch_size=10000)
+    for lines in generator.chunks(total):
+        store.insert_posts(json.loads(line) for line in lines)
+    store.close()
+
+
+def write_parquet(generator, total, path):
+    from columnar import ParquetPostWriter
+
+    with ParquetPostWriter(path, row_group_size=CHUNK_SIZE) as writer:
+        for lines in generator.chunks(total):
+            writer.write(json.loads(line) for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a seeded synthetic post corpus')
+    parser.add_argument('--posts', type=int, default=1000000, help='Number of posts')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default='synthetic_posts.jsonl', help='Output file')
+    parser.add_argument('--format', choices=['jsonl', 'corpus', 'sqlite', 'parquet'], default='jsonl',
+                        help='jsonl, corpus (jsonl + .idx offset index), sqlite or parquet')
+    parser.add_argument('--topics', help=f"Topic weights, e.g. permits=0.4,funding=0.6 ({', '.join(TEMPLATES)})")
+    parser.add_argument('--sentiment', help='Sentiment weights, e.g. negative=0.6,positive=0.3,neutral=0.1')
+    parser.add_argument('--sources', help='Source weights, e.g. twitter=0.7,reddit=0.3')
+    parser.add_argument('--start', default='2025-01-01', help='Earliest timestamp (ISO date)')
+    parser.add_argument('--end', default='2025-12-31', help='Last day (or time) included (ISO date)')
+    parser.add_argument('--time-profile', choices=['uniform', 'recent'], default='uniform')
+    parser.add_argument('--authors', type=int, default=50000, help='Number of distinct authors')
+    parser.add_argument('--county', choices=list(COUNTIES), help='Tag every post with this county')
+    parser.add_argument('--vocabulary', type=int, default=0,
+                        help='Distinct filler words added to posts with Zipf frequencies (0 = templates only)')
+    parser.add_argument('--filler-words', type=int, default=12, help='Average filler words per post')
+    args = parser.parse_args()
+
+    try:
+        generator = SyntheticCorpus(
+            seed=args.seed,
+            topic_probs=parse_distribution(args.topics, list(TEMPLATES)),
+            sentiment_probs=parse_distribution(args.sentiment, SENTIMENTS),
+            source_probs=parse_distribution(args.sources, SOURCES),
+            start=args.start, end=args.end, time_profile=args.time_profile,
+            authors=args.authors, county=args.county,
+            vocabulary=args.vocabulary, filler_words=args.filler_words
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    if os.path.dirname(args.out):
+        os.makedirs(os.path.dirname(args.out), exist_ok=True)
+
+    print(f"🎭 Generating {args.posts:,} synthetic posts (seed {args.seed})...")
+    start = time.perf_counter()
+    if args.format == 'sqlite':
+        write_sqlite(generator, args.posts, args.out)
+    elif args.format == 'parquet':
+        write_parquet(generator, args.posts, args.out)
+    elif args.format == 'corpus':
+        index_path = os.path.splitext(args.out)[0] + '.idx'
+        write_jsonl(generator, args.posts, args.out, index_path)
+    else:
+        write_jsonl(generator, args.posts, args.out)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Wrote {args.out} in {elapsed:.1f} s ({args.posts / elapsed:,.0f} posts/s)")
+
+
+if __name__ == '__main__':
+    main()